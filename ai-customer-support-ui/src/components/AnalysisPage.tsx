@@ -1,6 +1,6 @@
 import { useEffect, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
-import { API } from "../config";
+import { API, apiFetch } from "../config";
 import { 
   ArrowLeft, 
   Heart, 
@@ -35,7 +35,7 @@ const AnalysisPage = () => {
 
   const fetchDetailedScores = async () => {
     try {
-      const res = await fetch(`${API.SCORING}/get-quality-scores?t=${Date.now()}`);
+      const res = await apiFetch(`${API.SCORING}/get-quality-scores?t=${Date.now()}`);
       if (res.ok) {
         const json = await res.json();
         setData(json);
@@ -1,11 +1,14 @@
 import { Search, Loader2, Upload, Mic, FileAudio, FileText, CheckCircle, CheckCircle2, Phone, BarChart3, TrendingUp, Activity, Target, Heart, ShieldCheck, Info } from "lucide-react";
-import { API } from "../config";
+import { API, apiFetch, startCall } from "../config";
 import { useEffect, useState } from "react";
 import { LineChart, Line, BarChart, Bar, AreaChart, Area, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer, Cell } from "recharts";
 import type { NavPage } from "./Dashboard";
 
 interface Message { speaker: string; text: string; time: string; }
-interface HistoryItem { file_name: string; timestamp: string; summary?: string; }
+interface HistoryItem { file_name: string; timestamp: string; summary?: string; source?: "audio" | "text"; }
+
+// Calls per history page; the total comes from X-Total-Count, the next page from X-Next-Cursor
+const HISTORY_PAGE = 100;
 interface StatCard { label: string; value: string; sub: string; glowClass: string; dotColor: string; }
 interface FairnessScores {name_neutrality: number; language_neutrality: number; tone_consistency: number; equal_effort: number;}
 interface QualityScores { empathy: number; compliance: number; resolution: number; reasoning: string; efficiency_score:number; total_messages: number; bias_reduction_applied: boolean; names_anonymized: string[]; fairness_scores: FairnessScores;}
@@ -32,6 +35,8 @@ function CenterPanel({ activePage, onFileUploaded, onReportData }: CenterPanelPr
   const [status, setStatus]               = useState<string | null>(null);
   const [isProcessing, setIsProcessing]   = useState(false);
   const [history, setHistory]             = useState<HistoryItem[]>([]);
+  const [totalFiles, setTotalFiles]       = useState(0);
+  const [historyCursor, setHistoryCursor] = useState<string | null>(null);
   const [isDragging, setIsDragging]       = useState(false);
   const [lastAvgSatisfaction, setLastAvgSatisfaction] = useState<number | null>(null);
   const [lastAvgEmotion, setLastAvgEmotion]           = useState<string>("no data yet");
@@ -71,36 +76,24 @@ const emotionEmoji    = lastEmotionEmoji;
 const emotionLabel    = lastAvgEmotion;
 
 const stats: StatCard[] = [
-  { label: "Total Files",      value: String(history.length || 0),                           sub: "uploaded",  glowClass: "glow-blue",   dotColor: "bg-blue-400"   },
+  { label: "Total Files",      value: String(totalFiles || history.length || 0),             sub: "uploaded",  glowClass: "glow-blue",   dotColor: "bg-blue-400"   },
   { label: "Avg Satisfaction", value: avgSatisfaction !== null ? `${avgSatisfaction}%` : "—", sub: history.length > 0 ? `last ${history.length} file${history.length > 1 ? "s" : ""}` : "no data yet", glowClass: "glow-blue", dotColor: "bg-blue-400" },
   { label: "Avg Emotion",      value: emotionEmoji,                                           sub: emotionLabel, glowClass: "glow-purple", dotColor: "bg-purple-400" },
 ];
 
   // ── Fetch history ──
-  const fetchHistory = async () => {
+  // Audio and text history, merged and sorted newest first by the audio service;
+  // pass the previous X-Next-Cursor to append the next page
+  const fetchHistory = async (cursor: string | null = null) => {
     try {
-      const [audioRes, textRes] = await Promise.all([
-        fetch(`${API.AUDIO}/history`).catch(() => null), 
-        fetch(`${API.CHAT}/history`).catch(() =>null),
-      ]); 
-      const audioData=audioRes?.ok ? await audioRes.json() :[];
-      const textData=textRes?.ok ? await textRes.json() : []; 
-      console.log("AUDIO HISTORY:",audioData);
-      console.log("TEXT HISTORY:",textData);
-
-      const combined = [ 
-        ...(Array.isArray(audioData) ? audioData : []), 
-        ...(Array.isArray(textData) ? textData : []), 
-      ]; 
-
-      combined.sort((a, b) => {
-        const tA = new Date(a.timestamp).getTime();
-        const tB = new Date(b.timestamp).getTime();
-        if (isNaN(tA) || isNaN(tB)) return 0;
-        return tB - tA;
-      });
-      setHistory(combined);
-  } catch { setHistory([]); }
+      const after = cursor ? `&before=${encodeURIComponent(cursor)}` : "";
+      const res  = await apiFetch(`${API.AUDIO}/history/all?limit=${HISTORY_PAGE}${after}`);
+      const data = res.ok ? await res.json() : [];
+      const page: HistoryItem[] = Array.isArray(data) ? data : [];
+      setHistory(prev => cursor ? [...prev, ...page] : page);
+      setTotalFiles(Number(res.headers.get("X-Total-Count")) || page.length);
+      setHistoryCursor(res.headers.get("X-Next-Cursor"));
+  } catch { if (!cursor) { setHistory([]); setTotalFiles(0); setHistoryCursor(null); } }
 }; 
 
   // ── Fetch transcript ──
@@ -110,7 +103,7 @@ const stats: StatCard[] = [
       const endpoint = source === "audio"
         ? `${API.AUDIO}/get-transcript?t=` + Date.now()
         : `${API.CHAT}/get-text-transcript?t=` + Date.now();
-      const res  = await fetch(endpoint);
+      const res  = await apiFetch(endpoint);
       const data = await res.json();
       if (data && data.length > 0) {
         setMessages(data.map((item: any) => ({
@@ -126,7 +119,7 @@ const stats: StatCard[] = [
   // ── Fetch detailed analysis charts data ──
 const fetchAnalysisData = async () => {
     try {
-      const res = await fetch(`${API.SCORING}/get-quality-scores?t=` + Date.now());
+      const res = await apiFetch(`${API.SCORING}/get-quality-scores?t=` + Date.now());
       if (res.ok) {
         const json = await res.json();
         // Only update if actual scores exist — never overwrite good scores with zeros
@@ -147,7 +140,7 @@ const runQualityScoring = async (file: File) => {
 
       if (isAudio) {
         await new Promise(resolve => setTimeout(resolve, 10000));
-        const transcriptRes  = await fetch(`${API.AUDIO}/get-transcript?t=` + Date.now());
+        const transcriptRes  = await apiFetch(`${API.AUDIO}/get-transcript?t=` + Date.now());
         const transcriptData = await transcriptRes.json();
         if (!transcriptData || transcriptData.length === 0) return;
         const text = transcriptData
@@ -161,7 +154,7 @@ const runQualityScoring = async (file: File) => {
       } else {
         // For txt/csv: wait for upload-text to finish, then read transcript
         await new Promise(resolve => setTimeout(resolve, 3000));
-        const transcriptRes  = await fetch(`${API.CHAT}/get-text-transcript?t=` + Date.now());
+        const transcriptRes  = await apiFetch(`${API.CHAT}/get-text-transcript?t=` + Date.now());
         const transcriptData = await transcriptRes.json();
         if (!transcriptData || transcriptData.length === 0) {
           // Fallback: read file directly
@@ -179,7 +172,7 @@ const runQualityScoring = async (file: File) => {
       }
       
       console.log("Sending to scoring server — formData keys:", [...formData.keys()]);
-      const analyzeRes = await fetch(`${API.SCORING}/analyze-quality`, {
+      const analyzeRes = await apiFetch(`${API.SCORING}/analyze-quality`, {
         method: "POST",
         body: formData,
       });
@@ -251,7 +244,7 @@ const runQualityScoring = async (file: File) => {
     const fetchQualityScores = async () => {
         setScoresLoading(true);
         try {
-          const res = await fetch(`${API.SCORING}/get-quality-scores?t=` + Date.now());
+          const res = await apiFetch(`${API.SCORING}/get-quality-scores?t=` + Date.now());
           if (res.ok) {
             const data = await res.json();
             if (data.empathy > 0 || data.compliance > 0 || data.resolution > 0) {
@@ -289,6 +282,7 @@ const runQualityScoring = async (file: File) => {
   // ── Upload handler ──
   const handleUpload = async (file: File) => {
     if (!file) return;
+    startCall();
     if (file.type.startsWith("audio/")) { setAudioURL(URL.createObjectURL(file)); setIsAudioFile(true); }
     else { setAudioURL(null); setIsAudioFile(false); }
     setIsProcessing(true);
@@ -298,7 +292,7 @@ const runQualityScoring = async (file: File) => {
     formData.append("file", file);
     try {
       const endpoint = file.type.startsWith("audio/") ? `${API.AUDIO}/upload` : `${API.CHAT}/upload-text`;
-      const res = await fetch(endpoint, { method: "POST", body: formData });
+      const res = await apiFetch(endpoint, { method: "POST", body: formData });
       if (res.ok) {
         setStatus("Analyzing...");
         await fetchHistory();
@@ -612,10 +606,12 @@ const runQualityScoring = async (file: File) => {
     const clearHistory = async () => {
       try {
         await Promise.all([
-          fetch(`${API.AUDIO}/clear-history`, { method: "POST" }).catch(() => null),
-          fetch(`${API.CHAT}/clear-history`, { method: "POST" }).catch(() => null),
+          apiFetch(`${API.AUDIO}/clear-history`, { method: "POST" }).catch(() => null),
+          apiFetch(`${API.CHAT}/clear-history`, { method: "POST" }).catch(() => null),
         ]);
         setHistory([]);
+        setTotalFiles(0);
+        setHistoryCursor(null);
         // Tell Dashboard to clear download modal list
         window.dispatchEvent(new CustomEvent("historycleared"));
       } catch { console.error("Clear history failed"); }
@@ -648,7 +644,7 @@ const runQualityScoring = async (file: File) => {
               <p className="text-sm italic">No calls yet</p>
             </div>
           ) : history.map((item, i) => {
-            const isText = item.file_name?.endsWith(".txt") || item.file_name?.endsWith(".csv");
+            const isText = item.source ? item.source === "text" : item.file_name?.endsWith(".txt") || item.file_name?.endsWith(".csv");
             return (
               <div key={i} className="bg-[#161e31] border border-white/5 rounded-2xl p-4 flex items-center gap-4">
                 <div className="w-10 h-10 rounded-xl bg-blue-500/10 flex items-center justify-center">
@@ -664,6 +660,15 @@ const runQualityScoring = async (file: File) => {
               </div>
             );
           })}
+          {historyCursor && (
+            <button
+              onClick={() => fetchHistory(historyCursor)}
+              className="w-full py-3 text-xs font-bold text-slate-400 hover:text-slate-200
+                bg-[#161e31] border border-white/5 rounded-2xl transition-all"
+            >
+              Load more ({history.length} of {totalFiles})
+            </button>
+          )}
         </div>
       </div>
     );
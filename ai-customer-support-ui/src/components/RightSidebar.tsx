@@ -1,6 +1,6 @@
 import { CheckCircle2, Circle, Loader2, BarChart3, X, Heart, Shield, Target, Brain, ThumbsUp } from 'lucide-react';
 import { useState, useEffect } from 'react';
-import { API } from "../config";
+import { API, apiFetch } from "../config";
 
 const keywords = [
   'Account Access', 'Authentication', 'Password Reset',
@@ -55,7 +55,7 @@ function RightSidebar({ onReportData }: RightSidebarProps) {
 
   const fetchAudioSummary = async () => {
       try {
-        const res  = await fetch(`${API.AUDIO}/get-summary?t=${Date.now()}`);
+        const res  = await apiFetch(`${API.AUDIO}/get-summary?t=${Date.now()}`);
         const data = await res.json();
         const s = data.summary || 'No summary found.';
         setSummary(s);
@@ -65,7 +65,7 @@ function RightSidebar({ onReportData }: RightSidebarProps) {
 
   const fetchTextSummary = async () => {
       try {
-        const res  = await fetch(`${API.CHAT}/get-text-summary?t=${Date.now()}`);
+        const res  = await apiFetch(`${API.CHAT}/get-text-summary?t=${Date.now()}`);
         if (!res.ok) {
           setSummary('No summary available.');
           return;
@@ -80,7 +80,7 @@ function RightSidebar({ onReportData }: RightSidebarProps) {
 
   const fetchQualityScores = async () => {
     try {
-      const res = await fetch(`${API.SCORING}/get-quality-scores`);
+      const res = await apiFetch(`${API.SCORING}/get-quality-scores`);
       if (res.ok) setScores(await res.json());
     } catch {}
   };
@@ -88,7 +88,7 @@ function RightSidebar({ onReportData }: RightSidebarProps) {
   const fetchEmotionAndSatisfaction = async (source: 'audio' | 'text' = 'audio') => {
     setAnalysisLoading(true);
     try {
-      const res = await fetch(`${API.EMOTION}/analyze`, {
+      const res = await apiFetch(`${API.EMOTION}/analyze`, {
         method:  'POST',
         headers: { 'Content-Type': 'application/json' },
         body:    JSON.stringify({ source }),
@@ -3,4 +3,36 @@ export const API = {
   CHAT:    "https://auraq-chat.onrender.com",
   EMOTION: "https://auraq-emotion.onrender.com",
   SCORING: "https://auraq-scoring.onrender.com",
-};
\ No newline at end of file
+};
+
+// Scopes "latest result" state (transcript, scores, analysis) to this browser
+// so several users can share the multi-worker backend.
+const SESSION_KEY = "auraq_session_id";
+
+export const SESSION_ID: string = (() => {
+  let id = localStorage.getItem(SESSION_KEY);
+  if (!id) {
+    id = crypto.randomUUID().replace(/-/g, "");
+    localStorage.setItem(SESSION_KEY, id);
+  }
+  return id;
+})();
+
+// One id per audit (upload → transcript → scores → analysis); every service
+// logs it as call_id so a slow call can be followed across all four.
+let currentCallId = "";
+
+export const startCall = (): string => {
+  currentCallId = crypto.randomUUID().replace(/-/g, "").slice(0, 16);
+  return currentCallId;
+};
+
+export const apiFetch = (url: string, init: RequestInit = {}) =>
+  fetch(url, {
+    ...init,
+    headers: {
+      ...(init.headers as Record<string, string> | undefined),
+      "X-Session-Id": SESSION_ID,
+      ...(currentCallId ? { "X-Call-Id": currentCallId } : {}),
+    },
+  });
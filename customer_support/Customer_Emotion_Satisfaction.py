@@ -1,16 +1,23 @@
 import os
 import json
-import pandas as pd
-from groq import Groq
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
+from tracing import run_in_threadpool
 from typing import Optional
 from pathlib import Path 
-import dotenv
 from dotenv import load_dotenv
-print(f"DEBUG: Loading .env from: {dotenv.find_dotenv()}")
+
+import admission
+import handoff
+import metrics
+import shared_clients
+import storage
+import tracing
+import turns
+
+log = tracing.get_logger("emotion")
 load_dotenv(override=True)
 
 
@@ -22,8 +29,6 @@ TRANSCRIPT_AUDIO_FILE = "transcriptions_with_speakers.csv"
 TRANSCRIPT_TEXT_FILE  = "text_transcript.csv"
 ANALYSIS_OUTPUT_FILE  = "quality_scores.json"
 
-print("Groq Key loaded:", GROQ_API_KEY[:15] + "...")
-
 app = FastAPI()
 app.add_middleware(
     CORSMiddleware,
@@ -31,8 +36,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Call-Id", "X-Request-Id"],
 )
-client = Groq(api_key=GROQ_API_KEY)
+# At most 4 analyses at once, 16 more queued for up to 30 s; the rest get 429
+admission.protect(app, "emotion", {"/analyze": (4, 16, 30)})
+metrics.instrument(app, "emotion")
+tracing.instrument(app, "emotion")
+
+
+def groq():
+    """The shared Groq client; built (and the SDK imported) on the first LLM call, not at startup."""
+    return shared_clients.groq_client(GROQ_API_KEY)
 
 
 class AnalyzeRequest(BaseModel):
@@ -41,23 +55,27 @@ class AnalyzeRequest(BaseModel):
 
 # ---------------- LOAD TRANSCRIPT ----------------
 
-def load_transcript(source: str) -> list:
-    fp = TRANSCRIPT_AUDIO_FILE if source == "audio" else TRANSCRIPT_TEXT_FILE
+def load_transcript(source: str, session: str = storage.DEFAULT_SESSION) -> turns.Turns:
+    in_memory = handoff.latest(source, session=session)
+    if in_memory:
+        return turns.Turns.from_records(in_memory)
+
+    fp = storage.session_path(TRANSCRIPT_AUDIO_FILE if source == "audio" else TRANSCRIPT_TEXT_FILE, session)
     for path in [fp, os.path.join("customer_support", fp)]:
         if os.path.exists(path):
-            df = pd.read_csv(path)
-            if not df.empty:
-                return df.to_dict(orient="records")  # load ALL rows
+            with metrics.timed(metrics.IO_SECONDS, "csv_read"):
+                transcript = turns.Turns.read_csv(path)
+            if len(transcript):
+                return transcript  # load ALL rows
     raise HTTPException(status_code=404, detail="Transcript not found: " + source)
 
 
 # ---------------- BUILD COMPRESSED CONVERSATION ----------------
 
-def build_conversation(transcript_data: list, max_chars: int = 3000) -> str:
+def build_conversation(transcript_data: turns.Turns, max_chars: int = 3000) -> str:
     lines = []
-    for item in transcript_data:
-        spk = str(item.get("speaker", "Unknown"))
-        txt = str(item.get("text", "")).strip()
+    for spk, txt in turns.Turns.from_records(transcript_data).pairs():
+        txt = txt.strip()
         if not txt:
             continue
         if "00" in spk or "agent" in spk.lower():
@@ -79,44 +97,47 @@ def build_conversation(transcript_data: list, max_chars: int = 3000) -> str:
 
 # ---------------- EMOTION DETECTION ----------------
 
-def detect_emotion(transcript_data: list) -> dict:
+def detect_emotion(transcript_data: turns.Turns) -> dict:
     conversation = build_conversation(transcript_data, max_chars=3000)
 
     if not conversation.strip():
         return {"emotion": "Neutral", "confidence": "50%", "reason": "No text found"}
 
     try:
-        completion = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are analyzing a customer support call transcript.\n"
-                        "Determine the customer's PRIMARY emotion at the END of the call.\n\n"
-                        "RULES:\n"
-                        "- Customer completes order smoothly and says thanks = Satisfied\n"
-                        "- Customer agrees to buy after hesitation = Satisfied\n"
-                        "- Customer calm and cooperative throughout = Neutral\n"
-                        "- Only Frustrated/Angry if customer clearly complains or argues\n"
-                        "- Only Anxious if customer expresses worry or fear\n"
-                        "- Only Confused if customer does not understand what is happening\n\n"
-                        "Pick ONE: Angry/Frustrated/Happy/Sad/Neutral/Confused/Satisfied/Anxious\n"
-                        "Reply ONLY in this exact format:\n"
-                        "EMOTION: x\n"
-                        "CONFIDENCE: x%\n"
-                        "REASON: one sentence"
-                    )
-                },
-                {
-                    "role": "user",
-                    "content": "Analyze this full conversation and detect customer emotion:\n\n" + conversation
-                }
-            ],
-            temperature=0.1,
-            max_tokens=80
-        )
-
+        with metrics.timed(metrics.UPSTREAM_SECONDS, "groq", "emotion"), \
+             tracing.span(log, "groq.emotion", chars=len(conversation)):
+            completion = groq().chat.completions.create(
+                model="llama-3.3-70b-versatile",
+                messages=[
+                    {
+                        "role": "system",
+                        "content": (
+                            "You are analyzing a customer support call transcript.\n"
+                            "Determine the customer's PRIMARY emotion at the END of the call.\n\n"
+                            "RULES:\n"
+                            "- Customer completes order smoothly and says thanks = Satisfied\n"
+                            "- Customer agrees to buy after hesitation = Satisfied\n"
+                            "- Customer calm and cooperative throughout = Neutral\n"
+                            "- Only Frustrated/Angry if customer clearly complains or argues\n"
+                            "- Only Anxious if customer expresses worry or fear\n"
+                            "- Only Confused if customer does not understand what is happening\n\n"
+                            "Pick ONE: Angry/Frustrated/Happy/Sad/Neutral/Confused/Satisfied/Anxious\n"
+                            "Reply ONLY in this exact format:\n"
+                            "EMOTION: x\n"
+                            "CONFIDENCE: x%\n"
+                            "REASON: one sentence"
+                        )
+                    },
+                    {
+                        "role": "user",
+                        "content": "Analyze this full conversation and detect customer emotion:\n\n" + conversation
+                    }
+                ],
+                temperature=0.1,
+                max_tokens=80
+            )
+
+        metrics.record_tokens("llama-3.3-70b-versatile", getattr(completion, "usage", None))
         response = completion.choices[0].message.content.strip()
         result   = {"emotion": "Neutral", "confidence": "50%", "reason": "Could not detect"}
 
@@ -126,51 +147,55 @@ def detect_emotion(transcript_data: list) -> dict:
             elif line.startswith("CONFIDENCE:"): result["confidence"]  = line.replace("CONFIDENCE:", "").strip()
             elif line.startswith("REASON:"):     result["reason"]      = line.replace("REASON:", "").strip()
 
-        print("Emotion result:", result)
+        log.info("Emotion result: %s", result)
         return result
 
     except Exception as e:
-        print("Emotion Error:", e)
+        metrics.record_error("emotion", e)
+        log.exception("Emotion Error: %s", e)
         return {"emotion": "Neutral", "confidence": "50%", "reason": "Detection failed: " + str(e)[:80]}
 
 
 # ---------------- SATISFACTION DETECTION ----------------
 
-def detect_satisfaction(transcript_data: list) -> dict:
+def detect_satisfaction(transcript_data: turns.Turns) -> dict:
     conversation = build_conversation(transcript_data, max_chars=3000)
 
     if not conversation.strip():
         return {"score": "50", "score_percentage": "50%", "status": "Neutral", "reason": "No data"}
 
     try:
-        completion = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are analyzing a customer support call.\n"
-                        "Rate how satisfied the customer was by the END of the call.\n\n"
-                        "Scoring guide:\n"
-                        "- Customer completes request, says thanks, no complaints = 75-95 (Satisfied)\n"
-                        "- Customer agrees to purchase or accepts solution = 65-80 (Satisfied)\n"
-                        "- Customer partially helped, some issues remain = 40-60 (Neutral)\n"
-                        "- Customer unhappy, issue unresolved = 10-40 (Not Satisfied)\n\n"
-                        "Reply ONLY in this exact format:\n"
-                        "SCORE: <number 0-100>\n"
-                        "STATUS: <Satisfied/Neutral/Not Satisfied>\n"
-                        "REASON: <one sentence>"
-                    )
-                },
-                {
-                    "role": "user",
-                    "content": "Analyze this conversation:\n\n" + conversation
-                }
-            ],
-            temperature=0.1,
-            max_tokens=80
-        )
-
+        with metrics.timed(metrics.UPSTREAM_SECONDS, "groq", "satisfaction"), \
+             tracing.span(log, "groq.satisfaction", chars=len(conversation)):
+            completion = groq().chat.completions.create(
+                model="llama-3.3-70b-versatile",
+                messages=[
+                    {
+                        "role": "system",
+                        "content": (
+                            "You are analyzing a customer support call.\n"
+                            "Rate how satisfied the customer was by the END of the call.\n\n"
+                            "Scoring guide:\n"
+                            "- Customer completes request, says thanks, no complaints = 75-95 (Satisfied)\n"
+                            "- Customer agrees to purchase or accepts solution = 65-80 (Satisfied)\n"
+                            "- Customer partially helped, some issues remain = 40-60 (Neutral)\n"
+                            "- Customer unhappy, issue unresolved = 10-40 (Not Satisfied)\n\n"
+                            "Reply ONLY in this exact format:\n"
+                            "SCORE: <number 0-100>\n"
+                            "STATUS: <Satisfied/Neutral/Not Satisfied>\n"
+                            "REASON: <one sentence>"
+                        )
+                    },
+                    {
+                        "role": "user",
+                        "content": "Analyze this conversation:\n\n" + conversation
+                    }
+                ],
+                temperature=0.1,
+                max_tokens=80
+            )
+
+        metrics.record_tokens("llama-3.3-70b-versatile", getattr(completion, "usage", None))
         response = completion.choices[0].message.content.strip()
         result   = {"score": "50", "score_percentage": "50%", "status": "Neutral", "reason": "Could not detect"}
 
@@ -183,39 +208,35 @@ def detect_satisfaction(transcript_data: list) -> dict:
             elif line.startswith("STATUS:"): result["status"] = line.replace("STATUS:", "").strip()
             elif line.startswith("REASON:"): result["reason"] = line.replace("REASON:", "").strip()
 
-        print("Satisfaction result:", result)
+        log.info("Satisfaction result: %s", result)
         return result
 
     except Exception as e:
-        print("Satisfaction Error:", e)
+        metrics.record_error("emotion", e)
+        log.exception("Satisfaction Error: %s", e)
         return {"score": "50", "score_percentage": "50%", "status": "Neutral", "reason": "Detection failed: " + str(e)[:80]}
 
 
 # ---------------- SAVE RESULTS ----------------
 
-def save_results(results: dict):
+def save_results(results: dict, session: str = storage.DEFAULT_SESSION):
     for path in [ANALYSIS_OUTPUT_FILE, os.path.join("customer_support", ANALYSIS_OUTPUT_FILE)]:
         try:
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump(results, f, indent=4, ensure_ascii=False)
+            storage.write_json(storage.session_path(path, session), results, indent=4, ensure_ascii=False)
             break
         except Exception:
             continue
 
 
-# ================================================
-#                   API ENDPOINTS
-# ================================================
+# ---------------- RUN ANALYSIS ----------------
 
-@app.post("/analyze")
-async def analyze(request: AnalyzeRequest):
-    transcript_data     = load_transcript(request.source)
+def run_analysis(transcript_data: turns.Turns, source: str, session: str = storage.DEFAULT_SESSION) -> dict:
     emotion_result      = detect_emotion(transcript_data)
     satisfaction_result = detect_satisfaction(transcript_data)
 
     final_result = {
         "status":  "success",
-        "source":  request.source,
+        "source":  source,
         "total_lines_analyzed": len(transcript_data),
         "emotion_analysis": {
             "emotion":    emotion_result["emotion"],
@@ -230,13 +251,25 @@ async def analyze(request: AnalyzeRequest):
         }
     }
 
-    save_results(final_result)
+    save_results(final_result, session)
+    return final_result
+
+
+# ================================================
+#                   API ENDPOINTS
+# ================================================
+
+@app.post("/analyze")
+async def analyze(request: AnalyzeRequest, session: str = Depends(storage.session_id)):
+    transcript_data = await run_in_threadpool(load_transcript, request.source, session)
+    final_result    = await run_in_threadpool(run_analysis, transcript_data, request.source, session)
     return JSONResponse(content=final_result)
 
 
 @app.get("/get-analysis")
-async def get_analysis():
+async def get_analysis(session: str = Depends(storage.session_id)):
     for path in [ANALYSIS_OUTPUT_FILE, os.path.join("customer_support", ANALYSIS_OUTPUT_FILE)]:
+        path = storage.session_path(path, session)
         if os.path.exists(path):
             with open(path, "r", encoding="utf-8") as f:
                 return JSONResponse(content=json.load(f))
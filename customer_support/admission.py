@@ -0,0 +1,209 @@
+import os
+import math
+import asyncio
+from collections import deque
+from time import monotonic
+
+from fastapi.responses import JSONResponse
+
+import metrics
+
+# ---------------- ADMISSION CONTROL ----------------
+# Bursts used to be accepted whole: every upload started its Deepgram / Groq
+# calls at once and they timed out together. Each expensive route now sits
+# behind a Gate:
+#   - at most `limit` requests run at once
+#   - up to `queue` more wait (FIFO), each for at most `wait` seconds
+#   - anything else gets an immediate 429 with Retry-After, before the
+#     request body is read; so does a request whose predicted wait (queue
+#     position / recent completion rate) already exceeds `wait`
+# Accepted work therefore sees a bounded queueing delay and the upstreams a
+# bounded concurrency. Limits are per process (per gunicorn worker, like
+# the metrics registry); override them with ADMISSION_<SERVICE>_<ROUTE>_LIMIT
+# / _QUEUE / _WAIT, or turn admission off with ADMISSION=0.
+
+ENABLED         = os.getenv("ADMISSION", "1") == "1"
+MAX_RETRY_AFTER = 300
+RATE_WINDOW     = 64      # completions used to estimate the drain rate
+RATE_MAX_AGE    = 60.0    # seconds; an older estimate says nothing about now
+
+
+class Rejected(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason      = reason
+        self.retry_after = retry_after
+
+
+class Gate:
+    def __init__(self, service: str, route: str, limit: int, queue: int, wait: float):
+        self.limit   = max(1, limit)
+        self.queue   = max(0, queue)
+        self.wait    = wait
+        self.running = 0
+        self.waiters = deque()                    # futures, FIFO
+        self.done    = deque(maxlen=RATE_WINDOW)  # completion times
+        self.service_time = 1.0                   # EWMA of admitted request durations
+
+        self.in_flight_gauge = metrics.ADMISSION_IN_FLIGHT.labels(service, route)
+        self.queue_gauge     = metrics.ADMISSION_QUEUE_DEPTH.labels(service, route)
+        self.wait_seconds    = metrics.ADMISSION_WAIT_SECONDS.labels(service, route)
+        self.rejections      = {reason: metrics.ADMISSION_REJECTIONS.labels(service, route, reason)
+                                for reason in ("queue_full", "predicted_wait", "wait_timeout")}
+
+    # ---------------- DRAIN RATE ----------------
+
+    def drain_rate(self):
+        """Completions per second over the last RATE_WINDOW requests, or None without recent data."""
+        if len(self.done) < 2 or monotonic() - self.done[-1] > RATE_MAX_AGE:
+            return None
+        span = self.done[-1] - self.done[0]
+        return (len(self.done) - 1) / span if span > 0 else None
+
+    def expected_wait(self, position: int) -> float:
+        """Seconds until the request at queue `position` (1 = next) gets a slot."""
+        rate = self.drain_rate()
+        if rate:
+            return position / rate
+        return self.service_time * position / self.limit
+
+    def retry_after(self) -> int:
+        return max(1, min(MAX_RETRY_AFTER, math.ceil(self.expected_wait(len(self.waiters) + 1))))
+
+    # ---------------- ACQUIRE / RELEASE ----------------
+
+    async def acquire(self):
+        """Returns once a slot is held; raises Rejected instead of queueing past the limits."""
+        if self.running < self.limit and not self.waiters:
+            self._start()
+            return
+        if len(self.waiters) >= self.queue:
+            self._reject("queue_full")
+        if self.drain_rate() and self.expected_wait(len(self.waiters) + 1) > self.wait:
+            self._reject("predicted_wait")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        self.queue_gauge.set(len(self.waiters))
+        queued = monotonic()
+        try:
+            await asyncio.wait({waiter}, timeout=self.wait)
+        except asyncio.CancelledError:           # client went away while queued
+            self._leave(waiter)
+            raise
+        self.wait_seconds.observe(monotonic() - queued)
+        if not waiter.done():
+            self._leave(waiter)
+            self._reject("wait_timeout")
+        # release() handed its slot over: running already counts this request
+
+    def release(self, started: float):
+        now = monotonic()
+        self.done.append(now)
+        self.service_time += 0.2 * ((now - started) - self.service_time)
+        self._hand_off()
+
+    def _hand_off(self):
+        """Gives the freed slot to the next live waiter, or frees it."""
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self.queue_gauge.set(len(self.waiters))
+                return
+        self.running -= 1
+        self.in_flight_gauge.set(self.running)
+        self.queue_gauge.set(0)
+
+    def _start(self):
+        self.running += 1
+        self.in_flight_gauge.set(self.running)
+
+    def _leave(self, waiter):
+        if waiter.done() and not waiter.cancelled():
+            self._hand_off()                      # got the slot just as we gave up: pass it on
+            return
+        waiter.cancel()
+        try:
+            self.waiters.remove(waiter)
+        except ValueError:
+            pass
+        self.queue_gauge.set(len(self.waiters))
+
+    def _reject(self, reason: str):
+        self.rejections[reason].inc()
+        raise Rejected(reason, self.retry_after())
+
+
+# ---------------- ASGI MIDDLEWARE ----------------
+
+class AdmissionMiddleware:
+    """Pure ASGI: gates matching POST routes before the body is read."""
+
+    def __init__(self, app, gates: dict):
+        self.app   = app
+        self.gates = gates
+
+    async def __call__(self, scope, receive, send):
+        gate = self.gates.get(_route_path(scope)) if scope["type"] == "http" and scope["method"] == "POST" else None
+        if gate is None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await gate.acquire()
+        except Rejected as e:
+            await busy_response(e.reason, e.retry_after)(scope, receive, send)
+            return
+        started = monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release(started)
+
+
+def busy_response(reason: str, retry_after: int) -> JSONResponse:
+    return JSONResponse(
+        {"detail": "Server busy, retry later", "reason": reason, "retry_after": retry_after},
+        status_code=429, headers={"Retry-After": str(retry_after)},
+    )
+
+
+def upstream_retry_after(exc: BaseException):
+    """
+    Seconds to pass on when `exc` is an upstream 429 (Groq's RateLimitError,
+    an httpx / requests HTTP error), else None.
+    """
+    response = getattr(exc, "response", None)
+    status   = getattr(exc, "status_code", None) or getattr(response, "status_code", None)
+    if status != 429:
+        return None
+    try:
+        value = float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        value = 1
+    return max(1, min(MAX_RETRY_AFTER, math.ceil(value)))
+
+
+def _route_path(scope) -> str:
+    """Path inside the service, also when mounted under a prefix by gateway.py."""
+    path, root = scope.get("path", ""), scope.get("root_path", "")
+    return path[len(root):] if root and path.startswith(root) else path
+
+
+def protect(app, service: str, routes: dict):
+    """
+    routes: {path: (limit, queue, wait seconds)}. Call before
+    metrics.instrument so 429s still show up in the request metrics.
+    """
+    if not ENABLED:
+        return
+    gates = {}
+    for path, (limit, queue, wait) in routes.items():
+        prefix = f"ADMISSION_{service}_{path.strip('/').replace('-', '_')}".upper()
+        gates[path] = Gate(
+            service, path,
+            int(os.getenv(f"{prefix}_LIMIT", limit)),
+            int(os.getenv(f"{prefix}_QUEUE", queue)),
+            float(os.getenv(f"{prefix}_WAIT", wait)),
+        )
+    app.add_middleware(AdmissionMiddleware, gates=gates)
@@ -1,21 +1,54 @@
 import os
-import csv
-import pandas as pd
+import time
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
-# --- DEEPGRAM V3.11 MODULAR IMPORTS ---
-from deepgram import DeepgramClient, PrerecordedOptions, FileSource
-
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Response
 from fastapi.middleware.cors import CORSMiddleware
+from tracing import run_in_threadpool
 from pathlib import Path
 
+import admission
+import archive
+import audio_preprocess
+import audio_segments
+import generations
+import handoff
+import local_summarizer
+import metrics
+import search_index
+import similar_calls
+import shared_clients
+import storage
+import summary_log
+import tracing
+import turns
+
 from dotenv import load_dotenv
 load_dotenv(dotenv_path=Path(__file__).parent / ".env")
 
 # ---------------- CONFIG ----------------
 TRANSCRIPT_FILE = "transcriptions_with_speakers.csv"
-SUMMARY_FILE = "final_summaries.csv"
+SUMMARY_FILE = summary_log.SOURCES["audio"]
+SUMMARY_FIELDS = ["file_name", "timestamp", "summary"]
+
+# The text history belongs to the chat service. Unset: its log is on this host
+# (gateway.py, local dev); split deployments point this at the chat service.
+CHAT_SERVICE_URL = os.getenv("CHAT_SERVICE_URL", "").strip().rstrip("/")
+
+# Long-audio mode: recordings longer than LONG_AUDIO_SECONDS are cut at
+# silences into ~SEGMENT_SECONDS pieces (overlapping by SEGMENT_OVERLAP on
+# each side) and transcribed SEGMENT_CONCURRENCY at a time
+LONG_AUDIO_SECONDS  = float(os.getenv("LONG_AUDIO_SECONDS", "600"))
+SEGMENT_SECONDS     = float(os.getenv("SEGMENT_SECONDS", "300"))
+SEGMENT_OVERLAP     = float(os.getenv("SEGMENT_OVERLAP", "5"))
+SEGMENT_SEARCH      = float(os.getenv("SEGMENT_SILENCE_SEARCH", "30"))
+SEGMENT_CONCURRENCY = int(os.getenv("SEGMENT_CONCURRENCY", "6"))
+SEGMENT_RETRIES     = int(os.getenv("SEGMENT_RETRIES", "2"))
+SEGMENT_TIMEOUT     = float(os.getenv("SEGMENT_TIMEOUT", "300"))   # the SDK default (30 s) is too short for 5-minute segments
+
+# Decode / downmix / resample / trim silences before upload (see audio_preprocess.py)
+PREPROCESS_AUDIO    = os.getenv("PREPROCESS_AUDIO", "1") == "1"
 
 # Replace with your actual key
 
@@ -28,168 +61,243 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
     allow_credentials=False,
+    expose_headers=["X-Call-Id", "X-Request-Id", "X-Total-Count", "X-Next-Cursor"],
 )
+# At most 4 transcriptions at once, 8 more queued for up to 60 s; the rest get 429
+admission.protect(app, "audio", {"/upload": (4, 8, 60)})
+metrics.instrument(app, "audio")
+tracing.instrument(app, "audio")
+log = tracing.get_logger("audio")
+
+
+# ---------------- TRANSCRIPTION ----------------
 
-# Initialize Deepgram Client
-dg_client = DeepgramClient(DEEPGRAM_API_KEY)
+LISTEN_URL     = f"{shared_clients.DEEPGRAM_BASE_URL}/v1/listen"
+LISTEN_TIMEOUT = (10, 30)   # (connect, read) seconds
+LISTEN_PARAMS  = {
+    "model": "nova-2",          # Nova-2 is the fastest and most accurate model
+    "smart_format": "true",
+    "diarize": "true",
+    "summarize": "v2",          # 🔥 Generates summary instantly with transcription
+    "punctuate": "true",
+}
 
-# ---------------- UTILS ----------------
 
-def format_for_ui(dg_raw_data):
+def deepgram_listen(body: bytes, timeout=LISTEN_TIMEOUT) -> dict:
     """
-    Programmatically identifies roles to save time.
-    UI expects 'Speaker 00' for Agent and 'Speaker 01' for Customer.
+    One pre-recorded transcription on the pooled requests session, returned
+    as plain JSON: the SDK's response dataclasses cost ~2.6 s of CPU per 10k
+    words to build, json.loads ~20 ms. requests.HTTPError on an error status.
     """
-    if not dg_raw_data:
-        return []
+    response = shared_clients.http_session().post(
+        LISTEN_URL, params=LISTEN_PARAMS, data=body, timeout=timeout,
+        headers={"Authorization": f"Token {DEEPGRAM_API_KEY}"},
+    )
+    response.raise_for_status()
+    return response.json()
 
-    # Simple Logic: The person who starts the call is usually the Agent.
-    # You can refine this by checking for keywords like 'help' in the first message.
-    first_msg = dg_raw_data[0]['text'].lower()
-    
-    # If the first person is asking for help immediately, they might be the customer
-    if any(word in first_msg for word in ["help", "issue", "problem", "broken"]):
-        agent_label = "Speaker 1"
-    else:
-        agent_label = "Speaker 0"
-
-    refined_transcript = []
-    for d in dg_raw_data:
-        is_agent = d['speaker'] == agent_label
-        refined_transcript.append({
-            "speaker": "Speaker 00" if is_agent else "Speaker 01",
-            "text": d['text'],
-            "start": d['start'] # This ensures the UI time column works
-        })
-    return refined_transcript
 
-# ---------------- API ENDPOINTS ----------------
+def response_words(response: dict) -> list:
+    return response["results"]["channels"][0]["alternatives"][0].get("words") or []
 
-@app.post("/upload")
-async def process_upload(file: UploadFile = File(...)):
+
+def response_summary(response: dict):
+    # Note: Short summary is usually better for UI panels
+    return (response["results"].get("summary") or {}).get("short") or None
+
+
+def transcribe_segment(source, plan_entry, index: int):
+    """One Deepgram call for one segment, retried on its own so a failure never redoes the whole file."""
+    start, end, _, _ = plan_entry
+    body    = source.segment(start, end)
+    timeout = (10, SEGMENT_TIMEOUT)
+    metrics.PAYLOAD_BYTES.labels("audio", "deepgram_upload").observe(len(body))
+    for attempt in range(SEGMENT_RETRIES + 1):
+        try:
+            with metrics.timed(metrics.UPSTREAM_SECONDS, "deepgram", "transcribe_segment"), \
+                 tracing.span(log, "deepgram.transcribe_segment", segment=index, attempt=attempt,
+                              start=round(start, 1), seconds=round(end - start, 1)):
+                response = deepgram_listen(body, timeout)
+            return response_words(response), response_summary(response)
+        except Exception as e:
+            metrics.record_error("audio", e)
+            if attempt >= SEGMENT_RETRIES:
+                raise
+            log.warning("Segment %d failed (attempt %d/%d): %s", index, attempt + 1, SEGMENT_RETRIES, e)
+            time.sleep(2 ** attempt)
+
+
+def transcribe_long_audio(source, filename: str):
+    """
+    Long-audio mode: transcribes the silence-cut segments concurrently and
+    stitches their words (speaker labels reconciled across cuts).
+    Returns (words, summary or None).
+    """
+    with tracing.span(log, "audio.plan_segments", seconds=round(source.duration, 1)):
+        plan = audio_segments.plan_segments(source.frame_energies(), source.duration,
+                                            SEGMENT_SECONDS, SEGMENT_OVERLAP, SEGMENT_SEARCH)
+    log.info("Long-audio mode for %s: %.0f s in %d segments", filename, source.duration, len(plan))
+
+    with ThreadPoolExecutor(max_workers=SEGMENT_CONCURRENCY, thread_name_prefix="segment") as pool:
+        results = list(pool.map(transcribe_segment, [source] * len(plan), plan, range(len(plan))))
+
+    words     = audio_segments.stitch([(entry, seg_words) for entry, (seg_words, _) in zip(plan, results)])
+    summaries = [summary for _, summary in results if summary]
+    summary   = local_summarizer.summarize(" ".join(summaries), max_sentences=5) if len(summaries) > 1 else None
+    return words, summary or (summaries[0] if summaries else None)
+
+
+def transcribe_single(body: bytes):
+    """ONE call to Deepgram handles everything. Returns (words, summary or None)."""
+    metrics.PAYLOAD_BYTES.labels("audio", "deepgram_upload").observe(len(body))
+    with metrics.timed(metrics.UPSTREAM_SECONDS, "deepgram", "transcribe"), \
+         tracing.span(log, "deepgram.transcribe", bytes=len(body)):
+        response = deepgram_listen(body)
+    return response_words(response), response_summary(response)
+
+
+def preprocess_audio(audio_data: bytes, filename: str):
+    """audio_preprocess.prepare(), or None (upload sent unchanged) when disabled or undecodable."""
+    if not PREPROCESS_AUDIO:
+        return None
     try:
-        audio_data = await file.read()
-        payload: FileSource = {"buffer": audio_data}
-
-        # Nova-2 is the fastest and most accurate model
-        options = PrerecordedOptions(
-            model="nova-2",
-            smart_format=True,
-            diarize=True,
-            summarize="v2",  # 🔥 Generates summary instantly with transcription
-            punctuate=True,
-        )
-
-        print(f"DEBUG: Processing {file.filename}...")
-        
-        # ONE call to Deepgram handles everything
-        response = dg_client.listen.prerecorded.v("1").transcribe_file(payload, options)
-        
-        # 1. Get the Instant Summary
-        # Note: Short summary is usually better for UI panels
-        deepgram_summary = "No summary available."
-        if hasattr(response.results, 'summary'):
-            deepgram_summary = response.results.summary.short
-        
-        # 2. Extract Words and Group by Speaker
-        words = response.results.channels[0].alternatives[0].words
-        if not words:
-            raise HTTPException(status_code=400, detail="Empty audio content.")
-
-        dg_raw = []
-        curr_spk = words[0].speaker
-        curr_start = words[0].start
-        curr_txt = []
-
-        for w in words:
-            if w.speaker == curr_spk:
-                curr_txt.append(w.word)
+        with tracing.span(log, "audio.preprocess", bytes=len(audio_data)):
+            prepared = audio_preprocess.prepare(audio_data, filename)
+    except Exception as e:
+        metrics.record_error("audio", e)
+        log.warning("Pre-processing failed for %s, sending it unchanged: %s", filename, e)
+        return None
+    if prepared is not None:
+        log.info("Pre-processed %s: %.1f s of audio -> %.1f s", filename, prepared.original_seconds, prepared.seconds)
+    return prepared
+
+
+def transcribe_audio(audio_data: bytes, filename: str, session: str = storage.DEFAULT_SESSION):
+    """
+    Sends the audio to Deepgram (pre-processed when that succeeds, in segments
+    past LONG_AUDIO_SECONDS), groups words into speaker turns on the uploaded
+    file's timeline and writes the transcript CSV. Returns (turns.Turns,
+    deepgram_summary).
+    """
+    log.info("Processing %s (%d bytes)", filename, len(audio_data))
+
+    prepared = preprocess_audio(audio_data, filename)
+    if prepared is not None and prepared.seconds <= LONG_AUDIO_SECONDS:
+        words, summary = transcribe_single(prepared.encoded())
+    else:
+        with audio_segments.open_audio(prepared.wav() if prepared else audio_data, filename) as source:
+            if source is not None and source.duration > LONG_AUDIO_SECONDS:
+                words, summary = transcribe_long_audio(source, filename)
             else:
-                dg_raw.append({
-                    "speaker": f"Speaker {curr_spk}", 
-                    "text": " ".join(curr_txt), 
-                    "start": curr_start
-                })
-                curr_spk = w.speaker
-                curr_start = w.start
-                curr_txt = [w.word]
-        
-        dg_raw.append({
-            "speaker": f"Speaker {curr_spk}", 
-            "text": " ".join(curr_txt), 
-            "start": curr_start
-        })
+                # Whatever was opened, send the audio the offsets below describe
+                words, summary = transcribe_single(prepared.encoded() if prepared else audio_data)
 
-        # 3. Fast Formatting (No LLM wait time)
-        refined_data = format_for_ui(dg_raw)
+    # 1. Get the Instant Summary
+    deepgram_summary = summary or "No summary available."
 
-        # 4. Save to CSV
-        df = pd.DataFrame(refined_data)
-        df.to_csv(TRANSCRIPT_FILE, index=False)
+    # 2. Group words into speaker turns (one vectorized pass, see turns.py)
+    if not words:
+        raise HTTPException(status_code=400, detail="Empty audio content.")
 
-        # 5. Update History
-        file_exists = os.path.isfile(SUMMARY_FILE)
-        with open(SUMMARY_FILE, mode="a", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=["file_name", "timestamp", "summary"])
-            if not file_exists: writer.writeheader()
-            writer.writerow({
-                "file_name": file.filename,
-                "timestamp": datetime.now().strftime("%I:%M %p"),
-                "summary": deepgram_summary,
-            })
+    with tracing.span(log, "turns.group", words=len(words)):
+        grouped = turns.Turns.from_deepgram(words)
+        if prepared is not None:
+            # Timestamps back onto the uploaded file's timeline (trimmed silences)
+            grouped.starts = prepared.offsets.to_original(grouped.starts)
+            grouped.ends   = prepared.offsets.to_original(grouped.ends)
 
-        # Save per-file summary for audio
+        # 3. Fast Formatting (No LLM wait time)
+        refined_data = grouped.for_ui()
+
+    # Deepgram occasionally returns no summary (short or silent audio):
+    # fall back to a local extractive summary of the transcript
+    if deepgram_summary == "No summary available.":
+        with tracing.span(log, "local.summarize", turns=len(refined_data)):
+            deepgram_summary = local_summarizer.summarize(
+                "\n".join(refined_data.texts())
+            ) or deepgram_summary
+        metrics.SUMMARIES.labels("audio", "fallback").inc()
+    else:
+        metrics.SUMMARIES.labels("audio", "deepgram").inc()
+
+    # 4. Save to CSV
+    with metrics.timed(metrics.IO_SECONDS, "csv_write"), \
+         storage.atomic_open(storage.session_path(TRANSCRIPT_FILE, session), "w", newline="", encoding="utf-8") as f:
+        refined_data.write_csv(f)
+    handoff.publish("audio", filename, refined_data, session)
+    search_index.index_transcript(filename, "audio", refined_data)
+
+    return refined_data, deepgram_summary
+
+
+def record_audio_summary(filename: str, deepgram_summary: str, history: bool = True):
+    """Appends the summary to history (unless history=False) and saves the per-file summary JSON."""
+    # 5. Update History
+    if history:
+        summary_log.append(SUMMARY_FILE, SUMMARY_FIELDS, {
+            "file_name": filename,
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "summary": deepgram_summary,
+        })
+    search_index.index_summary(filename, "audio", deepgram_summary)
 
-        try:
-            import re as _re, json as _json, os as _os
-            AUDIO_SUMMARIES_DIR = "file_summaries"
-            _os.makedirs(AUDIO_SUMMARIES_DIR, exist_ok=True)
-            safe_name = _re.sub(r'[^a-zA-Z0-9_\-]', '_', file.filename)
-            summary_path = _os.path.join(AUDIO_SUMMARIES_DIR, f"{safe_name}.json")
-            with open(summary_path, "w") as f:
-                _json.dump({
-                    "filename": file.filename,
-                    "summary":  deepgram_summary,
-                    "saved_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                }, f, indent=4)
-        except Exception as e:
-            print(f"Per-file summary save error: {e}")
+    # Save per-file summary for audio
+
+    try:
+        import re as _re
+        AUDIO_SUMMARIES_DIR = "file_summaries"
+        safe_name = _re.sub(r'[^a-zA-Z0-9_\-]', '_', filename)
+        storage.write_json_in_dir(AUDIO_SUMMARIES_DIR, f"{safe_name}.json", {
+            "filename": filename,
+            "summary":  deepgram_summary,
+            "saved_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }, indent=4)
+    except Exception as e:
+        log.exception("Per-file summary save error: %s", e)
+
+# ---------------- API ENDPOINTS ----------------
 
+@app.post("/upload")
+async def process_upload(file: UploadFile = File(...), session: str = Depends(storage.session_id)):
+    try:
+        audio_data = await file.read()
+        # Off the event loop: long recordings take minutes even when segmented
+        _, deepgram_summary = await run_in_threadpool(transcribe_audio, audio_data, file.filename, session)
+        await run_in_threadpool(record_audio_summary, file.filename, deepgram_summary)
         return {"status": "success", "summary": deepgram_summary}
 
     except Exception as e:
-        print(f"Upload error: {e}")
+        metrics.record_error("audio", e)
+        log.exception("Upload error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/get-transcript")
-async def get_transcript():
-    if not os.path.exists(TRANSCRIPT_FILE):
+async def get_transcript(session: str = Depends(storage.session_id)):
+    transcript_path = storage.session_path(TRANSCRIPT_FILE, session)
+    if not os.path.exists(transcript_path):
         return []
     try:
-        df = pd.read_csv(TRANSCRIPT_FILE)
-        df = df.where(pd.notnull(df), None)
-        return df.to_dict(orient="records")
+        with metrics.timed(metrics.IO_SECONDS, "csv_read"):
+            return turns.Turns.read_csv(transcript_path).to_records()
     except Exception as e:
-        print(f"Transcript fetch error: {e}")
+        log.exception("Transcript fetch error: %s", e)
         return []
 
 @app.get("/get-file-summary/{filename:path}")
 async def get_file_summary(filename: str):
     try:
-        import re as _re, json as _json
+        import re as _re
         from urllib.parse import unquote
         # Decode URL encoding first, then convert to safe filename
         decoded = unquote(filename)
         safe_name = _re.sub(r'[^a-zA-Z0-9_\-]', '_', decoded)
         BASE = os.path.dirname(os.path.abspath(__file__))
         path = os.path.join(BASE, "file_summaries", f"{safe_name}.json")
-        print(f"DEBUG: Looking for summary at {path}")
-        if os.path.exists(path):
-            with open(path) as f:
-                return _json.load(f)
-        return {"summary": "No summary available."}
+        log.debug("Looking for summary at %s", path)
+        data = archive.load_json(os.path.dirname(path), f"{safe_name}.json")   # hot file, else archived
+        return data if data is not None else {"summary": "No summary available."}
     except Exception as e:
-        print(f"Summary fetch error: {e}")
+        log.exception("Summary fetch error: %s", e)
         return {"summary": "No summary available."}
 
 
@@ -198,54 +306,75 @@ async def get_summary():
     if not os.path.exists(SUMMARY_FILE):
         return {"summary": "No summary available."}
     try:
-        df = pd.read_csv(SUMMARY_FILE)
-        if df.empty: return {"summary": "No data."}
-        return {"summary": df["summary"].iloc[-1]}
+        row = await run_in_threadpool(summary_log.latest, SUMMARY_FILE)   # seeks to the last row
+        if not row: return {"summary": "No data."}
+        return {"summary": row["summary"]}
     except:
         return {"summary": "No summary available."}
 
+def paged(response: Response, rows: list, total: int, cursor) -> list:
+    """Page of history; the total and the cursor of the next page travel in headers."""
+    response.headers["X-Total-Count"] = str(total)
+    if cursor is not None:
+        response.headers["X-Next-Cursor"] = str(cursor)
+    return rows
+
+# e.g. /history?limit=20, then /history?limit=20&before=<X-Next-Cursor> — newest first
 @app.get("/history")
-async def get_history():
+async def get_history(response: Response, limit: int = None, before: int = None):
     if not os.path.exists(SUMMARY_FILE):
         return []
     try:
-        df = pd.read_csv(SUMMARY_FILE)
-        # Return last 10 items in reverse order (newest first)
-        return df.iloc[::-1].to_dict(orient="records")
+        return paged(response, *await run_in_threadpool(summary_log.page, SUMMARY_FILE, limit, before))
     except:
         return []
 
+def chat_history_page(limit: int, before: int):
+    """summary_log pager over the chat service's /history (a page of it, and its total, per call)."""
+    params = {key: value for key, value in (("limit", limit), ("before", before)) if value is not None}
+    res = shared_clients.http_session().get(f"{CHAT_SERVICE_URL}/history", params=params, timeout=10,
+                                            headers={"X-Call-Id": tracing.current_call_id()})
+    res.raise_for_status()
+    rows = res.json()
+    return rows, int(res.headers.get("X-Total-Count") or len(rows)), res.headers.get("X-Next-Cursor")
+
+# Audio and text history merged and sorted, newest first, each row tagged with its "source".
+# Paged like /history, with one cursor per source (e.g. "audio:40,text:3").
+@app.get("/history/all")
+async def get_history_all(response: Response, limit: int = None, before: str = None):
+    sources = {"audio": summary_log.local(SUMMARY_FILE),
+               "text":  chat_history_page if CHAT_SERVICE_URL else summary_log.local(summary_log.SOURCES["text"])}
+    try:
+        return paged(response, *await run_in_threadpool(summary_log.merged, limit, before, sources))
+    except Exception as e:
+        log.exception("History error: %s", e)
+        return []
+
 @app.post("/clear-history")
-async def clear_history():
+async def clear_history(session: str = Depends(storage.session_id)):
     try:
         if os.path.exists(SUMMARY_FILE):
-            with open(SUMMARY_FILE, "w", newline="", encoding="utf-8") as f:
-                writer = csv.DictWriter(f, fieldnames=["file_name", "timestamp", "summary"])
-                writer.writeheader()
-        if os.path.exists(TRANSCRIPT_FILE):
-            os.remove(TRANSCRIPT_FILE)
-
-        # Clear file_scores folder
-        import shutil
-        BASE = os.path.dirname(os.path.abspath(__file__))
+            summary_log.reset(SUMMARY_FILE, SUMMARY_FIELDS)
+        transcript_path = storage.session_path(TRANSCRIPT_FILE, session)
+        if os.path.exists(transcript_path):
+            os.remove(transcript_path)
+        handoff.clear("audio", session)
+        await run_in_threadpool(search_index.clear)   # scores and summaries of every call are removed below
+        similar_calls.clear()
 
-        # Clear file_scores folder
-        file_scores_path = os.path.join(BASE, "file_scores")
-        if os.path.exists(file_scores_path):
-            shutil.rmtree(file_scores_path)
-            os.makedirs(file_scores_path)
-            print(f"DEBUG: Cleared file_scores at {file_scores_path}")
+        BASE = os.path.dirname(os.path.abspath(__file__))
 
-        # Clear file_summaries folder
-        file_summaries_path = os.path.join(BASE, "file_summaries")
-        if os.path.exists(file_summaries_path):
-            shutil.rmtree(file_summaries_path)
-            os.makedirs(file_summaries_path)
-            print(f"DEBUG: Cleared file_summaries at {file_summaries_path}")
+        # Swap in empty generations of file_scores and file_summaries; the old
+        # trees are deleted in the background (generations.py)
+        for folder in ("file_scores", "file_summaries"):
+            path = os.path.join(BASE, folder)
+            if os.path.exists(path):
+                generations.clear(path)
+                log.info("Cleared %s at %s", folder, path)
 
         return {"status": "cleared"}
     except Exception as e:
-        print(f"Clear history error: {e}")
+        log.exception("Clear history error: %s", e)
         return {"status": "error", "message": str(e)}
     
 if __name__ == "__main__":
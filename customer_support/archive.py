@@ -0,0 +1,289 @@
+"""
+Compressed archival tier for the one-file-per-call result folders. Files
+older than --days are compacted into append-only segments under
+<folder>/archive/:
+
+    <folder>/archive/seg-<ns>.dat    zlib blocks of ~64 KiB of original file bytes
+    <folder>/archive/seg-<ns>.meta   JSON: per file its mtime and a few listing
+                                     fields (saved_at, scores, ...)
+    <folder>/archive/seg-<ns>.idx    JSON: block offsets, and per file (sorted by
+                                     name) its block, offset and length in the block
+
+then the originals are deleted. The files written from then on stay hot.
+Readers go through read_bytes / load_json (hot file first, then the newest
+segment holding the name) and entries (archived listing fields, straight from
+the .meta files), so nothing else needs to know which tier a call lives in. A file
+that is rewritten after it was archived is simply hot again and shadows its
+archived copy. /clear-history empties the archive with the rest of the folder.
+
+    python archive.py compact                      # every tier, files older than ARCHIVE_AFTER_DAYS (30)
+    python archive.py compact --days 7 --tier file_scores --dry-run
+    python archive.py stats
+"""
+import os
+import json
+import time
+import zlib
+import bisect
+import argparse
+from array import array
+from functools import lru_cache
+
+import storage
+
+# ---------------- CONFIG ----------------
+BASE_DIR      = os.path.dirname(os.path.abspath(__file__))
+ARCHIVE_DIR   = "archive"
+AFTER_DAYS    = float(os.getenv("ARCHIVE_AFTER_DAYS", "30"))
+BLOCK_BYTES   = 64 * 1024     # raw bytes per compressed block: one archived read inflates one block
+SEGMENT_ITEMS = 20000         # files per segment
+LEVEL         = 9
+
+# folder (relative to BASE_DIR) -> (file suffix, top-level JSON keys copied into .meta)
+TIERS = {
+    "file_scores":             (".json", ("original_filename", "saved_at", "empathy", "compliance", "resolution")),
+    "file_scores/transcripts": (".json", ("original_filename", "saved_at")),
+    "file_summaries":          (".json", ("filename", "saved_at")),
+    "session_history":         (".csv",  ()),
+}
+
+
+# ---------------- SEGMENTS ----------------
+
+class Segment:
+    """One compacted .dat file and its index; immutable once written."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.dat  = path + ".dat"
+        with open(path + ".idx", encoding="utf-8") as f:
+            index = json.load(f)
+        self.blocks = index["blocks"]                # [[offset, length], ...]
+        self.names  = index["names"]                 # sorted
+        self.locs   = array("q", index["locs"])      # block, start, length per name
+
+    def items(self):
+        """(name, mtime, listing fields) per file, in name order; the .meta file is re-read, not kept."""
+        with open(self.path + ".meta", encoding="utf-8") as f:
+            return zip(self.names, *zip(*json.load(f)))
+
+    def find(self, name: str):
+        i = bisect.bisect_left(self.names, name)
+        return i if i < len(self.names) and self.names[i] == name else None
+
+    def read(self, i: int) -> bytes:
+        block, start, length = self.locs[3 * i:3 * i + 3]
+        return _inflate(self.dat, *self.blocks[block])[start:start + length]
+
+
+@lru_cache(maxsize=32)
+def _inflate(path: str, offset: int, length: int) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return zlib.decompress(f.read(length))
+
+
+_listing = {}     # archive folder -> (mtime_ns, [Segment], newest first)
+
+
+def segments(directory: str) -> list:
+    """The folder's segments, newest first; reloaded only when the archive folder changes."""
+    archive_dir = os.path.join(directory, ARCHIVE_DIR)
+    try:
+        stamp = os.stat(archive_dir).st_mtime_ns
+    except FileNotFoundError:
+        return []
+    cached = _listing.get(archive_dir)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    loaded = {seg.path: seg for seg in cached[1]} if cached else {}
+    found  = []
+    for name in sorted(os.listdir(archive_dir), reverse=True):
+        if not (name.startswith("seg-") and name.endswith(".idx")):
+            continue
+        path = os.path.join(archive_dir, name[:-4])
+        try:
+            found.append(loaded.get(path) or Segment(path))
+        except (OSError, ValueError):     # removed by clear-history meanwhile
+            continue
+    _listing[archive_dir] = (stamp, found)
+    return found
+
+
+# ---------------- READS ----------------
+
+def read_bytes(directory: str, name: str):
+    """Contents of `name` from the hot folder or, failing that, its archive; None if neither has it."""
+    try:
+        with open(os.path.join(directory, name), "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+    for seg in segments(directory):
+        i = seg.find(name)
+        if i is not None:
+            try:
+                return seg.read(i)
+            except OSError:
+                return None
+    return None
+
+
+def load_json(directory: str, name: str):
+    data = read_bytes(directory, name)
+    return None if data is None else json.loads(data)
+
+
+def entries(directory: str):
+    """(name, mtime, listing fields) of every archived file, newest copy only; no data is inflated."""
+    seen = set()
+    for seg in segments(directory):
+        try:
+            items = seg.items()
+        except OSError:
+            continue
+        for name, mtime, meta in items:
+            if name not in seen:
+                seen.add(name)
+                yield name, mtime, meta
+
+
+def iter_archived(directory: str, skip=(), keep=None):
+    """
+    (name, bytes) of every archived file, newest copy only, one block at a
+    time. `skip`: names to leave out (the hot ones); keep(name, mtime, meta)
+    filters before anything is inflated.
+    """
+    seen = set(skip)
+    for seg in segments(directory):
+        try:
+            items = seg.items()
+        except OSError:
+            continue
+        for i, (name, mtime, meta) in enumerate(items):
+            if name in seen:
+                continue
+            seen.add(name)
+            if keep is not None and not keep(name, mtime, meta):
+                continue
+            try:
+                yield name, seg.read(i)
+            except OSError:
+                break
+
+
+# ---------------- COMPACTION ----------------
+
+def _meta(data: bytes, keys) -> dict:
+    if not keys:
+        return {}
+    try:
+        parsed = json.loads(data)
+    except ValueError:
+        return {}
+    return {k: parsed[k] for k in keys if isinstance(parsed, dict) and k in parsed}
+
+
+def write_segment(directory: str, picked: list, meta_keys=()) -> list:
+    """Packs `picked` [(name, stat)] into a new segment; returns the ones actually archived."""
+    base = os.path.join(directory, ARCHIVE_DIR, f"seg-{time.time_ns():020d}")
+    blocks, locs, meta, archived, raw = [], [], [], [], bytearray()
+    with storage.atomic_open(base + ".dat", "wb") as out:
+        def flush():
+            packed = zlib.compress(bytes(raw), LEVEL)
+            blocks.append([out.tell(), len(packed)])
+            out.write(packed)
+            raw.clear()
+
+        for name, st in picked:
+            try:
+                with open(os.path.join(directory, name), "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                continue
+            if raw and len(raw) + len(data) > BLOCK_BYTES:
+                flush()
+            locs += [len(blocks), len(raw), len(data)]
+            meta.append([st.st_mtime, _meta(data, meta_keys)])
+            archived.append((name, st))
+            raw += data
+        if raw:
+            flush()
+    storage.write_json(base + ".meta", meta)
+    # The index lands last: a segment without one is invisible to readers
+    storage.write_json(base + ".idx", {"format": 1, "codec": "zlib", "blocks": blocks,
+                                       "names": [name for name, _ in archived], "locs": locs})
+    return archived
+
+
+def compact(directory: str, suffix: str, meta_keys=(), days: float = AFTER_DAYS, dry_run: bool = False) -> dict:
+    """Archives the folder's files older than `days`, then deletes the originals that did not change meanwhile."""
+    cutoff, archived = time.time() - days * 86400, []
+    # Shared lock: uploads keep writing, /clear-history waits for the segment
+    with storage.file_lock(directory, shared=True):
+        if not os.path.isdir(directory):
+            return {"directory": directory, "archived": 0, "bytes": 0}
+        with os.scandir(directory) as it:
+            picked = sorted((e.name, e.stat()) for e in it
+                            if e.is_file() and e.name.endswith(suffix) and not e.name.startswith("."))
+        picked = [(name, st) for name, st in picked if st.st_mtime < cutoff]
+        if not dry_run:
+            for i in range(0, len(picked), SEGMENT_ITEMS):
+                archived += write_segment(directory, picked[i:i + SEGMENT_ITEMS], meta_keys)
+
+    removed = 0
+    with storage.file_lock(directory):
+        for name, st in archived:
+            path = os.path.join(directory, name)
+            try:
+                now = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if (now.st_mtime_ns, now.st_size) == (st.st_mtime_ns, st.st_size):   # not rewritten since
+                os.remove(path)
+                removed += 1
+    return {"directory": directory, "archived": len(picked) if dry_run else removed,
+            "bytes": sum(st.st_size for _, st in picked)}
+
+
+def disk_usage(directory: str) -> dict:
+    """Files and allocated bytes, hot and archived (st_blocks: small files cost a whole 4 KiB block)."""
+    usage = {"hot_files": 0, "hot_bytes": 0, "archived_files": 0, "archive_bytes": 0}
+    if os.path.isdir(directory):
+        with os.scandir(directory) as it:
+            for e in it:
+                if e.is_file() and not e.name.startswith("."):
+                    usage["hot_files"] += 1
+                    usage["hot_bytes"] += e.stat().st_blocks * 512
+    archive_dir = os.path.join(directory, ARCHIVE_DIR)
+    if os.path.isdir(archive_dir):
+        for name in os.listdir(archive_dir):
+            usage["archive_bytes"] += os.stat(os.path.join(archive_dir, name)).st_blocks * 512
+        usage["archived_files"] = sum(1 for _ in entries(directory))
+    return usage
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    compact_cmd = commands.add_parser("compact", help="archive files older than --days")
+    compact_cmd.add_argument("--days", type=float, default=AFTER_DAYS)
+    compact_cmd.add_argument("--tier", action="append", choices=sorted(TIERS), help="repeatable; default: all")
+    compact_cmd.add_argument("--dry-run", action="store_true", help="only count what would be archived")
+    commands.add_parser("stats", help="hot and archived files and disk use per tier")
+    args = parser.parse_args()
+
+    if args.command == "compact":
+        for tier in args.tier or TIERS:
+            suffix, meta_keys = TIERS[tier]
+            started = time.perf_counter()
+            result  = compact(os.path.join(BASE_DIR, tier), suffix, meta_keys, args.days, args.dry_run)
+            print(f"{tier:<24} {'would archive' if args.dry_run else 'archived'} {result['archived']} files "
+                  f"({result['bytes'] / 2**20:.1f} MB) in {time.perf_counter() - started:.1f} s")
+    else:
+        print(f"{'tier':<24} {'hot':>8} {'hot MB':>8} {'archived':>9} {'archive MB':>10}")
+        for tier in TIERS:
+            u = disk_usage(os.path.join(BASE_DIR, tier))
+            print(f"{tier:<24} {u['hot_files']:>8} {u['hot_bytes'] / 2**20:>8.1f} "
+                  f"{u['archived_files']:>9} {u['archive_bytes'] / 2**20:>10.1f}")
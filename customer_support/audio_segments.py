@@ -0,0 +1,225 @@
+import io
+import os
+import wave
+import shutil
+import tempfile
+import subprocess
+from types import SimpleNamespace
+from contextlib import contextmanager
+
+import numpy as np
+
+# ---------------- LONG AUDIO SEGMENTS ----------------
+# Splits a long recording into overlapping segments cut at silences, and
+# stitches the per-segment Deepgram words back into one diarized stream.
+#   - WAV is read with the stdlib `wave` module, everything else (m4a, mp3,
+#     mp4) needs ffmpeg/ffprobe on PATH; without them callers fall back to a
+#     single transcription call
+#   - silence detection runs on 50 ms RMS frames, streamed in blocks, so a
+#     90-minute file never sits in memory as decoded samples
+#   - segment i covers [cut(i-1) - overlap, cut(i) + overlap]; words are
+#     owned by the segment whose core [cut(i-1), cut(i)) holds their start,
+#     and the overlap is only used to match speaker labels across the cut
+
+FRAME_SECONDS = 0.05
+ANALYSIS_RATE = 8000          # ffmpeg decode rate for silence detection only
+FFMPEG        = shutil.which("ffmpeg")
+FFPROBE       = shutil.which("ffprobe")
+
+
+def is_wav(data: bytes) -> bool:
+    return data[:4] == b"RIFF" and data[8:12] == b"WAVE"
+
+
+# ---------------- SOURCES ----------------
+
+class WavSource:
+    """Uncompressed WAV kept in memory; segments are sliced without re-encoding."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        with wave.open(io.BytesIO(data)) as w:
+            self.params   = w.getparams()
+            self.duration = w.getnframes() / w.getframerate()
+
+    def frame_energies(self) -> np.ndarray:
+        p      = self.params
+        hop    = max(1, int(p.framerate * FRAME_SECONDS))
+        dtype  = {1: np.uint8, 2: np.int16, 4: np.int32}.get(p.sampwidth)
+        if dtype is None:
+            raise ValueError(f"Unsupported WAV sample width: {p.sampwidth} bytes")
+        blocks = []
+        with wave.open(io.BytesIO(self.data)) as w:
+            while True:
+                raw = w.readframes(hop * 200)          # 10 s per block
+                if not raw:
+                    break
+                samples = np.frombuffer(raw, dtype=dtype).astype(np.float32)
+                if dtype is np.uint8:
+                    samples -= 128.0
+                samples = samples.reshape(-1, p.nchannels).mean(axis=1)
+                blocks.append(_rms_frames(samples, hop))
+        return np.concatenate(blocks) if blocks else np.zeros(0)
+
+    def segment(self, start: float, end: float) -> bytes:
+        p   = self.params
+        out = io.BytesIO()
+        with wave.open(io.BytesIO(self.data)) as src, wave.open(out, "wb") as dst:
+            first = int(start * p.framerate)
+            src.setpos(min(first, p.nframes))
+            dst.setparams(p)
+            dst.writeframes(src.readframes(int(end * p.framerate) - first))
+        return out.getvalue()
+
+
+class FfmpegSource:
+    """Compressed input on disk; decoded and cut by ffmpeg (segments are sent as 16 kHz mono FLAC)."""
+
+    def __init__(self, path: str):
+        self.path     = path
+        self.duration = _ffprobe_duration(path)
+
+    def frame_energies(self) -> np.ndarray:
+        hop  = int(ANALYSIS_RATE * FRAME_SECONDS)
+        cmd  = [FFMPEG, "-v", "error", "-i", self.path, "-vn", "-ac", "1", "-ar", str(ANALYSIS_RATE),
+                "-f", "s16le", "pipe:1"]
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE)
+        blocks, carry = [], b""
+        for raw in iter(lambda: proc.stdout.read(hop * 2 * 200), b""):
+            raw   = carry + raw
+            cut   = len(raw) - len(raw) % (hop * 2)
+            carry = raw[cut:]
+            blocks.append(_rms_frames(np.frombuffer(raw[:cut], dtype=np.int16).astype(np.float32), hop))
+        if proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg could not decode {self.path}")
+        return np.concatenate(blocks) if blocks else np.zeros(0)
+
+    def segment(self, start: float, end: float) -> bytes:
+        cmd = [FFMPEG, "-v", "error", "-ss", f"{start:.3f}", "-t", f"{end - start:.3f}", "-i", self.path,
+               "-vn", "-ac", "1", "-ar", "16000", "-f", "flac", "pipe:1"]
+        return subprocess.run(cmd, stdout=subprocess.PIPE, check=True).stdout
+
+
+def _rms_frames(samples: np.ndarray, hop: int) -> np.ndarray:
+    usable = len(samples) - len(samples) % hop
+    if usable <= 0:
+        return np.zeros(0)
+    frames = samples[:usable].reshape(-1, hop)
+    return np.sqrt(np.mean(frames * frames, axis=1))
+
+
+def _ffprobe_duration(path: str):
+    if not FFPROBE:
+        return None
+    cmd = [FFPROBE, "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", path]
+    out = subprocess.run(cmd, stdout=subprocess.PIPE, text=True).stdout.strip()
+    try:
+        return float(out)
+    except ValueError:
+        return None
+
+
+@contextmanager
+def open_audio(data: bytes, filename: str = ""):
+    """
+    Yields a source with .duration / .frame_energies() / .segment(start, end),
+    or None when the format cannot be segmented here (no ffmpeg).
+    """
+    if is_wav(data):
+        yield WavSource(data)
+        return
+    if not (FFMPEG and FFPROBE):
+        yield None
+        return
+    suffix = os.path.splitext(filename)[1] or ".bin"
+    with tempfile.NamedTemporaryFile(suffix=suffix) as f:
+        f.write(data)
+        f.flush()
+        source = FfmpegSource(f.name)
+        yield source if source.duration else None
+
+
+# ---------------- PLANNING ----------------
+
+def plan_segments(energies: np.ndarray, duration: float, target: float,
+                  overlap: float, search: float) -> list:
+    """
+    Cut points at the quietest frame in the `search` seconds before every
+    `target` mark; returns [(start, end, core_start, core_end)] in seconds.
+    """
+    cuts, pos = [], 0.0
+    while duration - pos > target * 1.5:
+        lo = int((pos + target - search) / FRAME_SECONDS)
+        hi = int((pos + target) / FRAME_SECONDS)
+        window = energies[max(lo, 0):hi]
+        cut = (max(lo, 0) + int(np.argmin(window))) * FRAME_SECONDS if len(window) else pos + target
+        cut = max(cut, pos + overlap * 2)              # never a segment thinner than its overlaps
+        cuts.append(cut)
+        pos = cut
+
+    bounds = [0.0, *cuts, duration]
+    return [
+        (max(0.0, a - overlap), min(duration, b + overlap), a, b)
+        for a, b in zip(bounds, bounds[1:])
+    ]
+
+
+# ---------------- STITCHING ----------------
+
+def _word(w, offset: float) -> SimpleNamespace:
+    get = w.get if isinstance(w, dict) else lambda k, d=None: getattr(w, k, d)
+    return SimpleNamespace(
+        word=get("word"), punctuated_word=get("punctuated_word") or get("word"),
+        start=float(get("start")) + offset, end=float(get("end")) + offset,
+        speaker=get("speaker", 0) or 0, confidence=get("confidence", 0.0),
+    )
+
+
+def _speaker_votes(prev_words, new_words, lo: float, hi: float) -> dict:
+    """{(new local label, previous global label): seconds both segments heard in [lo, hi]}."""
+    prev  = [w for w in prev_words if w.end > lo and w.start < hi]
+    votes = {}
+    for w in new_words:
+        if w.end <= lo or w.start >= hi:
+            continue
+        for p in prev:
+            shared = min(w.end, p.end) - max(w.start, p.start)
+            if shared > 0:
+                key = (w.speaker, p.speaker)
+                votes[key] = votes.get(key, 0.0) + shared
+    return votes
+
+
+def stitch(segments: list) -> list:
+    """
+    segments: [(plan entry, words relative to the segment start)] in order.
+    Returns absolute-time words with speaker labels made consistent across
+    segments: each segment's local labels are matched to the previous
+    segment's labels by how long they spoke at the same time in the overlap.
+    Labels that never overlap take the remaining known speakers in order
+    before new labels are opened.
+    """
+    stitched, prev_words, prev_end, known = [], [], 0.0, 0
+    for (start, end, core_start, core_end), raw_words in segments:
+        words = [_word(w, start) for w in raw_words]
+
+        mapping = {}
+        votes   = _speaker_votes(prev_words, words, start, prev_end) if prev_words else {}
+        for (local, label), _ in sorted(votes.items(), key=lambda kv: -kv[1]):
+            if local not in mapping and label not in mapping.values():
+                mapping[local] = label
+        for local in dict.fromkeys(w.speaker for w in words):
+            if local in mapping:
+                continue
+            free = [label for label in range(known) if label not in mapping.values()]
+            if free:
+                mapping[local] = free[0]
+            else:
+                mapping[local] = known
+                known += 1
+
+        for w in words:
+            w.speaker = mapping[w.speaker]
+        stitched.extend(w for w in words if core_start <= w.start < core_end)
+        prev_words, prev_end = words, end
+    return stitched
@@ -0,0 +1,249 @@
+import io
+import os
+import csv
+import json
+import time
+
+import archive
+
+# ---------------- AUDIT EXPORT ----------------
+# Streams every per-file audit result (file_scores/*.json) as CSV, NDJSON or
+# Parquet for BI tools, one flat row per call:
+#   filename, saved_at, rubric_version, then every field of the scoring
+#   response: scalars as-is, chart arrays as one column per stage / step
+#   (empathy_timeline_opening, compliance_steps_verification, ...),
+#   fairness_scores as fairness_scores_<name>, names_anonymized as a count
+#   (the names themselves never leave the service)
+# Columns come from a template response (scoring_server.build_empty_response),
+# so they are known before the first row and match the UI's charts.
+# Memory stays flat: files are read one at a time (os.scandir) and output
+# is yielded every CHUNK_ROWS rows (Parquet: every ROW_GROUP rows). Rows
+# come in directory order, not sorted: hot files first, then the archive
+# (archive.py), one inflated block at a time.
+
+FORMATS = {
+    "csv":     ("text/csv", "csv"),
+    "ndjson":  ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+CHUNK_ROWS  = 1000
+ROW_GROUP   = 10000
+MTIME_SLACK = 86400         # saved_at is the writer's local time: allow for any time zone
+
+LEADING = [("filename", "original_filename", "str"), ("saved_at", "saved_at", "str"),
+           ("rubric_version", "rubric_version", "str")]
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+# ---------------- RANGE ----------------
+
+def parse_range(start: str = None, end: str = None):
+    """
+    "YYYY-MM-DD" or "YYYY-MM-DD HH:MM:SS" bounds as saved_at strings (an end
+    date covers its whole day). Raises ValueError on other formats.
+    """
+    def parse(value, day_end):
+        if not value:
+            return None
+        value = value.strip().replace("T", " ")
+        for fmt, fill in (("%Y-%m-%d %H:%M:%S", ""), ("%Y-%m-%d", " 23:59:59" if day_end else " 00:00:00")):
+            try:
+                time.strptime(value, fmt)
+                return value + fill
+            except ValueError:
+                continue
+        raise ValueError(f"Invalid date {value!r}: expected YYYY-MM-DD or YYYY-MM-DD HH:MM:SS")
+    return parse(start, False), parse(end, True)
+
+
+# ---------------- ROWS ----------------
+
+def layout(template: dict) -> list:
+    """(column, key, kind) for every exported column, from a template response."""
+    columns = list(LEADING)
+    for key, value in template.items():
+        if isinstance(value, dict):
+            columns += [(f"{key}_{name}", (key, name), "dict") for name in value]
+        elif isinstance(value, list) and value and isinstance(value[0], dict):
+            label = next(k for k in value[0] if k != "score")
+            columns += [(f"{key}_{_slug(item[label])}", (key, label, item[label]), "steps") for item in value]
+        elif isinstance(value, list):
+            columns.append((key, key, "count"))
+        elif isinstance(value, bool):
+            columns.append((key, key, "bool"))
+        elif isinstance(value, (int, float)):
+            columns.append((key, key, "num"))
+        else:
+            columns.append((key, key, "str"))
+    return columns
+
+
+def _slug(label: str) -> str:
+    return "".join(c if c.isalnum() else "_" for c in label.lower()).strip("_")
+
+
+def _num(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def flatten(data: dict, columns: list) -> list:
+    row, steps = [], {}
+    for _, key, kind in columns:
+        if kind == "steps":
+            field, label, name = key
+            if field not in steps:
+                items = data.get(field)
+                steps[field] = {s.get(label): s.get("score") for s in items if isinstance(s, dict)} \
+                    if isinstance(items, list) else {}
+            row.append(_num(steps[field].get(name)))
+        elif kind == "dict":
+            value = data.get(key[0])
+            row.append(_num(value.get(key[1])) if isinstance(value, dict) else None)
+        elif kind == "num":
+            row.append(_num(data.get(key)))
+        elif kind == "count":
+            value = data.get(key)
+            row.append(len(value) if isinstance(value, list) else None)
+        elif kind == "bool":
+            value = data.get(key)
+            row.append(bool(value) if value is not None else None)
+        else:
+            value = data.get(key)
+            row.append(None if value is None else str(value))
+    return row
+
+
+def iter_results(directory: str, start: str = None, end: str = None):
+    """Every scores JSON in `directory` saved within [start, end], one file at a time."""
+    floor = time.mktime(time.strptime(start, "%Y-%m-%d %H:%M:%S")) - MTIME_SLACK if start else None
+    if not os.path.isdir(directory):
+        return
+    hot = set() if archive.segments(directory) else None   # names that shadow archived copies
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if not entry.name.endswith(".json"):
+                continue
+            if hot is not None:
+                hot.add(entry.name)
+            try:
+                # Results are written atomically with saved_at = now, so a
+                # file older than the range start cannot be inside it
+                if floor is not None and entry.stat().st_mtime < floor:
+                    continue
+                with open(entry.path, encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):      # removed by clear-history meanwhile
+                continue
+            if _in_range(data, start, end):
+                yield data
+    if hot is None:
+        return
+
+    # saved_at is in the segment indexes: blocks outside the range are never inflated
+    keep = (lambda name, mtime, meta: _in_range(meta, start, end)) if start or end else None
+    for _, raw in archive.iter_archived(directory, skip=hot, keep=keep):
+        try:
+            yield json.loads(raw)
+        except ValueError:
+            continue
+
+
+def _in_range(data: dict, start: str = None, end: str = None) -> bool:
+    saved = str(data.get("saved_at", ""))
+    return not ((start and saved < start) or (end and saved > end))
+
+
+# ---------------- WRITERS ----------------
+
+def stream(directory: str, fmt: str, template: dict, start: str = None, end: str = None):
+    """Byte chunks of the export; iterate it in a worker thread (StreamingResponse does)."""
+    columns = layout(template)
+    rows    = (flatten(data, columns) for data in iter_results(directory, start, end))
+    return {"csv": _csv, "ndjson": _ndjson, "parquet": _parquet}[fmt](rows, columns)
+
+
+def _csv(rows, columns):
+    buf    = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow([name for name, _, _ in columns])
+    n = 0
+    for row in rows:
+        writer.writerow(row)          # None -> empty cell
+        n += 1
+        if n % CHUNK_ROWS == 0:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue().encode("utf-8")
+
+
+def _ndjson(rows, columns):
+    names, lines = [name for name, _, _ in columns], []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(names, row)), ensure_ascii=False))
+        if len(lines) == CHUNK_ROWS:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _Chunks(io.RawIOBase):
+    """Write-only sink that hands out what the Parquet writer produced so far."""
+
+    def __init__(self):
+        super().__init__()
+        self.parts, self.size = [], 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.size
+
+    def drain(self) -> bytes:
+        out, self.parts = b"".join(self.parts), []
+        return out
+
+
+def _parquet(rows, columns):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types  = {"str": pa.string(), "bool": pa.bool_(), "count": pa.int64()}
+    schema = pa.schema([(name, types.get(kind, pa.float64())) for name, _, kind in columns])
+    sink   = _Chunks()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+
+    def flush(batch):
+        writer.write_table(pa.Table.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(zip(*batch), schema)], schema=schema))
+        return sink.drain()
+
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == ROW_GROUP:
+            yield flush(batch)
+            batch = []
+    if batch:
+        yield flush(batch)
+    writer.close()
+    yield sink.drain()
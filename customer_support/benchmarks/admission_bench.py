@@ -0,0 +1,119 @@
+"""
+Burst test for admission control (admission.py). Starts the fake upstreams
+with a limited capacity (a saturated Groq) and scoring_server, once with
+ADMISSION=0 and once with the default gates, then fires --burst
+simultaneous /analyze-quality requests at each. Per mode it reports how many
+were graded, rejected with 429 or failed (timeouts, 5xx, "Analysis failed"),
+the latency of the graded ones and the Retry-After values handed out.
+
+    python benchmarks/admission_bench.py
+    python benchmarks/admission_bench.py --burst 400 --groq-latency-ms 1000 --capacity 8 --waves 3
+"""
+import os
+import sys
+import time
+import shutil
+import asyncio
+import argparse
+import subprocess
+import statistics
+
+import httpx
+
+import bench_suite
+
+PORT = 18013
+
+
+def start(workdir: str, args, admission: bool) -> list:
+    env = dict(
+        os.environ,
+        GROQ_API_KEY="bench", GROQ_BASE_URL=f"http://127.0.0.1:{bench_suite.FAKE_PORT}",
+        FAKE_GROQ_LATENCY_MS=str(args.groq_latency_ms), FAKE_JITTER_MS=str(args.jitter_ms),
+        FAKE_CAPACITY=str(args.capacity), ADMISSION="1" if admission else "0", LOG_LEVEL="ERROR",
+    )
+    procs = [
+        subprocess.Popen([sys.executable, os.path.join(bench_suite.BENCH_DIR, "fake_upstreams.py"),
+                          "--port", str(bench_suite.FAKE_PORT)],
+                         env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL),
+        subprocess.Popen([sys.executable, "-m", "uvicorn", "scoring_server:app", "--host", "127.0.0.1",
+                          "--port", str(PORT), "--log-level", "warning"],
+                         cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL),
+    ]
+    bench_suite.wait_until_up(f"http://127.0.0.1:{bench_suite.FAKE_PORT}/fake/stats")
+    bench_suite.wait_until_up(f"http://127.0.0.1:{PORT}/docs")
+    return procs
+
+
+async def burst(args, chats: list) -> dict:
+    graded, rejected, failed, retry_after = [], [], 0, []
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+
+    async with httpx.AsyncClient(timeout=args.client_timeout, limits=limits) as client:
+        async def one(i):
+            nonlocal failed
+            name, body = chats[i % len(chats)]
+            started = time.perf_counter()
+            try:
+                r = await client.post(f"http://127.0.0.1:{PORT}/analyze-quality",
+                                      files={"file": (name, body)}, headers={"X-Session-Id": bench_suite.SESSION})
+            except httpx.HTTPError:
+                failed += 1
+                return
+            took = time.perf_counter() - started
+            if r.status_code == 429:
+                rejected.append(took)
+                retry_after.append(int(r.headers["Retry-After"]))
+            elif r.status_code == 200 and not str(r.json().get("reasoning", "")).startswith("Analysis failed"):
+                graded.append(took)
+            else:
+                failed += 1
+
+        started = time.perf_counter()
+        for wave in range(args.waves):
+            await asyncio.gather(*(one(wave * args.burst + i) for i in range(args.burst)))
+        elapsed = time.perf_counter() - started
+
+    graded.sort()
+    rejected.sort()
+    return {
+        "graded": len(graded), "rejected": len(rejected), "failed": failed, "elapsed": elapsed,
+        "p50": bench_suite.percentile(graded, 50), "p95": bench_suite.percentile(graded, 95),
+        "max": graded[-1] if graded else 0.0,
+        "reject_p95": bench_suite.percentile(rejected, 95),
+        "retry_after": f"{min(retry_after)}-{max(retry_after)} s (median {statistics.median(retry_after):.0f})"
+                       if retry_after else "-",
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--burst", type=int, default=200, help="simultaneous requests per wave")
+    parser.add_argument("--waves", type=int, default=1)
+    parser.add_argument("--groq-latency-ms", type=float, default=500)
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    parser.add_argument("--capacity", type=int, default=4, help="fake Groq requests served at once")
+    parser.add_argument("--client-timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    chats   = bench_suite.load_fixtures()["chats"]
+    workdir = bench_suite.prepare_workdir()
+    print(f"{args.waves} x {args.burst} simultaneous /analyze-quality, upstream {args.capacity} at a time "
+          f"x {args.groq_latency_ms:.0f} ms")
+    print(f"{'admission':<10} {'graded':>6} {'429':>5} {'failed':>6} {'p50 s':>6} {'p95 s':>6} {'max s':>6} "
+          f"{'429 p95 ms':>10} {'total s':>7}  retry-after")
+    try:
+        for admission in (False, True):
+            procs = start(workdir, args, admission)
+            try:
+                r = asyncio.run(burst(args, chats))
+            finally:
+                for p in procs:
+                    p.terminate()
+                for p in procs:
+                    p.wait()
+            print(f"{'on' if admission else 'off':<10} {r['graded']:>6} {r['rejected']:>5} {r['failed']:>6} "
+                  f"{r['p50']:>6.1f} {r['p95']:>6.1f} {r['max']:>6.1f} {r['reject_p95'] * 1000:>10.0f} "
+                  f"{r['elapsed']:>7.1f}  {r['retry_after']}", flush=True)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
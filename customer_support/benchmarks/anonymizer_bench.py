@@ -0,0 +1,173 @@
+"""
+Recall and speed of anonymizer.py against the previous capitalized-word
+regex (scoring_server.anonymize_text before it used the engine).
+
+Recall: hand-labelled names, emails and phone numbers in the stored chats
+and call transcripts must not survive anonymization; "other" counts the
+distinct words masked that are not labelled PII (over-masking).
+Speed: seeded transcripts from 0.1 MB up to 16 MB with names, emails,
+spoken emails, phone numbers and cue-introduced unknown names injected;
+seconds per MB stays flat when matching is linear, and the injected PII
+gives a second recall figure.
+
+    python benchmarks/anonymizer_bench.py
+    python benchmarks/anonymizer_bench.py --sizes 1,4,16,64 --show
+"""
+import os
+import re
+import sys
+import time
+import random
+import argparse
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+import anonymizer
+import turns
+
+# file -> (loader, labelled PII); names are listed once per distinct spelling
+FIXTURES = {
+    "text_transcript.csv": ("csv", ["Sarah", "John", "john.smith@email.com"]),
+    "chat.txt":            ("text", ["Sarah", "Mike"]),
+    "transcriptions_with_speakers.csv": ("csv", [
+        "Martha", "Randall", "Thomas", "R-A-N-D-A-L-L", "T-H-O-N-A-N", "Gladys",
+        "409-866-5088", "866-5088", "randall.thomas at gmail.com"]),
+    "session_history/transcript_20260224_190330.csv": ("csv", [
+        "Martha", "Randall", "Thomas", "4 0 9 8 6 6 5 0 8 8", "Randall dot Thomas at gmail.com"]),
+    "human_chat.txt": ("text", [
+        "Mark", "Tom", "Christopher Columbus", "Daniel Craig", "Peter Thiel", "Sean Carroll",
+        "john mayer", "john nash", "Beyonce", "Jay Z"]),
+}
+
+
+# ---------------- REFERENCE (previous anonymize_text) ----------------
+
+def reference_anonymize(text: str):
+    exclude = {
+        'Speaker', 'Agent', 'Customer', 'Human', 'User',
+        'Hello', 'Thank', 'Sorry', 'Please', 'Yes', 'No',
+        'Good', 'Great', 'Sure', 'Okay', 'Well', 'Just',
+        'This', 'That', 'With', 'Your', 'Have', 'Will',
+        'From', 'They', 'Their', 'What', 'When', 'Where',
+        'Which', 'There', 'About', 'Would', 'Could', 'Should'
+    }
+    words_found  = re.findall(r"\b[A-Z][a-z]{2,}\b", text)
+    unique_names = list(set(w for w in words_found if w not in exclude))
+    anonymized   = re.sub(r"\b[A-Z][a-z]{2,}\b", lambda m: m.group(0) if m.group(0) in exclude else "[NAME]", text)
+    return anonymized, unique_names
+
+
+# ---------------- RECALL ----------------
+
+def load(name: str, kind: str) -> str:
+    path = os.path.join(BASE_DIR, name)
+    if kind == "csv":
+        return turns.Turns.read_csv(path).conversation()
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def survives(label: str, text: str) -> bool:
+    return re.search(rf"(?<![\w-]){re.escape(label)}(?![\w-])", text, re.IGNORECASE) is not None
+
+
+def surviving(labels, text: str) -> set:
+    """Lower-cased labels still in `text`, in one pass over it (the labels as one trie)."""
+    pattern = rf"(?<![\w-])(?i:{anonymizer.trie_pattern(sorted({p.lower() for p in labels}))})(?![\w-])"
+    return {m.lower() for m in re.findall(pattern, text)}
+
+
+def score(text: str, labels: list, masked: str, masked_words) -> tuple:
+    present  = [label for label in labels if survives(label, text)]
+    caught   = [label for label in present if not survives(label, masked)]
+    labelled = {w.lower() for label in labels for w in re.findall(r"[A-Za-z]+", label)}
+    other    = sorted({w for w in masked_words if w.lower() not in labelled})
+    return len(caught), len(present), other, [label for label in present if label not in caught]
+
+
+def engine_words(originals: dict) -> list:
+    return [w for value in anonymizer.names(originals) for w in re.findall(r"[A-Za-z]+", value)]
+
+
+# ---------------- CORPUS ----------------
+
+UNKNOWN = ["Zoltan", "Oluwaseun", "Bartholomew", "Anneliese", "Thandiwe", "Kazimierz", "Siobhan", "Leopold"]
+FILLER  = ["thanks for calling, how can I help you today", "my order has not arrived yet",
+           "I can see the parcel left our warehouse yesterday", "I have issued a replacement",
+           "great, that solves it, thank you", "let me check that for you"]
+
+
+def generate(size_bytes: int, seed: int = 7):
+    """Transcript text and the PII strings injected into it."""
+    rng   = random.Random(seed)
+    names = [n for n in anonymizer._read_lexicon(os.path.join(anonymizer.LEXICON_DIR, "names.txt"))]
+    parts, pii, total, turn = [], set(), 0, 0
+    while total < size_bytes:
+        speaker = "Agent" if turn % 2 == 0 else "Customer"
+        first, last = rng.choice(names), rng.choice(names)
+        pick = rng.randrange(8)
+        if pick == 0:
+            msg, found = f"my name is {first} {last}", [first, last]
+        elif pick == 1:
+            email = f"{first.lower()}.{last.lower()}{rng.randint(1, 99)}@example.com"
+            msg, found = f"sure, it is {email}", [email]
+        elif pick == 2:
+            phone = f"{rng.randint(200, 999)}-{rng.randint(200, 999)}-{rng.randint(1000, 9999)}"
+            msg, found = f"you can reach me on {phone} after five", [phone]
+        elif pick == 3:
+            spoken = f"{first.lower()} dot {last.lower()} at gmail.com"
+            msg, found = f"email is {spoken}", [spoken]
+        elif pick == 4:
+            unknown = rng.choice(UNKNOWN)
+            msg, found = f"hi {unknown}, {rng.choice(FILLER)}", [unknown]
+        else:
+            msg, found = rng.choice(FILLER), []
+        piece = f"{speaker}: {msg}\n"
+        parts.append(piece)
+        pii.update(found)
+        total += len(piece)
+        turn  += 1
+    return "".join(parts), sorted(pii)
+
+
+def timed(fn, text: str) -> tuple:
+    started = time.perf_counter()
+    out = fn(text)
+    return time.perf_counter() - started, out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="0.1,1,4,16", help="generated transcript sizes in MB")
+    parser.add_argument("--show", action="store_true", help="list missed labels and over-masked words")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    anonymizer.compiled()
+    print(f"pattern compiled in {(time.perf_counter() - started) * 1000:.0f} ms\n")
+
+    print(f"{'fixture':<48} {'engine recall':>13} {'other':>6} {'legacy recall':>13} {'other':>6}")
+    for name, (kind, labels) in FIXTURES.items():
+        if not os.path.exists(os.path.join(BASE_DIR, name)):
+            continue
+        text = load(name, kind)
+        new_text, originals = anonymizer.anonymize(text)
+        old_text, old_names = reference_anonymize(text)
+        new = score(text, labels, new_text, engine_words(originals))
+        old = score(text, labels, old_text, old_names)
+        print(f"{name:<48} {new[0]:>6}/{new[1]:<6} {len(new[2]):>6} {old[0]:>6}/{old[1]:<6} {len(old[2]):>6}")
+        if args.show:
+            print(f"    engine missed {new[3]}; other {new[2]}")
+            print(f"    legacy missed {old[3]}; other {old[2][:25]}{' ...' if len(old[2]) > 25 else ''}")
+
+    print(f"\n{'MB':>6} {'engine s':>9} {'s/MB':>7} {'recall':>8} {'cached ms':>9} {'legacy s':>9} {'s/MB':>7} {'recall':>8}")
+    for mb in [float(s) for s in args.sizes.split(",") if s]:
+        text, pii = generate(int(mb * 1024 * 1024))
+        seconds, (masked, _) = timed(anonymizer.anonymize, text)
+        cached, _            = timed(anonymizer.anonymize, text)
+        ref_seconds, (ref_masked, _) = timed(reference_anonymize, text)
+        recall     = 1 - len(surviving(pii, masked)) / len(pii)
+        ref_recall = 1 - len(surviving(pii, ref_masked)) / len(pii)
+        print(f"{mb:>6g} {seconds:>9.2f} {seconds / mb:>7.2f} {recall:>8.1%} {cached * 1000:>9.1f} "
+              f"{ref_seconds:>9.2f} {ref_seconds / mb:>7.2f} {ref_recall:>8.1%}", flush=True)
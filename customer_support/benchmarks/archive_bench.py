@@ -0,0 +1,108 @@
+"""
+Disk use and read latency of the archival tier (archive.py) over --calls
+synthetic per-file score JSONs (default 100,000, shaped like
+scoring_server's, written with indent=4). Compacts them all and compares,
+hot vs archived: allocated disk space, random single-file reads
+(read_bytes + json.loads, what /get-file-scores does), the
+/list-file-scores listing and a full /export scan.
+
+    python benchmarks/archive_bench.py
+    python benchmarks/archive_bench.py --calls 1000000 --reads 5000
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import export_bench
+
+
+def timings(fn, names) -> list:
+    out = []
+    for name in names:
+        started = time.perf_counter()
+        fn(name)
+        out.append((time.perf_counter() - started) * 1000)
+    return sorted(out)
+
+
+def pct(values, p) -> float:
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def listing(directory: str) -> int:
+    """What /list-file-scores reads: every hot JSON, then the archived index entries."""
+    import archive
+    hot = set()
+    for name in os.listdir(directory):
+        if name.endswith(".json"):
+            with open(os.path.join(directory, name)) as f:
+                json.load(f)
+            hot.add(name)
+    return len(hot) + sum(1 for name, _, _ in archive.entries(directory) if name not in hot)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=100_000)
+    parser.add_argument("--reads", type=int, default=2000, help="random single-file reads per tier")
+    args = parser.parse_args()
+
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    import archive
+    import audit_export
+
+    directory = tempfile.mkdtemp(prefix="archive-bench-")
+    try:
+        export_bench.build(directory, args.calls)
+        names = random.Random(3).sample(sorted(n for n in os.listdir(directory) if n.endswith(".json")),
+                                        min(args.reads, args.calls))
+        read  = lambda name: json.loads(archive.read_bytes(directory, name))
+        rows  = []
+
+        hot_usage = archive.disk_usage(directory)
+        hot_reads = timings(read, names)
+        started = time.perf_counter()
+        listing(directory)
+        hot_list = time.perf_counter() - started
+        started = time.perf_counter()
+        sum(1 for _ in audit_export.iter_results(directory))
+        hot_scan = time.perf_counter() - started
+
+        # The synthetic calls are dated through 2026: a negative age archives all of them
+        started = time.perf_counter()
+        result  = archive.compact(directory, ".json", archive.TIERS["file_scores"][1], days=-366)
+        took    = time.perf_counter() - started
+        usage   = archive.disk_usage(directory)
+
+        archive._listing.clear()
+        started = time.perf_counter()
+        read(names[0])
+        first = (time.perf_counter() - started) * 1000
+        archived_reads = timings(read, names)
+        started = time.perf_counter()
+        listed = listing(directory)
+        arch_list = time.perf_counter() - started
+        started = time.perf_counter()
+        scanned = sum(1 for _ in audit_export.iter_results(directory))
+        arch_scan = time.perf_counter() - started
+        assert listed == scanned == args.calls, (listed, scanned)
+
+        print(f"{args.calls} calls, {len(archive.segments(directory))} segments, compacted in {took:.1f} s "
+              f"({result['bytes'] / took / 2**20:.0f} MB/s of JSON)")
+        print(f"disk: hot {hot_usage['hot_bytes'] / 2**20:.1f} MB allocated "
+              f"({result['bytes'] / 2**20:.1f} MB of JSON) -> archive {usage['archive_bytes'] / 2**20:.1f} MB "
+              f"({hot_usage['hot_bytes'] / max(usage['archive_bytes'], 1):.1f}x smaller)")
+        print(f"{'':<10} {'read p50 ms':>11} {'read p95 ms':>11} {'list s':>7} {'export scan s':>13}")
+        print(f"{'hot':<10} {pct(hot_reads, 50):>11.3f} {pct(hot_reads, 95):>11.3f} {hot_list:>7.2f} {hot_scan:>13.2f}")
+        print(f"{'archived':<10} {pct(archived_reads, 50):>11.3f} {pct(archived_reads, 95):>11.3f} "
+              f"{arch_list:>7.2f} {arch_scan:>13.2f}")
+        print(f"first archived read (loads every segment index): {first:.0f} ms")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
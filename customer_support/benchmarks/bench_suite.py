@@ -0,0 +1,332 @@
+"""
+End-to-end benchmark of the four services against local fake Deepgram / Groq
+upstreams (benchmarks/fake_upstreams.py). Replays the repo fixtures
+(calls/*.m4a, chat.txt, human_chat.txt, session_history/*.csv) and reports
+throughput, p50/p95/p99 latency and peak RSS per endpoint.
+
+    python benchmarks/bench_suite.py                        # run, print report
+    python benchmarks/bench_suite.py --save-baseline        # store as baselines/default.json
+    python benchmarks/bench_suite.py --compare              # diff against the stored baseline
+
+The services run from a scratch copy of customer_support/, so a run never
+touches the real CSV / JSON result files.
+"""
+import os
+import sys
+import csv
+import glob
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+import threading
+import subprocess
+import statistics
+
+import httpx
+
+BENCH_DIR   = os.path.dirname(os.path.abspath(__file__))
+SERVICE_DIR = os.path.dirname(BENCH_DIR)
+BASELINE_DIR = os.path.join(BENCH_DIR, "baselines")
+
+FAKE_PORT = 9100
+SERVICES = {
+    "audio":   ("app",                              18000),
+    "chat":    ("chat_app",                         18001),
+    "emotion": ("Customer_Emotion_Satisfaction",    18002),
+    "scoring": ("scoring_server",                   18003),
+}
+SESSION = "bench"
+
+
+# ---------------- FIXTURES ----------------
+
+def load_fixtures() -> dict:
+    def read_bytes(path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    audio = [(os.path.basename(p), read_bytes(p)) for p in sorted(glob.glob(os.path.join(SERVICE_DIR, "calls", "*.m4a")))]
+    chats = [(name, read_bytes(os.path.join(SERVICE_DIR, name)))
+             for name in ("chat.txt", "human_chat.txt") if os.path.exists(os.path.join(SERVICE_DIR, name))]
+
+    # Recorded call transcripts replayed as text audits ("Speaker: text" lines)
+    for path in sorted(glob.glob(os.path.join(SERVICE_DIR, "session_history", "*.csv"))):
+        with open(path, newline="", encoding="utf-8") as f:
+            lines = [f"{row['speaker']}: {row['text']}" for row in csv.DictReader(f)]
+        chats.append((os.path.basename(path).replace(".csv", ".txt"), "\n".join(lines).encode("utf-8")))
+    return {"audio": audio, "chats": chats}
+
+
+def build_scenarios(fixtures: dict) -> list:
+    """(name, service, method, path, request-kwargs factory) in the order they run."""
+    audio, chats = fixtures["audio"], fixtures["chats"]
+
+    def cycle(items):
+        return lambda i: items[i % len(items)]
+
+    pick_audio, pick_chat = cycle(audio), cycle(chats)
+    scenarios = []
+    if audio:
+        scenarios.append(("POST /upload", "audio", "POST", "/upload",
+                          lambda i: {"files": {"file": pick_audio(i)}}))
+    scenarios += [
+        ("POST /upload-text", "chat", "POST", "/upload-text",
+         lambda i: {"files": {"file": pick_chat(i)}}),
+        ("POST /analyze-quality (text)", "scoring", "POST", "/analyze-quality",
+         lambda i: {"files": {"file": pick_chat(i)}, "data": {"original_filename": pick_chat(i)[0]}}),
+    ]
+    if audio:
+        scenarios.append(("POST /analyze-quality (audio)", "scoring", "POST", "/analyze-quality",
+                          lambda i: {"files": {"file": ("audio_transcript.txt", b"")},
+                                     "data": {"original_filename": pick_audio(i)[0]}}))
+    scenarios += [
+        ("POST /analyze", "emotion", "POST", "/analyze", lambda i: {"json": {"source": "text"}}),
+        ("GET /get-transcript", "audio", "GET", "/get-transcript", lambda i: {}),
+        ("GET /get-text-transcript", "chat", "GET", "/get-text-transcript", lambda i: {}),
+        ("GET /history (audio)", "audio", "GET", "/history", lambda i: {}),
+        ("GET /history (chat)", "chat", "GET", "/history", lambda i: {}),
+        ("GET /list-file-scores", "scoring", "GET", "/list-file-scores", lambda i: {}),
+        ("GET /get-analysis", "emotion", "GET", "/get-analysis", lambda i: {}),
+    ]
+    return scenarios
+
+
+# ---------------- PROCESSES ----------------
+
+def rss_mb(pid: int) -> float:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+class RssSampler(threading.Thread):
+    """Polls a process's RSS so each scenario can report its own peak."""
+
+    def __init__(self, pids: dict, interval: float = 0.05):
+        super().__init__(daemon=True)
+        self.pids     = pids
+        self.interval = interval
+        self.peaks    = {name: 0.0 for name in pids}
+        self.stopped  = threading.Event()
+
+    def reset(self):
+        self.peaks = {name: rss_mb(pid) for name, pid in self.pids.items()}
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            for name, pid in self.pids.items():
+                self.peaks[name] = max(self.peaks[name], rss_mb(pid))
+
+
+def prepare_workdir() -> str:
+    """Scratch copy of the service code (and the anonymizer lexicons); result files land here instead of the repo."""
+    workdir = tempfile.mkdtemp(prefix="auditor-bench-")
+    for path in glob.glob(os.path.join(SERVICE_DIR, "*.py")):
+        shutil.copy(path, workdir)
+    shutil.copytree(os.path.join(SERVICE_DIR, "lexicons"), os.path.join(workdir, "lexicons"))
+    return workdir
+
+
+def wait_until_up(url: str, timeout: float = 60.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Service did not come up: {url}")
+
+
+def start_stack(workdir: str, args) -> dict:
+    env = dict(
+        os.environ,
+        DEEPGRAM_API_KEY="bench", GROQ_API_KEY="bench",
+        DEEPGRAM_BASE_URL=f"http://127.0.0.1:{FAKE_PORT}",
+        GROQ_BASE_URL=f"http://127.0.0.1:{FAKE_PORT}",
+        FAKE_DEEPGRAM_LATENCY_MS=str(args.deepgram_latency_ms),
+        FAKE_GROQ_LATENCY_MS=str(args.groq_latency_ms),
+        FAKE_JITTER_MS=str(args.jitter_ms),
+        FAKE_ERROR_RATE=str(args.error_rate),
+        LOG_LEVEL="WARNING",
+    )
+    procs = {"fake": subprocess.Popen(
+        [sys.executable, os.path.join(BENCH_DIR, "fake_upstreams.py"), "--port", str(FAKE_PORT)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )}
+    for name, (module, port) in SERVICES.items():
+        procs[name] = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", f"{module}:app", "--host", "127.0.0.1",
+             "--port", str(port), "--log-level", "warning"],
+            cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+    wait_until_up(f"http://127.0.0.1:{FAKE_PORT}/fake/stats")
+    for name, (_, port) in SERVICES.items():
+        wait_until_up(f"http://127.0.0.1:{port}/docs")
+    return procs
+
+
+def stop_stack(procs: dict):
+    for p in procs.values():
+        p.terminate()
+    for p in procs.values():
+        p.wait()
+
+
+# ---------------- RUNNER ----------------
+
+def percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+async def run_scenario(client: httpx.AsyncClient, base: str, method: str, path: str,
+                       factory, requests: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    timings, errors = [], 0
+
+    async def one(i):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                r = await client.request(method, base + path, **factory(i))
+                if r.status_code >= 500:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            timings.append((time.perf_counter() - start) * 1000)
+
+    wall = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    wall = time.perf_counter() - wall
+
+    timings.sort()
+    return {
+        "requests":     requests,
+        "errors":       errors,
+        "throughput_rps": round(requests / wall, 2) if wall else 0.0,
+        "p50_ms":       round(percentile(timings, 50), 2),
+        "p95_ms":       round(percentile(timings, 95), 2),
+        "p99_ms":       round(percentile(timings, 99), 2),
+        "mean_ms":      round(statistics.fmean(timings), 2) if timings else 0.0,
+    }
+
+
+async def run_suite(scenarios: list, sampler: RssSampler, args) -> dict:
+    results = {}
+    limits  = httpx.Limits(max_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(timeout=120, limits=limits, headers={"X-Session-Id": SESSION}) as client:
+        for name, service, method, path, factory in scenarios:
+            base = f"http://127.0.0.1:{SERVICES[service][1]}"
+            await client.request(method, base + path, **factory(0))   # warm-up
+            sampler.reset()
+            result = await run_scenario(client, base, method, path, factory, args.requests, args.concurrency)
+            result["peak_rss_mb"] = round(sampler.peaks[service], 1)
+            results[name] = result
+            print(f"  {name:<32} {result['throughput_rps']:>8.2f} req/s  p50 {result['p50_ms']:>8.1f} ms  "
+                  f"p95 {result['p95_ms']:>8.1f} ms  p99 {result['p99_ms']:>8.1f} ms  "
+                  f"peak {result['peak_rss_mb']:>6.1f} MB  errors {result['errors']}", flush=True)
+    return results
+
+
+# ---------------- BASELINES ----------------
+
+def baseline_path(name: str) -> str:
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """Returns one line per metric that regressed by more than `tolerance` percent."""
+    regressions = []
+    print(f"\n{'endpoint':<32} {'p50 Δ%':>8} {'p95 Δ%':>8} {'p99 Δ%':>8} {'rps Δ%':>8} {'rss Δ%':>8}")
+    for name, now in current["endpoints"].items():
+        before = baseline["endpoints"].get(name)
+        if before is None:
+            print(f"{name:<32} (new)")
+            continue
+        deltas = {}
+        for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps", "peak_rss_mb"):
+            deltas[key] = (now[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+        print(f"{name:<32} {deltas['p50_ms']:>+8.1f} {deltas['p95_ms']:>+8.1f} {deltas['p99_ms']:>+8.1f} "
+              f"{deltas['throughput_rps']:>+8.1f} {deltas['peak_rss_mb']:>+8.1f}")
+        for key in ("p50_ms", "p95_ms", "peak_rss_mb"):
+            if deltas[key] > tolerance:
+                regressions.append(f"{name}: {key} {before[key]} → {now[key]} ({deltas[key]:+.1f}%)")
+        if deltas["throughput_rps"] < -tolerance:
+            regressions.append(f"{name}: throughput_rps {before['throughput_rps']} → {now['throughput_rps']}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=30, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--deepgram-latency-ms", type=float, default=300)
+    parser.add_argument("--groq-latency-ms", type=float, default=200)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--only", default="", help="run only endpoints whose name contains this text")
+    parser.add_argument("--baseline", default="default", help="baseline name under benchmarks/baselines/")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=10.0, help="allowed regression in percent")
+    parser.add_argument("--keep-workdir", action="store_true")
+    args = parser.parse_args()
+
+    scenarios = build_scenarios(load_fixtures())
+    if args.only:
+        scenarios = [s for s in scenarios if args.only in s[0]]
+
+    workdir = prepare_workdir()
+    procs   = start_stack(workdir, args)
+    sampler = RssSampler({name: procs[name].pid for name in SERVICES})
+    sampler.start()
+    try:
+        print(f"Benchmarking {len(scenarios)} endpoints ({args.requests} requests, concurrency {args.concurrency})")
+        endpoints = asyncio.run(run_suite(scenarios, sampler, args))
+        upstream  = httpx.get(f"http://127.0.0.1:{FAKE_PORT}/fake/stats").json()
+    finally:
+        sampler.stopped.set()
+        stop_stack(procs)
+        if not args.keep_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "created":   time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config":    {k: v for k, v in vars(args).items() if k not in ("save_baseline", "compare", "keep_workdir")},
+        "upstream":  upstream,
+        "endpoints": endpoints,
+    }
+
+    exit_code = 0
+    if args.compare:
+        path = baseline_path(args.baseline)
+        if not os.path.exists(path):
+            sys.exit(f"No baseline at {path}; run with --save-baseline first.")
+        with open(path, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions beyond tolerance:")
+            for line in regressions:
+                print("  " + line)
+            exit_code = 1
+
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(baseline_path(args.baseline), "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline saved to {baseline_path(args.baseline)}")
+
+    sys.exit(exit_code)
@@ -0,0 +1,146 @@
+"""
+Scaling benchmark and fuzz check for chat_parser.py. Generates seeded chat
+corpora from 1 MB to 100 MB (multi-line, inline, and inline with hundreds
+of false-positive "Name:" candidates such as timestamps and URLs), times
+parse + UI formatting, and reports seconds per MB so linear scaling shows
+up as a flat column.
+
+    python benchmarks/chat_parser_bench.py                      # 1, 10, 100 MB
+    python benchmarks/chat_parser_bench.py --sizes 1,4,16 --reference
+    python benchmarks/chat_parser_bench.py --fuzz 50000         # compare with the old regex parser
+    python benchmarks/chat_parser_bench.py --write corpus/      # keep the generated files
+"""
+import os
+import re
+import sys
+import time
+import random
+import argparse
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chat_parser
+
+FORMATS = ("lines", "inline", "inline-noisy")
+
+AGENTS    = ["Sarah", "Agent", "Mike Johnson", "Support Bot", "Priya"]
+CUSTOMERS = ["Customer", "John", "Ana Maria", "Human 2", "Lee"]
+PHRASES   = [
+    "thanks for reaching out, how can I help you today",
+    "my order has not arrived and the tracking page shows an error",
+    "I can see the parcel left our warehouse yesterday",
+    "can you please check again, it was due on Monday",
+    "I have issued a replacement and emailed the label",
+    "great, that solves it, thank you",
+]
+NOISE = [
+    "call me at 10:{m:02d} tomorrow", "see https://help.example.com/a{n}", "Ref{n}: pending",
+    "Note{n}: escalated", "ticket ID{n}: open", "at {h}:{m:02d} pm", "Order {n}: shipped",
+]
+
+
+# ---------------- CORPUS ----------------
+
+def generate(fmt: str, size_bytes: int, seed: int = 7) -> str:
+    rng, parts, total, turn = random.Random(seed), [], 0, 0
+    sep = "\n" if fmt == "lines" else " "
+    while total < size_bytes:
+        speaker = AGENTS[turn % len(AGENTS)] if turn % 2 == 0 else CUSTOMERS[turn % len(CUSTOMERS)]
+        msg = rng.choice(PHRASES)
+        if fmt == "inline-noisy":
+            n = rng.randint(1, 5000)
+            msg += " " + rng.choice(NOISE).format(n=n, h=rng.randint(1, 12), m=rng.randint(0, 59))
+        piece = f"{speaker}: {msg}{sep}"
+        parts.append(piece)
+        total += len(piece)
+        turn  += 1
+    return "".join(parts)
+
+
+# ---------------- REFERENCE (previous regex parser) ----------------
+
+def reference_parse(text):
+    lines = text.strip().split('\n')
+    turns = []
+    speaker_line = re.compile(r'^([A-Za-z][A-Za-z0-9_ ]{1,40}?)\s*:\s*(.+)$')
+    if len(lines) > 1:
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            m = speaker_line.match(line)
+            if m:
+                name, msg = m.group(1).strip(), m.group(2).strip()
+                if name and msg:
+                    turns.append({"speaker": name, "text": msg})
+    if not turns:
+        speaker_pattern = re.compile(r'\b([A-Za-z][A-Za-z0-9 ]{1,39}?)\s*:')
+        counts = Counter(c.strip() for c in speaker_pattern.findall(text) if len(c.strip()) > 1)
+        if counts:
+            speakers  = sorted(counts.keys(), key=len, reverse=True)
+            split_pat = re.compile(r'(' + '|'.join(re.escape(s) for s in speakers) + r')\s*:')
+            parts = split_pat.split(text)
+            i = 1
+            while i < len(parts) - 1:
+                speaker, msg = parts[i].strip(), parts[i + 1].strip()
+                if speaker in speakers and msg:
+                    turns.append({"speaker": speaker, "text": msg})
+                i += 2
+    return turns
+
+
+def fuzz(iterations: int, seed: int = 11) -> int:
+    """Random short inputs built from tricky tokens; returns the number of mismatches."""
+    tokens = ["Ann", ":", "Ann Lee", "Bob", " ", "  ", "\t", "\n", "xBob", "_Bob", "12:30",
+              "http://x.y", "hi", "help me", "é", "Ünal", "a", "B", ": ", "Mr Bob", "Bob ", "."]
+    rng, bad = random.Random(seed), 0
+    for _ in range(iterations):
+        text = "".join(rng.choice(tokens) for _ in range(rng.randint(0, 40)))
+        if chat_parser.parse_chat_to_turns(text) != reference_parse(text):
+            bad += 1
+            if bad <= 3:
+                print(f"  mismatch: {text!r}")
+    return bad
+
+
+# ---------------- TIMING ----------------
+
+def time_parse(parse, text: str) -> tuple:
+    start = time.perf_counter()
+    turns = chat_parser.format_chat_for_ui(parse(text))
+    return time.perf_counter() - start, len(turns)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="1,10,100", help="corpus sizes in MB")
+    parser.add_argument("--formats", default=",".join(FORMATS))
+    parser.add_argument("--reference", action="store_true",
+                        help="also time the previous regex parser (slow on noisy inline input)")
+    parser.add_argument("--fuzz", type=int, default=0, help="random inputs to compare with the previous parser")
+    parser.add_argument("--write", default="", help="directory to save the generated corpus in")
+    args = parser.parse_args()
+
+    if args.fuzz:
+        bad = fuzz(args.fuzz)
+        print(f"fuzz: {bad} mismatches in {args.fuzz} inputs")
+        if bad:
+            sys.exit(1)
+
+    sizes = [float(s) for s in args.sizes.split(",") if s]
+    print(f"{'format':<14} {'MB':>6} {'turns':>10} {'seconds':>9} {'s/MB':>8}" + (f" {'ref s':>9}" if args.reference else ""))
+    for fmt in args.formats.split(","):
+        for mb in sizes:
+            text = generate(fmt, int(mb * 1024 * 1024))
+            if args.write:
+                os.makedirs(args.write, exist_ok=True)
+                with open(os.path.join(args.write, f"{fmt}_{mb:g}MB.txt"), "w", encoding="utf-8") as f:
+                    f.write(text)
+            seconds, turns = time_parse(chat_parser.parse_chat_to_turns, text)
+            line = f"{fmt:<14} {mb:>6g} {turns:>10} {seconds:>9.2f} {seconds / mb:>8.3f}"
+            if args.reference:
+                ref_seconds, _ = time_parse(reference_parse, text)
+                line += f" {ref_seconds:>9.2f}"
+            print(line, flush=True)
+            del text
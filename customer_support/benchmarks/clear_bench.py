@@ -0,0 +1,97 @@
+"""
+Latency of clearing a per-call result folder (generations.py) against
+emptying it in place (storage.clear_directory, the previous /clear-history),
+over --calls synthetic score JSONs shaped like scoring_server's. While each
+clear runs, --writers threads keep saving results into the folder the way
+scoring_server does (storage.write_json_in_dir); any write that fails is
+reported. The generation swap is then reclaimed in the background at
+RECLAIM_FILES_PER_SECOND, or --rate.
+
+    python benchmarks/clear_bench.py
+    python benchmarks/clear_bench.py --calls 1000,100000,1000000 --rate 0
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import export_bench
+import generations
+import storage
+
+
+class Writers:
+    """Threads saving small results into `directory` until stopped; counts writes and failures."""
+
+    def __init__(self, directory: str, n: int):
+        self.directory, self.writes, self.errors = directory, 0, []
+        self.stop    = threading.Event()
+        self.threads = [threading.Thread(target=self.run, args=(i,), daemon=True) for i in range(n)]
+
+    def run(self, i: int):
+        seq = 0
+        while not self.stop.is_set():
+            try:
+                storage.write_json_in_dir(self.directory, f"writer_{i}_{seq}.json", {"empathy": 7}, indent=4)
+                self.writes += 1
+            except Exception as e:
+                self.errors.append(repr(e))
+            seq += 1
+            time.sleep(0.001)
+
+    def __enter__(self):
+        for t in self.threads:
+            t.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop.set()
+        for t in self.threads:
+            t.join()
+
+
+def timed_clear(directory: str, clear, writers: int) -> tuple:
+    with Writers(directory, writers) as w:
+        time.sleep(0.2)
+        started = time.perf_counter()
+        clear(directory)
+        took = (time.perf_counter() - started) * 1000
+        time.sleep(0.2)
+    return took, w.writes, w.errors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", default="1000,100000", help="files in the folder, comma separated")
+    parser.add_argument("--writers", type=int, default=4, help="concurrent writer threads during each clear")
+    parser.add_argument("--rate", type=float, default=None, help="reclaim files/s (default RECLAIM_FILES_PER_SECOND)")
+    args = parser.parse_args()
+
+    print(f"{'calls':>9} {'in place ms':>11} {'errors':>6} {'swap ms':>8} {'errors':>6} {'writes':>7} "
+          f"{'reclaim s':>9} {'files/s':>8}")
+    for calls in [int(n) for n in args.calls.split(",") if n]:
+        root = tempfile.mkdtemp(prefix="clear-bench-")
+        try:
+            folder = os.path.join(root, "file_scores")
+            export_bench.build(folder, calls)
+            in_place, _, in_place_errors = timed_clear(folder, storage.clear_directory, args.writers)
+
+            export_bench.build(folder, calls)
+            swap, writes, swap_errors = timed_clear(folder, generations.swap, args.writers)
+            assert os.path.islink(folder) and len(os.listdir(folder)) < calls
+
+            started = time.perf_counter()
+            removed = generations.reclaim(folder, args.rate)
+            took    = time.perf_counter() - started
+            assert not generations.retired(folder)
+            print(f"{calls:>9} {in_place:>11.1f} {len(in_place_errors):>6} {swap:>8.2f} {len(swap_errors):>6} "
+                  f"{writes:>7} {took:>9.1f} {removed / max(took, 1e-9):>8.0f}", flush=True)
+            for error in (in_place_errors + swap_errors)[:3]:
+                print("    ", error)
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
@@ -0,0 +1,189 @@
+"""
+Compares the per-port deployment (four uvicorn processes) with the combined
+gateway.py deployment, both against local fake Deepgram / Groq upstreams
+(fake_upstreams.py) and from a scratch copy of the services:
+
+  - total RSS after startup and after the run
+  - end-to-end latency of the audit pipeline the UI drives for each upload
+    (upload -> transcript -> /analyze-quality -> /analyze), per step, for an
+    audio call (calls/*.m4a) and a text chat (chat.txt). Per port, scoring an
+    audio call waits 10 s for the transcript CSV; the gateway hands the
+    transcript over in memory.
+  - latency of the UI's read path (transcripts, history, scores, analysis)
+
+    python benchmarks/compare_modes.py --pipelines 5 --rounds 200
+    python benchmarks/compare_modes.py --deepgram-latency-ms 800 --groq-latency-ms 400
+"""
+import os
+import sys
+import time
+import json
+import shutil
+import argparse
+import statistics
+import subprocess
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bench_suite
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAKE_PORT   = 9120
+SESSION     = "compare"
+
+PER_PORT = {
+    "audio":   ("app.py",                           "http://127.0.0.1:8000"),
+    "chat":    ("chat_app.py",                      "http://127.0.0.1:8001"),
+    "emotion": ("Customer_Emotion_Satisfaction.py", "http://127.0.0.1:8002"),
+    "scoring": ("scoring_server.py",                "http://127.0.0.1:8003"),
+}
+GATEWAY = "http://127.0.0.1:8080"
+
+# What CenterPanel / Dashboard / RightSidebar fetch after an audit
+READ_PATH = [
+    ("audio",   "/get-transcript"),
+    ("chat",    "/get-text-transcript"),
+    ("audio",   "/history"),
+    ("chat",    "/history"),
+    ("audio",   "/get-summary"),
+    ("scoring", "/get-quality-scores"),
+    ("scoring", "/list-file-scores"),
+    ("emotion", "/health"),
+]
+
+# The UI's audit pipeline per upload kind: (upload service, route, transcript service, route)
+PIPELINES = {
+    "audio": ("audio", "/upload",      "audio", "/get-transcript"),
+    "text":  ("chat",  "/upload-text", "chat",  "/get-text-transcript"),
+}
+STEPS = ["upload", "transcript", "analyze_quality", "analyze", "total"]
+
+
+def rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def summarize(timings: list) -> dict:
+    timings = sorted(timings)
+    return {
+        "p50_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(timings[int(0.95 * (len(timings) - 1))], 2),
+        "mean_ms": round(statistics.fmean(timings), 2),
+    }
+
+
+# ---------------- PIPELINE ----------------
+
+def fixtures() -> dict:
+    def read(path):
+        with open(path, "rb") as f:
+            return os.path.basename(path), f.read()
+    calls = sorted(os.listdir(os.path.join(SERVICE_DIR, "calls")))
+    return {"audio": read(os.path.join(SERVICE_DIR, "calls", calls[0])),
+            "text":  read(os.path.join(SERVICE_DIR, "chat.txt"))}
+
+
+def run_pipeline(client: httpx.Client, bases: dict, kind: str, name: str, data: bytes) -> dict:
+    """One upload through scoring and emotion analysis, as CenterPanel / RightSidebar do it; ms per step."""
+    upload_service, upload_path, transcript_service, transcript_path = PIPELINES[kind]
+    took, started = {}, time.perf_counter()
+
+    def step(label, request):
+        t0  = time.perf_counter()
+        res = request()
+        res.raise_for_status()
+        took[label] = (time.perf_counter() - t0) * 1000
+        return res
+
+    step("upload", lambda: client.post(bases[upload_service] + upload_path, files={"file": (name, data)}))
+    rows = step("transcript", lambda: client.get(bases[transcript_service] + transcript_path)).json()
+    text = "\n".join(f"{row.get('speaker', '')}: {row.get('text', '')}" for row in rows)
+    blob = "audio_transcript.txt" if kind == "audio" else name
+    step("analyze_quality", lambda: client.post(bases["scoring"] + "/analyze-quality",
+                                                files={"file": (blob, text.encode("utf-8"))},
+                                                data={"original_filename": name}))
+    step("analyze", lambda: client.post(bases["emotion"] + "/analyze", json={"source": kind}))
+    took["total"] = (time.perf_counter() - started) * 1000
+    return took
+
+
+def measure(bases: dict, pipelines: int, rounds: int) -> dict:
+    out = {}
+    with httpx.Client(timeout=300, headers={"X-Session-Id": SESSION}) as client:
+        for kind, (name, data) in fixtures().items():
+            runs = [run_pipeline(client, bases, kind, name, data) for _ in range(pipelines)]
+            out[f"pipeline_{kind}"] = {label: summarize([run[label] for run in runs]) for label in STEPS}
+        timings = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for service, path in READ_PATH:
+                client.get(bases[service] + path)      # a 404 ("no analysis yet") still measures the round trip
+            timings.append((time.perf_counter() - start) * 1000)
+        out["read_path"] = summarize(timings)
+    return out
+
+
+# ---------------- MODES ----------------
+
+def environment(args) -> dict:
+    return dict(
+        os.environ,
+        DEEPGRAM_API_KEY="bench", GROQ_API_KEY="bench",
+        DEEPGRAM_BASE_URL=f"http://127.0.0.1:{FAKE_PORT}",
+        GROQ_BASE_URL=f"http://127.0.0.1:{FAKE_PORT}",
+        FAKE_DEEPGRAM_LATENCY_MS=str(args.deepgram_latency_ms),
+        FAKE_GROQ_LATENCY_MS=str(args.groq_latency_ms),
+        LOG_LEVEL="WARNING",
+    )
+
+
+def run_mode(mode: str, args) -> dict:
+    env     = environment(args)
+    workdir = bench_suite.prepare_workdir()
+    if mode == "per-port":
+        commands = [[sys.executable, script] for script, _ in PER_PORT.values()]
+        bases    = {name: base for name, (_, base) in PER_PORT.items()}
+        ready    = [base + "/docs" for base in bases.values()]
+    else:
+        commands = [[sys.executable, "gateway.py"]]
+        bases    = {name: f"{GATEWAY}/{name}" for name in PER_PORT}
+        ready    = [GATEWAY + "/health"]
+    fake  = subprocess.Popen([sys.executable, os.path.join(bench_suite.BENCH_DIR, "fake_upstreams.py"),
+                              "--port", str(FAKE_PORT)], env=env,
+                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    procs = [subprocess.Popen(command, cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+             for command in commands]
+    try:
+        bench_suite.wait_until_up(f"http://127.0.0.1:{FAKE_PORT}/fake/stats")
+        for url in ready:
+            bench_suite.wait_until_up(url)
+        idle_rss = sum(rss_mb(p.pid) for p in procs)
+        results  = measure(bases, args.pipelines, args.rounds)
+        return {"mode": mode, "processes": len(procs),
+                "idle_rss_mb": round(idle_rss, 1),
+                "rss_after_mb": round(sum(rss_mb(p.pid) for p in procs), 1),
+                **results}
+    finally:
+        for p in procs + [fake]:
+            p.terminate()
+        for p in procs + [fake]:
+            p.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pipelines", type=int, default=3, help="audits per upload kind")
+    parser.add_argument("--rounds", type=int, default=100, help="read path rounds")
+    parser.add_argument("--deepgram-latency-ms", type=float, default=0)
+    parser.add_argument("--groq-latency-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    results = [run_mode("per-port", args), run_mode("gateway", args)]
+    print(json.dumps(results, indent=2))
@@ -0,0 +1,105 @@
+"""
+Throughput and memory of the /export stream (audit_export.stream) over
+--calls synthetic per-file score JSONs (default 1,000,000) shaped like
+scoring_server's responses. Reports rows/s, output size and the peak RSS
+growth while streaming, per format; the score files are built once in --dir.
+
+    python benchmarks/export_bench.py
+    python benchmarks/export_bench.py --calls 100000 --dir /tmp/small_scores --rebuild --formats csv,ndjson
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+REASONS = ["The agent greeted the customer warmly and verified the account before explaining the refund policy. "
+           "Verification was completed, but the closing lacked a recap. The issue was resolved on the call.",
+           "The agent skipped identity verification and did not acknowledge the customer's frustration. "
+           "The billing problem was escalated without a clear follow-up time."]
+
+
+def build(directory: str, calls: int, seed: int = 7):
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    day = time.mktime((2026, 1, 1, 0, 0, 0, 0, 0, -1))
+    for i in range(calls):
+        score = lambda: rng.randint(1, 10)
+        saved = day + i * (365 * 86400 / calls)
+        data  = {
+            "empathy": score(), "compliance": score(), "resolution": score(),
+            "reasoning": rng.choice(REASONS),
+            "empathy_timeline":    [{"stage": s, "score": score()} for s in ("Opening", "Mid-Call", "Issue", "Closing")],
+            "compliance_steps":    [{"step": s, "score": score()} for s in ("Greeting", "Verification", "Process", "Closing")],
+            "resolution_progress": [{"stage": s, "score": score()}
+                                    for s in ("Issue Raised", "Diagnosed", "Action Taken", "Resolved")],
+            "fairness_scores": {k: score() for k in ("name_neutrality", "language_neutrality",
+                                                     "tone_consistency", "equal_effort")},
+            "efficiency_score": rng.randint(1, 5), "total_messages": rng.randint(4, 80),
+            "names_anonymized": ["Lauren", "John"][:rng.randint(0, 2)], "bias_reduction_applied": True,
+            "rubric_version": "v1", "original_filename": f"call_{i:07d}.wav",
+            "saved_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(saved)),
+        }
+        path = os.path.join(directory, f"call_{i:07d}_wav.json")
+        with open(path, "w") as f:
+            json.dump(data, f, indent=4)
+        os.utime(path, (saved, saved))
+        if (i + 1) % 100000 == 0:
+            print(f"  wrote {i + 1} files", flush=True)
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=1_000_000)
+    parser.add_argument("--dir", default="/tmp/export_bench_scores")
+    parser.add_argument("--rebuild", action="store_true")
+    parser.add_argument("--formats", default="csv,ndjson,parquet")
+    parser.add_argument("--start", help="also time a date-range export, e.g. 2026-12-01")
+    args = parser.parse_args()
+
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    import audit_export
+    import scoring_server
+
+    if args.rebuild or not os.path.isdir(args.dir):
+        shutil.rmtree(args.dir, ignore_errors=True)
+        started = time.perf_counter()
+        build(args.dir, args.calls)
+        print(f"build: {time.perf_counter() - started:.0f} s")
+
+    runs = [(fmt, None) for fmt in args.formats.split(",") if fmt]
+    if args.start:
+        runs.append((runs[0][0], args.start))
+    print(f"{'format':<8} {'range':<12} {'rows':>9} {'seconds':>8} {'rows/s':>8} {'MB out':>7} {'peak RSS +MB':>12}")
+    for fmt, start in runs:
+        if fmt == "parquet" and not audit_export.parquet_available():
+            print(f"{fmt:<8} skipped (pyarrow not installed)")
+            continue
+        if fmt == "parquet":
+            import pyarrow.parquet  # noqa: F401  (import cost is not streaming memory)
+        low, high = audit_export.parse_range(start, None)
+        base, peak, size, chunks = rss_mb(), 0.0, 0, 0
+        started = time.perf_counter()
+        for chunk in audit_export.stream(args.dir, fmt, scoring_server.build_empty_response(), low, high):
+            size   += len(chunk)
+            chunks += 1
+            if chunks % 50 == 0:
+                peak = max(peak, rss_mb() - base)
+        took = time.perf_counter() - started
+        peak = max(peak, rss_mb() - base)
+        # rows: every file in range (the benchmark spreads saved_at evenly over 2026)
+        rows = sum(1 for _ in audit_export.iter_results(args.dir, low, high)) if start else args.calls
+        print(f"{fmt:<8} {start or 'all':<12} {rows:>9} {took:>8.1f} {rows / took:>8.0f} "
+              f"{size / 2**20:>7.0f} {peak:>12.1f}", flush=True)
@@ -0,0 +1,260 @@
+"""
+Local stand-ins for the Deepgram and Groq APIs, so benchmarks cost no API
+credits and see no network jitter except the latency configured here.
+
+    python benchmarks/fake_upstreams.py --port 9100 --deepgram-latency-ms 800 --groq-latency-ms 400
+
+Then start a service with
+    DEEPGRAM_BASE_URL=http://127.0.0.1:9100 GROQ_BASE_URL=http://127.0.0.1:9100
+
+Served routes:
+    POST /v1/listen                      Deepgram prerecorded (diarized words + summary v2);
+                                         WAV bodies of tone bursts (long_audio_bench.py) are
+                                         "recognized": one word per burst, speaker by pitch
+    POST /v1/read                        Deepgram text intelligence summarize
+    POST /openai/v1/chat/completions     Groq chat completions (scoring / emotion / satisfaction)
+    GET  /fake/stats                     request and injected-error counts
+"""
+import io
+import os
+import csv
+import glob
+import json
+import time
+import wave
+import random
+import asyncio
+import argparse
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# ---------------- CONFIG ----------------
+# Every knob can also be set from the environment, which is how bench_suite.py
+# starts this server as a subprocess.
+DEEPGRAM_LATENCY_MS = float(os.getenv("FAKE_DEEPGRAM_LATENCY_MS", "0"))
+GROQ_LATENCY_MS     = float(os.getenv("FAKE_GROQ_LATENCY_MS", "0"))
+JITTER_MS           = float(os.getenv("FAKE_JITTER_MS", "0"))
+ERROR_RATE          = float(os.getenv("FAKE_ERROR_RATE", "0"))
+SEED                = int(os.getenv("FAKE_SEED", "7"))
+# Requests served at once; the rest queue, so latency grows under bursts like a
+# saturated real API (0 = unlimited)
+CAPACITY            = int(os.getenv("FAKE_CAPACITY", "0"))
+# Extra /v1/listen latency per second of audio, so long recordings take longer
+LISTEN_MS_PER_AUDIO_SECOND = float(os.getenv("FAKE_LISTEN_MS_PER_AUDIO_SECOND", "0"))
+
+# m4a / mp3 at ~64 kbit/s; only used to decide how long the fake call is
+AUDIO_BYTES_PER_SECOND = 8000
+
+# Synthetic voices: a tone burst at one of these pitches is one spoken word
+VOICE_HZ    = (220.0, 440.0, 660.0)
+VOICE_WORDS = ("alpha", "bravo", "charlie")
+
+_rng   = random.Random(SEED)
+_stats = {"requests": {}, "errors": {}}
+_slots = None
+
+app = FastAPI()
+
+
+# ---------------- FIXTURE TRANSCRIPT ----------------
+
+def _load_turns() -> list:
+    """Speaker turns from session_history/*.csv, used as the 'recognized' speech."""
+    turns = []
+    for path in sorted(glob.glob(os.path.join(SERVICE_DIR, "session_history", "*.csv"))):
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                try:
+                    start, end = float(row["start"]), float(row["end"])
+                except (KeyError, ValueError):
+                    continue
+                speaker = 0 if row.get("speaker", "").endswith("0") else 1
+                turns.append((speaker, row.get("text", ""), max(end - start, 0.1)))
+    return turns or [(0, "Thank you for calling, how can I help you today", 3.0),
+                     (1, "Hi, I would like to check on my order please", 3.0)]
+
+
+TURNS = _load_turns()
+
+
+def build_words(duration: float) -> list:
+    """Repeats the fixture turns until `duration` seconds of diarized words exist."""
+    words, clock, i = [], 0.0, 0
+    while clock < duration:
+        speaker, text, length = TURNS[i % len(TURNS)]
+        tokens = text.split() or ["..."]
+        step   = length / len(tokens)
+        for token in tokens:
+            words.append({
+                "word": token.lower().strip(".,?!"), "punctuated_word": token,
+                "start": round(clock, 2), "end": round(clock + step, 2),
+                "confidence": 0.98, "speaker": speaker, "speaker_confidence": 0.9,
+            })
+            clock += step
+        i += 1
+    return words
+
+
+def recognize_wav(body: bytes):
+    """
+    (duration, words) for a WAV of tone bursts. Speaker labels are given in
+    order of first appearance within this request, like real diarization,
+    so the same voice can get different labels in different segments.
+    """
+    with wave.open(io.BytesIO(body)) as w:
+        rate     = w.getframerate()
+        samples  = np.frombuffer(w.readframes(w.getnframes()), dtype=np.int16).astype(np.float32)
+    hop     = rate // 50                                  # 20 ms frames
+    frames  = samples[: len(samples) - len(samples) % hop].reshape(-1, hop)
+    voiced  = np.sqrt(np.mean(frames * frames, axis=1)) > 1000
+    edges   = np.flatnonzero(np.diff(np.concatenate(([0], voiced.astype(np.int8), [0]))))
+    labels, words = {}, []
+    for a, b in zip(edges[::2], edges[1::2]):
+        burst    = samples[a * hop:b * hop]
+        spectrum = np.abs(np.fft.rfft(burst))
+        pitch    = np.argmax(spectrum) * rate / len(burst)
+        voice    = int(np.argmin([abs(pitch - hz) for hz in VOICE_HZ]))
+        speaker  = labels.setdefault(voice, len(labels))
+        words.append({
+            "word": VOICE_WORDS[voice], "punctuated_word": VOICE_WORDS[voice],
+            "start": round(a * hop / rate, 3), "end": round(b * hop / rate, 3),
+            "confidence": 0.98, "speaker": speaker, "speaker_confidence": 0.9,
+        })
+    return len(samples) / rate, words
+
+
+# ---------------- LATENCY / ERROR INJECTION ----------------
+
+async def simulate(route: str, base_ms: float):
+    """Sleeps for the configured latency; returns an error response when one is injected."""
+    _stats["requests"][route] = _stats["requests"].get(route, 0) + 1
+    delay = base_ms + (_rng.uniform(-JITTER_MS, JITTER_MS) if JITTER_MS else 0)
+    if CAPACITY:
+        global _slots
+        _slots = _slots or asyncio.Semaphore(CAPACITY)
+        async with _slots:
+            await asyncio.sleep(max(delay, 0) / 1000)
+    elif delay > 0:
+        await asyncio.sleep(delay / 1000)
+    if ERROR_RATE and _rng.random() < ERROR_RATE:
+        _stats["errors"][route] = _stats["errors"].get(route, 0) + 1
+        status = _rng.choice((429, 500, 503))
+        return JSONResponse(status_code=status, content={"err_msg": f"injected {status}"})
+    return None
+
+
+# ---------------- DEEPGRAM ----------------
+
+@app.post("/v1/listen")
+async def listen(request: Request):
+    body = await request.body()
+    if body[:4] == b"RIFF" and body[8:12] == b"WAVE":
+        duration, words = await asyncio.to_thread(recognize_wav, body)
+    else:
+        duration = max(len(body) / AUDIO_BYTES_PER_SECOND, 5.0)
+        words    = build_words(duration)
+    error = await simulate("deepgram.listen", DEEPGRAM_LATENCY_MS + duration * LISTEN_MS_PER_AUDIO_SECOND)
+    if error:
+        return error
+
+    text     = " ".join(w["punctuated_word"] for w in words)
+    return {
+        "metadata": {
+            "request_id": f"fake-{time.time_ns()}", "created": time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "duration": duration, "channels": 1, "models": ["nova-2"],
+        },
+        "results": {
+            "channels": [{"alternatives": [{"transcript": text, "confidence": 0.98, "words": words}]}],
+            "summary":  {"result": "success", "short": " ".join(text.split()[:40])},
+        },
+    }
+
+
+@app.post("/v1/read")
+async def read(request: Request):
+    payload = await request.json()
+    error   = await simulate("deepgram.read", DEEPGRAM_LATENCY_MS)
+    if error:
+        return error
+    text = payload.get("text", "")
+    return {
+        "metadata": {"request_id": f"fake-{time.time_ns()}"},
+        "results":  {"summary": {"text": " ".join(text.split()[:60])}},
+    }
+
+
+# ---------------- GROQ ----------------
+
+def _scores(seed: int) -> dict:
+    rng   = random.Random(seed)
+    score = lambda: rng.randint(5, 9)
+    return {
+        "empathy": score(), "compliance": score(), "resolution": score(),
+        "reasoning": "Synthetic benchmark response. " * 6,
+        "empathy_timeline":    [{"stage": s, "score": score()} for s in ("Opening", "Mid-Call", "Issue", "Closing")],
+        "compliance_steps":    [{"step": s, "score": score()} for s in ("Greeting", "Verification", "Process", "Closing")],
+        "resolution_progress": [{"stage": s, "score": score()} for s in ("Issue Raised", "Diagnosed", "Action Taken", "Resolved")],
+        "fairness_scores": {k: score() for k in ("name_neutrality", "language_neutrality", "tone_consistency", "equal_effort")},
+    }
+
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    payload = await request.json()
+    error   = await simulate("groq.chat", GROQ_LATENCY_MS)
+    if error:
+        return error
+
+    messages = payload.get("messages", [])
+    system   = next((m["content"] for m in messages if m.get("role") == "system"), "")
+    user     = next((m["content"] for m in messages if m.get("role") == "user"), "")
+
+    if payload.get("response_format", {}).get("type") == "json_object":
+        content = json.dumps(_scores(len(user)))
+    elif "EMOTION:" in system:
+        content = "EMOTION: Satisfied\nCONFIDENCE: 85%\nREASON: Customer thanked the agent at the end."
+    elif "SCORE:" in system:
+        content = "SCORE: 80\nSTATUS: Satisfied\nREASON: Request was completed without complaints."
+    else:
+        content = "OK"
+
+    prompt_tokens     = (len(system) + len(user)) // 4
+    completion_tokens = len(content) // 4
+    return {
+        "id": f"chatcmpl-fake-{time.time_ns()}", "object": "chat.completion",
+        "created": int(time.time()), "model": payload.get("model", "fake"),
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": content}}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                  "total_tokens": prompt_tokens + completion_tokens},
+    }
+
+
+@app.get("/fake/stats")
+async def fake_stats():
+    return _stats
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake Deepgram + Groq upstreams")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--deepgram-latency-ms", type=float, default=DEEPGRAM_LATENCY_MS)
+    parser.add_argument("--groq-latency-ms", type=float, default=GROQ_LATENCY_MS)
+    parser.add_argument("--jitter-ms", type=float, default=JITTER_MS)
+    parser.add_argument("--error-rate", type=float, default=ERROR_RATE)
+    parser.add_argument("--capacity", type=int, default=CAPACITY)
+    parser.add_argument("--listen-ms-per-audio-second", type=float, default=LISTEN_MS_PER_AUDIO_SECOND)
+    args = parser.parse_args()
+
+    DEEPGRAM_LATENCY_MS = args.deepgram_latency_ms
+    GROQ_LATENCY_MS     = args.groq_latency_ms
+    JITTER_MS           = args.jitter_ms
+    ERROR_RATE          = args.error_rate
+    CAPACITY            = args.capacity
+    LISTEN_MS_PER_AUDIO_SECOND = args.listen_ms_per_audio_second
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
@@ -0,0 +1,79 @@
+"""
+Latency of the summary history reads (summary_log.py) against parsing the
+whole CSV (the previous /history and /get-summary), over synthetic
+final_summaries.csv / text_summaries.csv logs of --rows rows each. Reports,
+per size: the latest summary, the first page of --limit rows, a page deep in
+the history, the merged audio + text page, and the one-off cost of indexing
+a log that has no index yet.
+
+    python benchmarks/history_bench.py
+    python benchmarks/history_bench.py --rows 1000,100000,1000000 --limit 50
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import storage
+import summary_log
+
+FIELDS  = ["file_name", "timestamp", "summary"]
+SUMMARY = ("The customer called about a delayed parcel. The agent confirmed the address, "
+           "apologized for the delay and issued a replacement with express shipping.")
+
+
+def build(path: str, rows: int, kind: str, seed: int):
+    """Plain CSV, written in one go (no index), timestamps one minute apart."""
+    rng, day = random.Random(seed), time.mktime((2026, 1, 1, 0, 0, 0, 0, 0, -1))
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        f.write(",".join(FIELDS) + "\r\n")
+        for i in range(rows):
+            stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(day + i * 60 + rng.randint(0, 59)))
+            f.write(f'call_{i}.{"wav" if kind == "audio" else "txt"},{stamp},"{SUMMARY}\r\nLine two {i}."\r\n')
+
+
+def best(fn, repeat: int = 5) -> float:
+    out = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - started) * 1000)
+    return min(out)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", default="1000,100000,1000000", help="rows per log")
+    parser.add_argument("--limit", type=int, default=20, help="page size")
+    args = parser.parse_args()
+
+    print(f"{'rows':>9} {'MB':>6} {'index ms':>9} {'latest ms':>9} {'page ms':>8} {'deep ms':>8} "
+          f"{'merged ms':>9} {'full parse ms':>13}")
+    for rows in [int(n) for n in args.rows.split(",") if n]:
+        directory = tempfile.mkdtemp(prefix="history-bench-")
+        try:
+            paths = {source: os.path.join(directory, os.path.basename(path))
+                     for source, path in summary_log.SOURCES.items()}
+            for seed, (source, path) in enumerate(paths.items()):
+                build(path, rows, source, seed)
+            started = time.perf_counter()
+            assert summary_log.count(paths["audio"]) == rows       # first read indexes the log
+            indexing = (time.perf_counter() - started) * 1000
+            summary_log.count(paths["text"])
+
+            latest = best(lambda: summary_log.latest(paths["audio"]))
+            page   = best(lambda: summary_log.page(paths["audio"], args.limit))
+            deep   = best(lambda: summary_log.page(paths["audio"], args.limit, rows // 2))
+            merged = best(lambda: summary_log.merged(args.limit, sources={
+                source: summary_log.local(path) for source, path in paths.items()}))
+            full   = best(lambda: storage.read_csv_rows(paths["audio"])[::-1], repeat=1 if rows > 100000 else 3)
+            mb     = os.path.getsize(paths["audio"]) / 2**20
+            print(f"{rows:>9} {mb:>6.1f} {indexing:>9.1f} {latest:>9.3f} {page:>8.3f} {deep:>8.3f} "
+                  f"{merged:>9.3f} {full:>13.1f}", flush=True)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,305 @@
+"""
+Concurrency sweep over the audit API with a traffic-weighted request mix.
+For every concurrency level it reports throughput and latency percentiles
+and, from each service's /metrics, how badly its event loop lagged while
+under load (auditor_event_loop_lag_seconds).
+
+    python benchmarks/load_sweep.py --start-stack                 # fakes + 4 services, sweep 1..32
+    python benchmarks/load_sweep.py --levels 1,4,16 --duration 20 # against services already running
+    python benchmarks/load_sweep.py --gateway http://127.0.0.1:8080 --out sweep.csv
+
+Loop lag is the delay between when a 50 ms timer should fire and when the
+loop actually runs it. Anything above ~100 ms means a handler did blocking
+work (sync I/O, time.sleep, CPU) on the event loop.
+"""
+import os
+import re
+import csv
+import sys
+import json
+import time
+import random
+import shutil
+import asyncio
+import argparse
+import statistics
+
+import httpx
+
+import bench_suite
+
+DEFAULT_BASES = {
+    "audio":   "http://127.0.0.1:8000",
+    "chat":    "http://127.0.0.1:8001",
+    "emotion": "http://127.0.0.1:8002",
+    "scoring": "http://127.0.0.1:8003",
+}
+
+# Relative weights from what the UI sends per audit: one upload, one scoring
+# and one analysis call, then the sidebar / dashboard polling history and scores.
+DEFAULT_MIX = {
+    "upload":           3,
+    "upload-text":      6,
+    "analyze-quality": 10,
+    "analyze":         10,
+    "history":         40,
+    "list-file-scores": 31,
+}
+
+BLOCKED_LAG_SECONDS = 0.1
+
+
+# ---------------- WORKLOAD ----------------
+
+def build_requests(fixtures: dict) -> dict:
+    """name -> (service, method, path, request-kwargs factory taking a Random)."""
+    audio, chats = fixtures["audio"], fixtures["chats"]
+
+    def upload_text(rng):
+        name, body = rng.choice(chats)
+        return {"files": {"file": (name, body)}}
+
+    def analyze_quality(rng):
+        name, body = rng.choice(chats)
+        return {"files": {"file": (name, body)}, "data": {"original_filename": name}}
+
+    requests = {
+        "upload-text":      ("chat",    "POST", "/upload-text",      upload_text),
+        "analyze-quality":  ("scoring", "POST", "/analyze-quality",  analyze_quality),
+        "analyze":          ("emotion", "POST", "/analyze",          lambda rng: {"json": {"source": rng.choice(("audio", "text"))}}),
+        "history":          (None,      "GET",  "/history",          lambda rng: {}),
+        "list-file-scores": ("scoring", "GET",  "/list-file-scores", lambda rng: {}),
+    }
+    if audio:
+        requests["upload"] = ("audio", "POST", "/upload",
+                              lambda rng: {"files": {"file": rng.choice(audio)}})
+    return requests
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in filter(None, text.split(",")):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+# ---------------- LOOP LAG (scraped from /metrics) ----------------
+
+_LAG_RE = re.compile(r'^auditor_event_loop_lag_seconds_(bucket|sum|count)\{service="([^"]+)"(?:,le="([^"]+)")?\} (\S+)$')
+
+
+async def scrape_lag(client: httpx.AsyncClient, bases: dict) -> dict:
+    """service -> {"buckets": {le: count}, "sum": s, "count": n}"""
+    snapshot = {}
+    for base in set(bases.values()):
+        try:
+            text = (await client.get(base + "/metrics", timeout=10)).text
+        except httpx.HTTPError:
+            continue
+        for line in text.splitlines():
+            m = _LAG_RE.match(line)
+            if not m:
+                continue
+            kind, service, le, value = m.groups()
+            entry = snapshot.setdefault(service, {"buckets": {}, "sum": 0.0, "count": 0.0})
+            if kind == "bucket":
+                entry["buckets"][le] = float(value)
+            else:
+                entry[kind] = float(value)
+    return snapshot
+
+
+def lag_delta(before: dict, after: dict) -> dict:
+    """Per-service lag during one level: mean, approximate p99 and samples over the blocking threshold."""
+    report = {}
+    for service, now in after.items():
+        prev    = before.get(service, {"buckets": {}, "sum": 0.0, "count": 0.0})
+        samples = now["count"] - prev["count"]
+        if samples <= 0:
+            continue
+        buckets = sorted(((float(le), now["buckets"][le] - prev["buckets"].get(le, 0.0))
+                          for le in now["buckets"]), key=lambda b: b[0])
+        p99 = next((le for le, cumulative in buckets if cumulative >= 0.99 * samples), float("inf"))
+        under_threshold = next((c for le, c in buckets if le >= BLOCKED_LAG_SECONDS), samples)
+        report[service] = {
+            "mean_ms":  round((now["sum"] - prev["sum"]) / samples * 1000, 2),
+            "p99_ms":   p99 * 1000 if p99 != float("inf") else None,
+            "blocked":  int(samples - under_threshold),
+            "samples":  int(samples),
+        }
+    return report
+
+
+# ---------------- SWEEP ----------------
+
+async def run_level(client, bases, requests, mix, concurrency: int, duration: float, seed: int) -> dict:
+    names    = [n for n in mix if n in requests]
+    weights  = [mix[n] for n in names]
+    deadline = time.perf_counter() + duration
+    timings  = {n: [] for n in names}
+    errors   = {n: 0 for n in names}
+
+    async def worker(wid: int):
+        rng = random.Random(seed * 1000 + wid)
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            service, method, path, factory = requests[name]
+            service = service or rng.choice(("audio", "chat"))
+            start = time.perf_counter()
+            try:
+                r = await client.request(method, bases[service] + path, **factory(rng))
+                if r.status_code >= 500 or r.status_code == 429:
+                    errors[name] += 1
+            except httpx.HTTPError:
+                errors[name] += 1
+            timings[name].append((time.perf_counter() - start) * 1000)
+
+    wall = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    wall = time.perf_counter() - wall
+
+    everything = sorted(t for values in timings.values() for t in values)
+    per_endpoint = {}
+    for name, values in timings.items():
+        values.sort()
+        per_endpoint[name] = {
+            "requests": len(values), "errors": errors[name],
+            "p50_ms": round(bench_suite.percentile(values, 50), 1),
+            "p95_ms": round(bench_suite.percentile(values, 95), 1),
+        }
+    return {
+        "concurrency":    concurrency,
+        "requests":       len(everything),
+        "errors":         sum(errors.values()),
+        "throughput_rps": round(len(everything) / wall, 2) if wall else 0.0,
+        "p50_ms":         round(bench_suite.percentile(everything, 50), 1),
+        "p95_ms":         round(bench_suite.percentile(everything, 95), 1),
+        "p99_ms":         round(bench_suite.percentile(everything, 99), 1),
+        "mean_ms":        round(statistics.fmean(everything), 1) if everything else 0.0,
+        "endpoints":      per_endpoint,
+    }
+
+
+def find_knee(levels: list):
+    """First level where adding concurrency stops buying throughput (<10%) but p95 still grows (>50%)."""
+    for prev, cur in zip(levels, levels[1:]):
+        if prev["throughput_rps"] and prev["p95_ms"]:
+            gain   = cur["throughput_rps"] / prev["throughput_rps"] - 1
+            growth = cur["p95_ms"] / prev["p95_ms"] - 1
+            if gain < 0.10 and growth > 0.50:
+                return prev["concurrency"]
+    return None
+
+
+async def sweep(args, bases: dict) -> list:
+    requests = build_requests(bench_suite.load_fixtures())
+    mix      = parse_mix(args.mix) if args.mix else DEFAULT_MIX
+    limits   = httpx.Limits(max_connections=max(args.levels) * 2)
+    results  = []
+    async with httpx.AsyncClient(timeout=120, limits=limits,
+                                 headers={"X-Session-Id": bench_suite.SESSION}) as client:
+        print(f"{'conc':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'err':>5}   loop lag mean/p99/blocked per service")
+        for level in args.levels:
+            before = await scrape_lag(client, bases)
+            result = await run_level(client, bases, requests, mix, level, args.duration, args.seed)
+            result["loop_lag"] = lag_delta(before, await scrape_lag(client, bases))
+            results.append(result)
+
+            lag = "  ".join(
+                f"{svc}:{v['mean_ms']:.0f}/{v['p99_ms'] if v['p99_ms'] is not None else '>10s'}/{v['blocked']}"
+                for svc, v in sorted(result["loop_lag"].items())
+            )
+            print(f"{level:>5} {result['throughput_rps']:>8.2f} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} "
+                  f"{result['p99_ms']:>8.1f} {result['errors']:>5}   {lag}", flush=True)
+            await asyncio.sleep(args.cooldown)
+    return results
+
+
+# ---------------- OUTPUT ----------------
+
+def write_csv(path: str, results: list):
+    services = sorted({svc for r in results for svc in r["loop_lag"]})
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["concurrency", "throughput_rps", "p50_ms", "p95_ms", "p99_ms", "errors"]
+                        + [f"{svc}_lag_mean_ms" for svc in services]
+                        + [f"{svc}_lag_blocked" for svc in services])
+        for r in results:
+            lag = r["loop_lag"]
+            writer.writerow([r["concurrency"], r["throughput_rps"], r["p50_ms"], r["p95_ms"], r["p99_ms"], r["errors"]]
+                            + [lag.get(svc, {}).get("mean_ms", "") for svc in services]
+                            + [lag.get(svc, {}).get("blocked", "") for svc in services])
+
+
+def plot(path: str, results: list):
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("matplotlib not installed; skipping plot (CSV / JSON still written)")
+        return
+    fig, ax = plt.subplots(figsize=(7, 4.5))
+    ax.plot([r["throughput_rps"] for r in results], [r["p95_ms"] for r in results], marker="o", label="p95")
+    ax.plot([r["throughput_rps"] for r in results], [r["p50_ms"] for r in results], marker="o", label="p50")
+    for r in results:
+        ax.annotate(str(r["concurrency"]), (r["throughput_rps"], r["p95_ms"]),
+                    textcoords="offset points", xytext=(4, 4), fontsize=8)
+    ax.set_xlabel("throughput (req/s)")
+    ax.set_ylabel("latency (ms)")
+    ax.set_title("Audit API: throughput vs latency by concurrency")
+    ax.legend()
+    fig.tight_layout()
+    fig.savefig(path)
+    print(f"Plot written to {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--levels", type=lambda s: [int(x) for x in s.split(",")], default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--duration", type=float, default=15, help="seconds per concurrency level")
+    parser.add_argument("--cooldown", type=float, default=1.0)
+    parser.add_argument("--mix", default="", help='e.g. "history=40,upload-text=6,analyze=10"')
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--gateway", default="", help="combined gateway base URL instead of per-port services")
+    parser.add_argument("--start-stack", action="store_true", help="launch fake upstreams + services (bench_suite ports)")
+    parser.add_argument("--deepgram-latency-ms", type=float, default=300)
+    parser.add_argument("--groq-latency-ms", type=float, default=200)
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--out", default="", help="CSV path; a .json and .png are written next to it")
+    args = parser.parse_args()
+
+    procs = workdir = None
+    if args.start_stack:
+        bases   = {name: f"http://127.0.0.1:{port}" for name, (_, port) in bench_suite.SERVICES.items()}
+        workdir = bench_suite.prepare_workdir()
+        procs   = bench_suite.start_stack(workdir, args)
+    elif args.gateway:
+        bases = {name: f"{args.gateway.rstrip('/')}/{name}" for name in DEFAULT_BASES}
+    else:
+        bases = DEFAULT_BASES
+
+    try:
+        results = asyncio.run(sweep(args, bases))
+    finally:
+        if procs:
+            bench_suite.stop_stack(procs)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    knee = find_knee(results)
+    print(f"\nSaturation point: concurrency {knee}" if knee else "\nNo saturation point within the swept levels")
+    blocked = {svc for r in results for svc, v in r["loop_lag"].items() if v["blocked"]}
+    if blocked:
+        print(f"Event loop blocked (> {BLOCKED_LAG_SECONDS * 1000:.0f} ms) in: {', '.join(sorted(blocked))}")
+
+    if args.out:
+        write_csv(args.out, results)
+        stem = os.path.splitext(args.out)[0]
+        with open(stem + ".json", "w", encoding="utf-8") as f:
+            json.dump({"levels": results, "knee": knee}, f, indent=2)
+        plot(stem + ".png", results)
+    else:
+        json.dump({"levels": results, "knee": knee}, sys.stdout, indent=2)
+        print()
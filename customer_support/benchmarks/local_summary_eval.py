@@ -0,0 +1,136 @@
+"""
+Speed and quality check for local_summarizer.py. Times the summarizer on the
+stored chats and on generated chats up to 200 KB, and compares its output
+with the Deepgram summaries already on disk (text_summaries.csv, whose
+source files are looked up next to it, and final_summaries.csv, which keeps
+the full text) using ROUGE-1 / ROUGE-L F1. A lead-3 baseline is printed for
+scale — both are extractive, Deepgram's summaries are abstractive, so the
+absolute numbers are low by construction.
+
+    python benchmarks/local_summary_eval.py
+    python benchmarks/local_summary_eval.py --runs 200 --show
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import statistics
+
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import local_summarizer
+from chat_parser_bench import generate
+
+TOKEN  = re.compile(r"[a-z0-9']+")
+SUFFIX = re.compile(r"(?:ing|ed|es|s)$")   # crude stemming, as ROUGE's own Porter option
+
+
+# ---------------- DATA ----------------
+
+def load_pairs() -> list:
+    """(name, source text, deepgram summary), one per distinct source text."""
+    pairs, seen = [], set()
+
+    history = os.path.join(BASE_DIR, "text_summaries.csv")
+    if os.path.exists(history):
+        for row in pd.read_csv(history).itertuples():
+            path = os.path.join(BASE_DIR, str(row.file_name))
+            if os.path.isfile(path):
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    pairs.append((f"{row.file_name} ({row.timestamp})", f.read(), str(row.summary)))
+
+    final = os.path.join(BASE_DIR, "final_summaries.csv")
+    if os.path.exists(final):
+        for row in pd.read_csv(final).dropna(subset=["text", "summary"]).itertuples():
+            if row.text in seen:
+                continue
+            seen.add(row.text)
+            pairs.append((str(row.file_name), str(row.text), str(row.summary)))
+    return pairs
+
+
+# ---------------- SCORING ----------------
+
+def tokens(text: str) -> list:
+    return [SUFFIX.sub("", t) for t in TOKEN.findall(text.lower()) if t not in local_summarizer.STOPWORDS]
+
+
+def rouge_1(candidate: list, reference: list) -> float:
+    if not candidate or not reference:
+        return 0.0
+    ref_counts = {}
+    for t in reference:
+        ref_counts[t] = ref_counts.get(t, 0) + 1
+    overlap = 0
+    for t in candidate:
+        if ref_counts.get(t, 0):
+            ref_counts[t] -= 1
+            overlap += 1
+    if not overlap:
+        return 0.0
+    p, r = overlap / len(candidate), overlap / len(reference)
+    return 2 * p * r / (p + r)
+
+
+def rouge_l(candidate: list, reference: list) -> float:
+    if not candidate or not reference:
+        return 0.0
+    prev = [0] * (len(reference) + 1)
+    for c in candidate:
+        cur = [0]
+        for j, r in enumerate(reference):
+            cur.append(prev[j] + 1 if c == r else max(prev[j + 1], cur[j]))
+        prev = cur
+    lcs = prev[-1]
+    if not lcs:
+        return 0.0
+    p, r = lcs / len(candidate), lcs / len(reference)
+    return 2 * p * r / (p + r)
+
+
+def lead_3(text: str) -> str:
+    return " ".join(local_summarizer.split_sentences(text)[:3])
+
+
+# ---------------- TIMING ----------------
+
+def median_ms(text: str, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        local_summarizer.summarize(text)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=50, help="timing runs per input")
+    parser.add_argument("--show", action="store_true", help="print the local and Deepgram summaries")
+    args = parser.parse_args()
+
+    pairs = load_pairs()
+    print(f"{'source':<42} {'chars':>8} {'ms':>7} {'R1':>6} {'RL':>6} {'lead R1':>8}")
+    r1s, rls, leads = [], [], []
+    for name, text, reference in pairs:
+        summary = local_summarizer.summarize(text)
+        ref     = tokens(reference)
+        r1, rl  = rouge_1(tokens(summary), ref), rouge_l(tokens(summary), ref)
+        lead    = rouge_1(tokens(lead_3(text)), ref)
+        r1s.append(r1); rls.append(rl); leads.append(lead)
+        print(f"{name[:42]:<42} {len(text):>8} {median_ms(text, args.runs):>7.2f} {r1:>6.3f} {rl:>6.3f} {lead:>8.3f}")
+        if args.show:
+            print(f"    local:    {summary}\n    deepgram: {reference}")
+    if pairs:
+        print(f"{'mean':<42} {'':>8} {'':>7} {statistics.mean(r1s):>6.3f} "
+              f"{statistics.mean(rls):>6.3f} {statistics.mean(leads):>8.3f}")
+
+    print(f"\n{'generated chat':<16} {'KB':>6} {'ms':>8}")
+    for kb in (2, 20, 200):
+        text = generate("lines", kb * 1024)
+        print(f"{'lines':<16} {kb:>6} {median_ms(text, max(5, args.runs // 5)):>8.2f}")
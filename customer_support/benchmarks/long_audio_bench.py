@@ -0,0 +1,145 @@
+"""
+Wall-clock benchmark and correctness check for long-audio mode (app.py).
+Synthesizes two-speaker "calls" of tone bursts (one burst = one word, pitch
+= speaker) from 5 to 90 minutes, sends them to the local Deepgram stand-in
+once as a single transcribe_file call and once through the silence-cut
+segment path, and reports wall time plus how well the stitched words match
+the ground truth: word recall, duplicated words at the cuts, and speaker
+accuracy after mapping labels to voices.
+
+    python benchmarks/long_audio_bench.py                       # 5,15,30,60,90 minutes
+    python benchmarks/long_audio_bench.py --minutes 30 --listen-ms-per-audio-second 20
+"""
+import io
+import os
+import sys
+import time
+import wave
+import random
+import argparse
+import subprocess
+
+import numpy as np
+
+BENCH_DIR   = os.path.dirname(os.path.abspath(__file__))
+SERVICE_DIR = os.path.dirname(BENCH_DIR)
+FAKE_PORT   = 9101
+RATE        = 8000
+
+
+# ---------------- SYNTHETIC CALLS ----------------
+
+def synthesize(minutes: float, seed: int = 3):
+    """(wav bytes, [(start, end, voice)]) for a call alternating between two voices."""
+    from fake_upstreams import VOICE_HZ
+    rng, words, clock, voice = random.Random(seed), [], 0.5, 0
+    total = minutes * 60
+    while clock < total - 5:
+        for _ in range(rng.randint(3, 14)):
+            length = rng.uniform(0.2, 0.5)
+            words.append((clock, clock + length, voice))
+            clock += length + rng.uniform(0.08, 0.2)
+        clock += rng.uniform(0.5, 2.5)       # pause between turns
+        voice  = 1 - voice
+
+    audio = np.zeros(int(total * RATE), dtype=np.float32)
+    audio += np.random.default_rng(seed).normal(0, 60, len(audio)).astype(np.float32)   # noise floor
+    for start, end, v in words:
+        a, b = int(start * RATE), int(end * RATE)
+        t    = np.arange(b - a, dtype=np.float32) / RATE
+        audio[a:b] += 8000 * np.sin(2 * np.pi * VOICE_HZ[v] * t)
+    out = io.BytesIO()
+    with wave.open(out, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(RATE)
+        w.writeframes(np.clip(audio, -32768, 32767).astype(np.int16).tobytes())
+    return out.getvalue(), words
+
+
+# ---------------- SCORING ----------------
+
+def score(words, truth) -> dict:
+    """Greedy match of recognized words to ground-truth words by start time."""
+    starts   = np.array([t[0] for t in truth])
+    matched  = {}
+    dupes    = 0
+    pairs    = []
+    for w in words:
+        i = int(np.argmin(np.abs(starts - w.start)))
+        if abs(starts[i] - w.start) > 0.05:
+            continue
+        if i in matched:
+            dupes += 1
+            continue
+        matched[i] = w
+        pairs.append((w.speaker, truth[i][2]))
+
+    # Map each stitched label to the voice it most often carries
+    votes = {}
+    for label, v in pairs:
+        votes.setdefault(label, {}).setdefault(v, 0)
+        votes[label][v] += 1
+    to_voice = {label: max(c, key=c.get) for label, c in votes.items()}
+    correct  = sum(to_voice[label] == v for label, v in pairs)
+    return {
+        "recall":   len(matched) / len(truth),
+        "dupes":    dupes,
+        "speakers": len(votes),
+        "speaker_acc": correct / len(pairs) if pairs else 0.0,
+    }
+
+
+# ---------------- RUN ----------------
+
+def start_fake(args):
+    env = dict(os.environ, FAKE_DEEPGRAM_LATENCY_MS=str(args.deepgram_latency_ms),
+               FAKE_LISTEN_MS_PER_AUDIO_SECOND=str(args.listen_ms_per_audio_second))
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(BENCH_DIR, "fake_upstreams.py"), "--port", str(FAKE_PORT)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    from bench_suite import wait_until_up
+    wait_until_up(f"http://127.0.0.1:{FAKE_PORT}/fake/stats")
+    return proc
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--minutes", default="5,15,30,60,90")
+    parser.add_argument("--deepgram-latency-ms", type=float, default=300)
+    parser.add_argument("--listen-ms-per-audio-second", type=float, default=10,
+                        help="fake processing time per second of audio")
+    parser.add_argument("--skip-single", action="store_true", help="only time the segmented path")
+    args = parser.parse_args()
+
+    os.environ.update(DEEPGRAM_API_KEY="bench", GROQ_API_KEY="bench", LOG_LEVEL="WARNING",
+                      DEEPGRAM_BASE_URL=f"http://127.0.0.1:{FAKE_PORT}")
+    sys.path[:0] = [SERVICE_DIR, BENCH_DIR]
+    import app
+    import audio_segments
+    fake = start_fake(args)
+
+    print(f"{'minutes':>7} {'segments':>8} {'single s':>9} {'segmented s':>12} {'recall':>7} "
+          f"{'dupes':>6} {'speakers':>8} {'spk acc':>8}")
+    try:
+        for minutes in [float(m) for m in args.minutes.split(",") if m]:
+            data, truth = synthesize(minutes)
+            with audio_segments.open_audio(data, "bench.wav") as source:
+                single = float("nan")
+                if not args.skip_single:
+                    start = time.perf_counter()
+                    app.deepgram_listen(data, timeout=(10, 600))
+                    single = time.perf_counter() - start
+
+                start = time.perf_counter()
+                words, _ = app.transcribe_long_audio(source, "bench.wav")
+                segmented = time.perf_counter() - start
+                plan = audio_segments.plan_segments(source.frame_energies(), source.duration,
+                                                    app.SEGMENT_SECONDS, app.SEGMENT_OVERLAP, app.SEGMENT_SEARCH)
+            s = score(words, truth)
+            print(f"{minutes:>7g} {len(plan):>8} {single:>9.2f} {segmented:>12.2f} {s['recall']:>7.3f} "
+                  f"{s['dupes']:>6} {s['speakers']:>8} {s['speaker_acc']:>8.3f}", flush=True)
+    finally:
+        fake.terminate()
+        fake.wait()
@@ -0,0 +1,68 @@
+"""
+Per-call report for audio_preprocess.py: bytes sent to Deepgram and audio
+seconds before / after pre-processing, the local CPU time it costs, and
+the transcription time it saves. Deepgram's processing time (and bill)
+scales with audio duration, so time saved is modeled as
+    removed seconds x --ms-per-audio-second + bytes saved / --uplink-mbit
+minus the pre-processing time; the upload share is what a slow office
+uplink sees, the duration share is measured on Deepgram's side.
+
+    python benchmarks/preprocess_report.py                  # every file in calls/
+    python benchmarks/preprocess_report.py path/to/a.m4a --uplink-mbit 20
+"""
+import os
+import sys
+import glob
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import audio_preprocess
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def report(path: str, ms_per_audio_second: float, uplink_mbit: float) -> dict:
+    with open(path, "rb") as f:
+        data = f.read()
+    start    = time.perf_counter()
+    prepared = audio_preprocess.prepare(data, path)
+    if prepared is None:
+        return {"file": os.path.basename(path), "error": "cannot decode (ffmpeg missing?)"}
+    body     = prepared.encoded()
+    cpu      = time.perf_counter() - start
+
+    removed  = prepared.original_seconds - prepared.seconds
+    upload   = (len(data) - len(body)) * 8 / (uplink_mbit * 1e6)
+    return {
+        "file":         os.path.basename(path),
+        "bytes_in":     len(data),
+        "bytes_sent":   len(body),
+        "seconds_in":   prepared.original_seconds,
+        "seconds_sent": prepared.seconds,
+        "pauses_cut":   len(prepared.offsets.processed) - 1,
+        "prep_s":       cpu,
+        "saved_s":      removed * ms_per_audio_second / 1000 + upload - cpu,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("files", nargs="*")
+    parser.add_argument("--ms-per-audio-second", type=float, default=30.0,
+                        help="Deepgram processing time per audio second (pre-recorded, nova-2)")
+    parser.add_argument("--uplink-mbit", type=float, default=10.0)
+    args = parser.parse_args()
+
+    files = args.files or sorted(glob.glob(os.path.join(SERVICE_DIR, "calls", "*")))
+    print(f"{'file':<14} {'bytes in':>10} {'bytes sent':>10} {'ratio':>6} {'audio s':>8} {'sent s':>7} "
+          f"{'cuts':>5} {'prep s':>7} {'saved s':>8}")
+    for path in files:
+        r = report(path, args.ms_per_audio_second, args.uplink_mbit)
+        if "error" in r:
+            print(f"{r['file']:<14} {r['error']}")
+            continue
+        print(f"{r['file']:<14} {r['bytes_in']:>10} {r['bytes_sent']:>10} {r['bytes_sent'] / r['bytes_in']:>6.2f} "
+              f"{r['seconds_in']:>8.1f} {r['seconds_sent']:>7.1f} {r['pauses_cut']:>5} {r['prep_s']:>7.2f} "
+              f"{r['saved_s']:>8.2f}")
@@ -0,0 +1,94 @@
+"""
+Latency of search_index.search() over a synthetic index of --turns
+transcript turns (default 1,000,000: 50k calls x 20 turns) plus one
+summary and one audit reasoning per call, built through the same
+index_transcript / index_summary / index_scores calls the services make.
+Reports build time, database size and p50 / p95 / max per query shape.
+
+    python benchmarks/search_bench.py                       # builds /tmp/search_bench.db once
+    python benchmarks/search_bench.py --turns 200000 --db /tmp/small.db --rebuild
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FILLER = ("okay so let me check that for you the account is showing a pending charge from last week "
+          "thank you for waiting I can see the order was shipped yesterday and should arrive soon "
+          "could you confirm the email address on file please one moment while I pull it up "
+          "sure no problem is there anything else I can help you with today").split()
+TOPICS = ["password reset", "refund request", "late delivery", "double charge", "cancel subscription",
+          "upgrade plan", "broken device", "address change", "promo code", "login error"]
+
+QUERIES = [
+    ("rare phrase",          {"q": '"password reset"'}),
+    ("rare phrase + filter", {"q": '"password reset"', "ranges": {"resolution": (None, 4)}}),
+    ("two words",            {"q": "pending shipped"}),
+    ("common word",          {"q": "account"}),
+    ("common + filter",      {"q": "account", "ranges": {"resolution": (None, 4), "empathy": (7, None)}}),
+    ("prefix",               {"q": "cancel*"}),
+    ("OR",                   {"q": "promo OR upgrade"}),
+    ("reasoning field",      {"q": "verification", "field": "reasoning"}),
+    ("filters only",         {"q": "", "ranges": {"resolution": (None, 2)}}),
+]
+
+
+def build(search_index, calls: int, turns_per_call: int, seed: int = 7):
+    import turns
+    rng = random.Random(seed)
+    for i in range(calls):
+        topic = rng.choice(TOPICS)
+        texts = []
+        for t in range(turns_per_call):
+            words = rng.sample(FILLER, rng.randint(6, 18))
+            if rng.random() < 0.08:
+                words.insert(rng.randrange(len(words)), topic)
+            texts.append(" ".join(words))
+        name = f"call_{i:06d}.wav"
+        search_index.index_transcript(name, "audio" if i % 3 else "text",
+                                      turns.Turns.from_texts([f"Speaker 0{t % 2}" for t in range(turns_per_call)], texts))
+        search_index.index_summary(name, "audio", f"Customer called about a {topic}.")
+        search_index.index_scores(name, {
+            "empathy": rng.randint(1, 10), "compliance": rng.randint(1, 10), "resolution": rng.randint(1, 10),
+            "efficiency_score": rng.randint(1, 10),
+            "reasoning": rng.choice(["Agent skipped identity verification.", "Resolved on first contact.",
+                                     "Customer left without a fix.", "Polite but slow."]),
+        })
+        if (i + 1) % 5000 == 0:
+            print(f"  indexed {i + 1} calls", flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=1_000_000)
+    parser.add_argument("--turns-per-call", type=int, default=20)
+    parser.add_argument("--db", default="/tmp/search_bench.db")
+    parser.add_argument("--rebuild", action="store_true")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ.update(SEARCH_DB=args.db, LOG_LEVEL="WARNING")
+    import search_index
+
+    if args.rebuild or not os.path.exists(args.db):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(args.db + suffix):
+                os.remove(args.db + suffix)
+        start = time.perf_counter()
+        build(search_index, args.turns // args.turns_per_call, args.turns_per_call)
+        print(f"build: {time.perf_counter() - start:.1f} s, "
+              f"{os.path.getsize(args.db) / 2**20:.0f} MB", flush=True)
+
+    print(f"{'query':<22} {'results':>7} {'p50 ms':>7} {'p95 ms':>7} {'max ms':>7}")
+    for label, kwargs in QUERIES:
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            out   = search_index.search(limit=20, **kwargs)
+            times.append((time.perf_counter() - start) * 1000)
+        times.sort()
+        print(f"{label:<22} {len(out['results']):>7} {times[len(times) // 2]:>7.1f} "
+              f"{times[int(len(times) * 0.95) - 1]:>7.1f} {times[-1]:>7.1f}", flush=True)
@@ -0,0 +1,101 @@
+"""
+similar_calls at scale: appends --calls synthetic anonymized transcripts
+(default 100,000, each about one of TOPICS plus shared filler) through
+similar_calls.add, then reports add throughput, similar() latency p50 / p95
+with and without a quality filter, resident memory and index size, and
+precision@10 (share of neighbours on the same topic as the query call).
+
+    python benchmarks/similar_bench.py                       # builds /tmp/similar_bench once
+    python benchmarks/similar_bench.py --calls 20000 --dir /tmp/small --rebuild
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FILLER = ("okay so let me check that for you the account is showing a pending charge from last week "
+          "thank you for waiting I can see the order was shipped yesterday and should arrive soon "
+          "could you confirm the email address on file please one moment while I pull it up "
+          "sure no problem is there anything else I can help you with today").split()
+TOPICS = {
+    "password": "password reset link expired locked out login code never arrived security question",
+    "refund":   "refund request return label money back credit card statement original payment",
+    "delivery": "late delivery tracking number courier package stuck warehouse delayed shipment",
+    "billing":  "double charge billed twice invoice overcharge duplicate payment dispute",
+    "cancel":   "cancel subscription renewal stop plan auto renew cancellation fee",
+    "device":   "broken device screen cracked warranty repair replacement unit",
+}
+
+
+def transcript(rng, topic: str) -> str:
+    vocab = TOPICS[topic].split()
+    lines = []
+    for t in range(rng.randint(8, 24)):
+        words = rng.sample(FILLER, rng.randint(5, 14))
+        for _ in range(rng.randint(0, 3)):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(vocab))
+        lines.append(f"Speaker 0{t % 2}: {' '.join(words)} [NAME]")
+    return "\n".join(lines)
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def percentiles(times: list) -> str:
+    times = sorted(times)
+    return f"p50 {times[len(times) // 2]:6.2f} ms   p95 {times[int(len(times) * 0.95) - 1]:6.2f} ms"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=100_000)
+    parser.add_argument("--dir", default="/tmp/similar_bench")
+    parser.add_argument("--rebuild", action="store_true")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ.update(SIMILAR_DIR=args.dir, LOG_LEVEL="WARNING")
+    import similar_calls
+
+    rng    = random.Random(7)
+    topics = [rng.choice(sorted(TOPICS)) for _ in range(args.calls)]
+    if args.rebuild or not os.path.exists(os.path.join(args.dir, "names.txt")):
+        shutil.rmtree(args.dir, ignore_errors=True)
+        start = time.perf_counter()
+        for i, topic in enumerate(topics):
+            scores = {k: rng.randint(1, 10) for k in similar_calls.SCORE_FIELDS}
+            similar_calls.add(f"call_{i:06d}.wav", transcript(rng, topic), scores)
+            if (i + 1) % 10000 == 0:
+                print(f"  added {i + 1} calls", flush=True)
+        took = time.perf_counter() - start
+        print(f"build: {took:.1f} s ({args.calls / took:.0f} calls/s, {took / args.calls * 1000:.2f} ms/add)")
+
+    size = sum(os.path.getsize(os.path.join(args.dir, name)) for name in os.listdir(args.dir))
+    print(f"index on disk: {size / 2**20:.0f} MB")
+
+    base  = rss_mb()
+    start = time.perf_counter()
+    similar_calls.similar("call_000000.wav")
+    print(f"first query (loads names + maps vectors): {(time.perf_counter() - start) * 1000:.0f} ms, "
+          f"RSS {base:.0f} -> {rss_mb():.0f} MB")
+
+    picks = rng.sample(range(args.calls), min(args.queries, args.calls))
+    for quality in (None, "good", "bad"):
+        times, hits, total = [], 0, 0
+        for i in picks:
+            start = time.perf_counter()
+            out   = similar_calls.similar(f"call_{i:06d}.wav", k=10, quality=quality)
+            times.append((time.perf_counter() - start) * 1000)
+            hits  += sum(topics[int(r["filename"][5:11])] == topics[i] for r in out)
+            total += len(out)
+        print(f"quality={str(quality):<5} {percentiles(times)}   precision@10 {hits / max(total, 1):.2f}")
+    print(f"RSS after queries: {rss_mb():.0f} MB")
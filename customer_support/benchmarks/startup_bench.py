@@ -0,0 +1,94 @@
+"""
+Cold-start profile of each service: time to import the module (what a new
+worker pays before it can accept requests) and resident memory once
+imported and idle, median of --runs fresh interpreters. --profile adds the
+slowest imports by cumulative time (python -X importtime).
+
+    python benchmarks/startup_bench.py
+    python benchmarks/startup_bench.py --runs 9 --profile 12
+    python benchmarks/startup_bench.py --json before.json       # save, then compare with --baseline
+    python benchmarks/startup_bench.py --baseline before.json
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+BENCH_DIR   = os.path.dirname(os.path.abspath(__file__))
+SERVICE_DIR = os.path.dirname(BENCH_DIR)
+SERVICES    = ["app", "chat_app", "Customer_Emotion_Satisfaction", "scoring_server", "job_queue", "gateway"]
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+__import__(sys.argv[1])
+took = time.perf_counter() - start
+with open("/proc/self/status") as f:
+    rss = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+heavy = sorted(m for m in ("pandas", "numpy", "groq", "deepgram", "dotenv", "requests", "httpx") if m in sys.modules)
+print(took * 1000, rss / 1024, ",".join(heavy))
+"""
+
+
+def env() -> dict:
+    return {**os.environ, "DEEPGRAM_API_KEY": "x", "GROQ_API_KEY": "x", "LOG_LEVEL": "WARNING",
+            "PYTHONDONTWRITEBYTECODE": "0"}
+
+
+def measure(module: str, runs: int) -> dict:
+    samples = []
+    for _ in range(runs + 1):               # first run warms the bytecode / page cache
+        out = subprocess.run([sys.executable, "-c", PROBE, module], cwd=SERVICE_DIR, env=env(),
+                             capture_output=True, text=True, check=True).stdout.split()
+        samples.append((float(out[0]), float(out[1]), out[2] if len(out) > 2 else ""))
+    samples = samples[1:]
+    return {
+        "import_ms": round(statistics.median(s[0] for s in samples), 1),
+        "rss_mb":    round(statistics.median(s[1] for s in samples), 1),
+        "heavy":     samples[-1][2],
+    }
+
+
+def profile(module: str, top: int) -> list:
+    """(cumulative ms, package) of the slowest imports made directly by the service module."""
+    err = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=SERVICE_DIR,
+                         env=env(), capture_output=True, text=True).stderr
+    totals = {}
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        name = name[1:]
+        if name.startswith("  ") and not name.startswith("   "):   # depth 1: two spaces per level
+            root = name.strip().split(".")[0]
+            totals[root] = totals.get(root, 0) + int(cumulative) / 1000
+    return sorted(((ms, name) for name, ms in totals.items()), reverse=True)[:top]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--profile", type=int, default=0, metavar="N", help="show the N slowest imports per service")
+    parser.add_argument("--json", help="save results to this file")
+    parser.add_argument("--baseline", help="compare against results saved with --json")
+    args = parser.parse_args()
+
+    baseline = json.load(open(args.baseline)) if args.baseline else {}
+    results  = {}
+    print(f"{'service':<30} {'import ms':>9} {'RSS MB':>7}  heavy modules loaded")
+    for module in SERVICES:
+        r = results[module] = measure(module, args.runs)
+        line = f"{module:<30} {r['import_ms']:>9.0f} {r['rss_mb']:>7.1f}  {r['heavy'] or '-'}"
+        if module in baseline:
+            b = baseline[module]
+            line += (f"\n{'':<30} {'was':>9} {'':>7}  {b['import_ms']:.0f} ms, {b['rss_mb']:.1f} MB "
+                     f"({1 - r['import_ms'] / b['import_ms']:.0%} faster, {b['rss_mb'] - r['rss_mb']:.1f} MB less)")
+        print(line, flush=True)
+        if args.profile:
+            for ms, name in profile(module, args.profile):
+                print(f"{'':<4}{ms:>8.1f} ms  {name}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,161 @@
+"""
+CPU time and allocations per 10k Deepgram words for turning a transcription
+into speaker turns and the transcript CSV: the old per-word loop +
+format_for_ui + pandas DataFrame.to_csv against turns.Turns (run-length
+grouping over arrays, one string buffer). Both paths must write the same CSV.
+
+Two tables: grouping alone on SDK-shaped word objects, then the whole path
+from the Deepgram response body (old: SDK PrerecordedResponse dataclasses,
+new: json.loads as app.deepgram_listen does), which is where the time went.
+
+    python benchmarks/turns_bench.py                      # 10k, 20k, 100k words
+    python benchmarks/turns_bench.py --words 50000 --repeat 5 --response-words 20000
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tracemalloc
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+import turns
+
+VOCAB = ("yes okay so the account payment card problem I can help you with that order refund "
+         "thanks please number email today week sorry check moment system issue").split()
+
+
+def synthetic_words(n: int, seed: int = 1) -> list:
+    rng, words, clock, speaker = random.Random(seed), [], 0.0, 0
+    while len(words) < n:
+        for _ in range(rng.randint(1, 40)):
+            w = rng.choice(VOCAB)
+            words.append(SimpleNamespace(word=w, punctuated_word=w, start=clock, end=clock + 0.3,
+                                         confidence=0.9, speaker=speaker, speaker_confidence=0.8))
+            clock += 0.35
+        speaker = 1 - speaker
+    return words[:n]
+
+
+# ---------------- OLD PATH (app.py before turns.py) ----------------
+
+def format_for_ui(dg_raw_data):
+    if not dg_raw_data:
+        return []
+    first_msg = dg_raw_data[0]['text'].lower()
+    if any(word in first_msg for word in ["help", "issue", "problem", "broken"]):
+        agent_label = "Speaker 1"
+    else:
+        agent_label = "Speaker 0"
+    refined_transcript = []
+    for d in dg_raw_data:
+        is_agent = d['speaker'] == agent_label
+        refined_transcript.append({
+            "speaker": "Speaker 00" if is_agent else "Speaker 01",
+            "text": d['text'],
+            "start": d['start']
+        })
+    return refined_transcript
+
+
+def old_path(words, out):
+    dg_raw = []
+    curr_spk = words[0].speaker
+    curr_start = words[0].start
+    curr_txt = []
+    for w in words:
+        if w.speaker == curr_spk:
+            curr_txt.append(w.word)
+        else:
+            dg_raw.append({"speaker": f"Speaker {curr_spk}", "text": " ".join(curr_txt), "start": curr_start})
+            curr_spk = w.speaker
+            curr_start = w.start
+            curr_txt = [w.word]
+    dg_raw.append({"speaker": f"Speaker {curr_spk}", "text": " ".join(curr_txt), "start": curr_start})
+    refined_data = format_for_ui(dg_raw)
+    pd.DataFrame(refined_data).to_csv(out, index=False, lineterminator="\n")
+    return refined_data
+
+
+def new_path(words, out):
+    refined_data = turns.Turns.from_deepgram(words).for_ui()
+    refined_data.write_csv(out)
+    return refined_data
+
+
+# ---------------- MEASURE ----------------
+
+def response_body(words) -> str:
+    fields = ("word", "start", "end", "confidence", "speaker", "speaker_confidence", "punctuated_word")
+    return json.dumps({
+        "metadata": {"request_id": "bench", "sha256": "", "created": "", "duration": words[-1].end,
+                     "channels": 1, "models": [], "model_info": {}},
+        "results": {"channels": [{"alternatives": [{
+            "transcript": "", "confidence": 0.9,
+            "words": [{k: getattr(w, k) for k in fields} for w in words],
+        }]}], "summary": {"result": "success", "short": "bench"}},
+    })
+
+
+def old_from_body(body, out):
+    from deepgram import PrerecordedResponse
+    return old_path(PrerecordedResponse.from_json(body).results.channels[0].alternatives[0].words, out)
+
+
+def new_from_body(body, out):
+    return new_path(json.loads(body)["results"]["channels"][0]["alternatives"][0]["words"], out)
+
+
+def measure(fn, words, repeat: int, n: int = None) -> tuple:
+    """(CPU ms, peak traced KB) per 10k words; CPU is the best of `repeat` untraced runs."""
+    cpu = []
+    for _ in range(repeat):
+        start = time.process_time()
+        fn(words, io.StringIO())
+        cpu.append(time.process_time() - start)
+    tracemalloc.start()
+    fn(words, io.StringIO())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    scale = 10000 / (n or len(words))
+    return min(cpu) * 1000 * scale, peak / 1024 * scale
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--words", default="10000,20000,100000")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--response-words", type=int, default=10000,
+                        help="size of the response-body comparison (the SDK path takes ~0.25 ms per word)")
+    args = parser.parse_args()
+
+    print(f"{'words':>7} {'turns':>6} {'old ms/10k':>10} {'new ms/10k':>10} {'speedup':>8} "
+          f"{'old KB/10k':>10} {'new KB/10k':>10}")
+    for n in [int(x) for x in args.words.split(",") if x]:
+        words = synthetic_words(n)
+        a, b = io.StringIO(), io.StringIO()
+        grouped = new_path(words, b)
+        old_path(words, a)
+        assert a.getvalue() == b.getvalue(), "CSV output differs"
+        old_ms, old_kb = measure(old_path, words, args.repeat)
+        new_ms, new_kb = measure(new_path, words, args.repeat)
+        print(f"{n:>7} {len(grouped):>6} {old_ms:>10.2f} {new_ms:>10.2f} {old_ms / new_ms:>7.1f}x "
+              f"{old_kb:>10.0f} {new_kb:>10.0f}", flush=True)
+
+    n    = args.response_words
+    body = response_body(synthetic_words(n))
+    a, b = io.StringIO(), io.StringIO()
+    old_from_body(body, a)
+    new_from_body(body, b)
+    assert a.getvalue() == b.getvalue(), "CSV output differs"
+    old_ms, old_kb = measure(old_from_body, body, 1, n)
+    new_ms, new_kb = measure(new_from_body, body, args.repeat, n)
+    print(f"\nfrom the response body ({n} words, {len(body) // 1024} KB JSON)")
+    print(f"{'old ms/10k':>10} {'new ms/10k':>10} {'speedup':>8} {'old KB/10k':>10} {'new KB/10k':>10}")
+    print(f"{old_ms:>10.1f} {new_ms:>10.1f} {old_ms / new_ms:>7.0f}x {old_kb:>10.0f} {new_kb:>10.0f}")
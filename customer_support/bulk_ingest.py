@@ -0,0 +1,330 @@
+"""
+Bulk import of historical chat logs. Reads a zip, a directory or a JSONL
+file, parses and formats every chat in a process pool (chat_parser), and
+writes one folder per conversation instead of overwriting text_transcript.csv:
+
+    <out>/<conversation id>/transcript.csv   speaker,text (Speaker 00 = agent)
+    <out>/<conversation id>/summary.json     Deepgram (or local) summary
+    <out>/<conversation id>/scores.json      Groq quality scores
+
+Summaries and scores go through bounded async pools. Progress is
+checkpointed per conversation and stage in <out>/checkpoint.db, so an
+interrupted import picks up where it stopped when it is run again.
+
+    python bulk_ingest.py archive.zip
+    python bulk_ingest.py exports/ --workers 8 --stages parse
+    python bulk_ingest.py chats.jsonl --out ingested/acme --summary-concurrency 16
+"""
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+import sqlite3
+import zipfile
+import argparse
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+
+import chat_parser
+import storage
+import tracing
+import turns
+
+log = tracing.get_logger("ingest")
+
+# ---------------- CONFIG ----------------
+BASE_DIR   = os.path.dirname(os.path.abspath(__file__))
+INGEST_DIR = os.getenv("INGEST_DIR", os.path.join(BASE_DIR, "ingested"))
+
+STAGES            = ("parse", "summarize", "score")
+READ_STAGES       = ("load", "load_parsed")   # failure-only stages: reading the source / an earlier parse
+TEXT_EXTENSIONS   = (".txt", ".log")
+PROGRESS_EVERY    = 1000
+
+
+# ---------------- CHECKPOINT ----------------
+
+class Checkpoint:
+    """
+    SQLite tables of finished and failed (conversation, stage) pairs. Each
+    update is its own transaction, like JobStore.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.db   = sqlite3.connect(path, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS ingested (
+                id         TEXT NOT NULL,
+                stage      TEXT NOT NULL,
+                source     TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (id, stage)
+            )
+        """)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS failures (
+                id         TEXT NOT NULL,
+                stage      TEXT NOT NULL,
+                error      TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (id, stage)
+            )
+        """)
+
+    def done(self) -> dict:
+        """{conversation id: set of finished stages}, loaded once at start-up."""
+        finished = {}
+        for conv_id, stage in self.db.execute("SELECT id, stage FROM ingested"):
+            finished.setdefault(conv_id, set()).add(stage)
+        return finished
+
+    def mark(self, conv_id: str, stage: str, source: str):
+        """Any finished stage means the conversation was read, so read failures are cleared too."""
+        with self._tx() as db:
+            db.execute("INSERT OR REPLACE INTO ingested VALUES (?, ?, ?, ?)", (conv_id, stage, source, time.time()))
+            db.execute(f"DELETE FROM failures WHERE id = ? AND stage IN (?{', ?' * len(READ_STAGES)})",
+                       (conv_id, stage, *READ_STAGES))
+
+    def fail(self, conv_id: str, stage: str, error: str):
+        with self._tx() as db:
+            db.execute("INSERT OR REPLACE INTO failures VALUES (?, ?, ?, ?)", (conv_id, stage, error[:500], time.time()))
+
+    def failure_count(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM failures").fetchone()[0]
+
+    @contextmanager
+    def _tx(self):
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.db
+            self.db.execute("COMMIT")
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+
+    def close(self):
+        self.db.close()
+
+
+# ---------------- SOURCES ----------------
+
+def conversation_id(name: str) -> str:
+    """Filesystem-safe, collision-free folder name for a source entry."""
+    stem = re.sub(r'[^A-Za-z0-9_\-]', '_', os.path.splitext(name)[0])[:80]
+    return f"{stem}-{hashlib.sha1(name.encode('utf-8')).hexdigest()[:8]}"
+
+
+def iter_sources(path: str):
+    """Yields (source name, load) pairs; load() returns the raw chat bytes."""
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(TEXT_EXTENSIONS):
+                    full = os.path.join(root, name)
+                    yield os.path.relpath(full, path), lambda full=full: _read_file(full)
+    elif zipfile.is_zipfile(path):
+        archive = zipfile.ZipFile(path)
+        for info in archive.infolist():
+            if not info.is_dir() and info.filename.lower().endswith(TEXT_EXTENSIONS):
+                yield info.filename, lambda info=info: archive.read(info)
+    elif path.lower().endswith((".jsonl", ".ndjson")):
+        with open(path, encoding="utf-8") as f:
+            for n, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                name   = str(record.get("id") or record.get("conversation_id") or f"line{n}")
+                text   = record.get("text") or record.get("chat") or ""
+                yield name, lambda text=text: text.encode("utf-8")
+    else:
+        raise ValueError(f"Unsupported source {path!r}: expected a directory, a .zip or a .jsonl file")
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def decode_chat(raw: bytes) -> str:
+    try:
+        return raw.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return raw.decode("latin-1")
+
+
+# ---------------- PARSE (process pool) ----------------
+
+def parse_conversation(conv_dir: str, raw: bytes) -> dict:
+    """
+    Runs in a worker process: parse + format the chat and write its transcript.
+    Returns the "speaker: text" conversation the scoring stage needs.
+    """
+    text       = decode_chat(raw)
+    transcript = turns.Turns.from_records(chat_parser.format_chat_for_ui(chat_parser.parse_chat_to_turns(text)))
+    with storage.atomic_open(os.path.join(conv_dir, "transcript.csv"), "w", newline="", encoding="utf-8") as f:
+        transcript.write_csv(f)
+    return {"turns": len(transcript), "conv": transcript.conversation()}
+
+
+def load_parsed(conv_dir: str) -> dict:
+    """Resume path: rebuild what parse_conversation returned from the saved transcript."""
+    transcript = turns.Turns.read_csv(os.path.join(conv_dir, "transcript.csv"))
+    return {"turns": len(transcript), "conv": transcript.conversation()}
+
+
+# ---------------- SUMMARIZE / SCORE (thread-backed async pools) ----------------
+
+def summarize_conversation(conv_dir: str, raw: bytes):
+    import chat_app
+    summary = chat_app.summarize_text(decode_chat(raw))
+    if summary.startswith("Summary failed"):
+        raise RuntimeError(summary)
+    storage.write_json(os.path.join(conv_dir, "summary.json"),
+                       {"summary": summary, "saved_at": time.strftime("%Y-%m-%d %H:%M:%S")}, indent=2)
+
+
+def score_conversation(conv_dir: str, conv: str):
+    import scoring_server
+    data = scoring_server.grade_conversation(conv)
+    data["saved_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+    storage.write_json(os.path.join(conv_dir, "scores.json"), data, indent=2)
+
+
+# ---------------- PIPELINE ----------------
+
+class Ingestion:
+    def __init__(self, source: str, out_dir: str, stages, workers: int,
+                 summary_concurrency: int, score_concurrency: int, limit: int = 0):
+        self.source  = source
+        self.out_dir = out_dir
+        # Later stages read the transcript, so parsing is never skipped
+        self.stages  = [s for s in STAGES if s in stages or s == "parse"]
+        self.workers = workers
+        self.limit   = limit
+        os.makedirs(out_dir, exist_ok=True)
+        self.checkpoint = Checkpoint(os.path.join(out_dir, "checkpoint.db"))
+        self.finished   = self.checkpoint.done()
+
+        # Conversations in flight at once: keeps every worker busy while
+        # bounding how many raw chats sit in memory waiting for Deepgram/Groq
+        self.inflight      = asyncio.Semaphore(workers * 4 + summary_concurrency + score_concurrency)
+        self.summary_slots = asyncio.Semaphore(summary_concurrency)
+        self.score_slots   = asyncio.Semaphore(score_concurrency)
+        self.stats         = {"seen": 0, "skipped": 0, "parsed": 0, "summarized": 0, "scored": 0, "failed": 0}
+
+    async def run(self):
+        loop    = asyncio.get_running_loop()
+        started = time.perf_counter()
+        tasks   = set()
+        # forkserver: the parent already runs threads (asyncio.to_thread), which fork() does not copy safely
+        with ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("forkserver")) as pool:
+            for name, load in iter_sources(self.source):
+                if self.limit and self.stats["seen"] >= self.limit:
+                    break
+                self.stats["seen"] += 1
+                conv_id = conversation_id(name)
+                pending = [s for s in self.stages if s not in self.finished.get(conv_id, ())]
+                if not pending:
+                    self.stats["skipped"] += 1
+                    continue
+                await self.inflight.acquire()
+                task = loop.create_task(self._ingest(loop, pool, name, conv_id, load, pending))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+
+        elapsed  = time.perf_counter() - started
+        failures = self.checkpoint.failure_count()
+        self.checkpoint.close()
+        return self.report(elapsed, failures)
+
+    async def _ingest(self, loop, pool, name, conv_id, load, pending):
+        conv_dir = os.path.join(self.out_dir, conv_id)
+        stage    = "load"
+        try:
+            raw = load()
+            if "parse" in pending:
+                stage  = "parse"
+                parsed = await loop.run_in_executor(pool, parse_conversation, conv_dir, raw)
+                self._done(conv_id, "parse", name)
+            else:
+                stage  = "load_parsed"
+                parsed = await asyncio.to_thread(load_parsed, conv_dir)
+
+            jobs = []
+            if "summarize" in pending:
+                jobs.append(self._stage(conv_id, name, "summarize", self.summary_slots,
+                                        summarize_conversation, conv_dir, raw))
+            if "score" in pending:
+                jobs.append(self._stage(conv_id, name, "score", self.score_slots,
+                                        score_conversation, conv_dir, parsed["conv"]))
+            if jobs:
+                await asyncio.gather(*jobs)
+        except Exception as e:
+            self._fail(conv_id, stage, e)
+        finally:
+            self.inflight.release()
+
+    async def _stage(self, conv_id, name, stage, slots, fn, *args):
+        async with slots:
+            try:
+                with tracing.span(log, f"ingest.{stage}", conversation=conv_id):
+                    await asyncio.to_thread(fn, *args)
+            except Exception as e:
+                self._fail(conv_id, stage, e)
+                return
+        self._done(conv_id, stage, name)
+
+    def _done(self, conv_id, stage, name):
+        self.checkpoint.mark(conv_id, stage, name)
+        counter = {"parse": "parsed", "summarize": "summarized", "score": "scored"}[stage]
+        self.stats[counter] += 1
+        if self.stats[counter] % PROGRESS_EVERY == 0:
+            log.info("%s %d conversations", counter, self.stats[counter])
+
+    def _fail(self, conv_id, stage, e):
+        self.stats["failed"] += 1
+        self.checkpoint.fail(conv_id, stage, f"{type(e).__name__}: {e}")
+        log.warning("%s failed for %s: %s", stage, conv_id, e)
+
+    def report(self, elapsed: float, failures: int) -> dict:
+        """Throughput is end-to-end: with summarize/score enabled it is bounded by the upstream pools."""
+        rate = self.stats["parsed"] / elapsed if elapsed else 0.0
+        return {
+            **self.stats,
+            "open_failures":    failures,
+            "seconds":          round(elapsed, 2),
+            "workers":          self.workers,
+            "chats_per_second": round(rate, 1),
+            "chats_per_second_per_core": round(rate / self.workers, 1),
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("source", help="directory, .zip or .jsonl of chat logs")
+    parser.add_argument("--out", default="", help=f"per-conversation store (default {INGEST_DIR}/<source name>)")
+    parser.add_argument("--stages", default=",".join(STAGES), help="subset of parse,summarize,score")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="parser processes")
+    parser.add_argument("--summary-concurrency", type=int, default=8, help="Deepgram summaries in flight")
+    parser.add_argument("--score-concurrency", type=int, default=4, help="Groq scoring calls in flight")
+    parser.add_argument("--limit", type=int, default=0, help="stop after this many source entries")
+    args = parser.parse_args()
+
+    out_dir = args.out or os.path.join(INGEST_DIR, conversation_id(os.path.basename(os.path.abspath(args.source))))
+    stages  = {s.strip() for s in args.stages.split(",") if s.strip()}
+    if stages - set(STAGES):
+        parser.error(f"unknown stage(s): {', '.join(sorted(stages - set(STAGES)))}")
+
+    ingestion = Ingestion(args.source, out_dir, stages, args.workers,
+                          args.summary_concurrency, args.score_concurrency, args.limit)
+    result = asyncio.run(ingestion.run())
+    print(json.dumps({"out": out_dir, **result}, indent=2))
@@ -1,26 +1,47 @@
+import io
 import os
+import csv
 import json 
 import re 
-import shutil
-import gc
-import csv
-import requests
-import pandas as pd
+import time
+import codecs
+import random
+import asyncio
+import hashlib
+import threading
+import httpx
+from collections import OrderedDict
+from itertools import islice
 from datetime import datetime
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, UploadFile, File, Depends, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from tracing import run_in_threadpool
 
-from deepgram import DeepgramClient
 from pathlib import Path
 
+import admission
+import archive
+import chat_parser
+import generations
+import handoff
+import local_summarizer
+import metrics
+import search_index
+import shared_clients
+import storage
+import summary_log
+import tracing
+import turns
+
 from dotenv import load_dotenv
 load_dotenv(dotenv_path=Path(__file__).parent / ".env")
 
 # ---------------- CONFIG ----------------
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 TRANSCRIPT_FILE = "text_transcript.csv"
-SUMMARY_FILE = "text_summaries.csv"
+SUMMARY_FILE = summary_log.SOURCES["text"]
+SUMMARY_FIELDS = ["file_name", "timestamp", "summary"]
 SUMMARIES_DIR=os.path.join(BASE_DIR,"file_summaries")
 os.makedirs(SUMMARIES_DIR,exist_ok=True)
 
@@ -33,238 +54,442 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
     allow_credentials=False,
+    expose_headers=["X-Call-Id", "X-Request-Id", "X-Total-Count", "X-Next-Cursor"],
 )
-
-dg_client = DeepgramClient(DEEPGRAM_API_KEY)
+# At most 8 chat uploads at once, 32 more queued for up to 30 s; the rest get 429
+admission.protect(app, "chat", {"/upload-text": (8, 32, 30)})
+metrics.instrument(app, "chat")
+tracing.instrument(app, "chat")
+log = tracing.get_logger("chat")
 
 # ---------------- CHAT PARSING + FORMAT FOR UI ----------------
+# The parser engine lives in chat_parser.py; these names are kept for callers.
 
 def parse_chat_to_turns(text):
-    """
-    Dynamically detects ANY speaker format — no hardcoded names.
-    Handles multi-word names, single-word names, numbered speakers, etc.
-    """
-    import re
-    from collections import Counter
+    return chat_parser.parse_chat_to_turns(text)
+
 
-    lines = text.strip().split('\n')
-    turns = []
+def format_chat_for_ui(turns):
+    return chat_parser.format_chat_for_ui(turns)
 
-    # Pattern: "Speaker Name: message" — greedy match for name, stops at first colon
-    speaker_line = re.compile(r'^([A-Za-z][A-Za-z0-9_ ]{1,40}?)\s*:\s*(.+)$')
 
-    if len(lines) > 1:
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            m = speaker_line.match(line)
-            if m:
-                name = m.group(1).strip()
-                msg  = m.group(2).strip()
-                if name and msg:
-                    turns.append({"speaker": name, "text": msg})
-
-    # Fallback: inline format — everything on one block of text
-    if not turns:
-        # Find all "Name:" occurrences and split on them
-        speaker_pattern = re.compile(r'\b([A-Za-z][A-Za-z0-9 ]{1,39}?)\s*:')
-        candidates = speaker_pattern.findall(text)
-        counts = Counter(c.strip() for c in candidates if len(c.strip()) > 1)
-
-        if counts:
-            # Sort by length descending to avoid partial-name shadowing
-            speakers = sorted(counts.keys(), key=len, reverse=True)
-            escaped  = [re.escape(s) for s in speakers]
-            split_pat = re.compile(r'(' + '|'.join(escaped) + r')\s*:')
-            parts = split_pat.split(text)
-
-            i = 1
-            while i < len(parts) - 1:
-                speaker = parts[i].strip()
-                msg     = parts[i + 1].strip()
-                if speaker in speakers and msg:
-                    turns.append({"speaker": speaker, "text": msg})
-                i += 2
-
-    return turns
+# ---------------- STREAMING UPLOADS ----------------
+# Starlette already spools an upload (memory, then disk past 1 MB), so the
+# upload is read straight from that file in chunks instead of being copied
+# to a temp file and loaded into one string.
 
+READ_CHUNK = 64 * 1024
+CSV_BATCH  = 500
+TRANSCRIPT_FIELDS = ["speaker", "text"]
 
-def format_chat_for_ui(turns):
+
+def detect_encoding(fileobj) -> str:
+    """utf-8 (BOM aware) if the whole upload decodes, else latin-1 — the same fallback scoring_server uses."""
+    fileobj.seek(0)
+    encoding = "utf-8-sig" if fileobj.read(3) == codecs.BOM_UTF8 else "utf-8"
+    fileobj.seek(0)
+    decoder = codecs.getincrementaldecoder(encoding)()
+    try:
+        for chunk in iter(lambda: fileobj.read(READ_CHUNK), b""):
+            decoder.decode(chunk)
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        encoding = "latin-1"
+    fileobj.seek(0)
+    return encoding
+
+
+def iter_text_chunks(fileobj, encoding):
+    fileobj.seek(0)
+    decoder = codecs.getincrementaldecoder(encoding)()
+    for chunk in iter(lambda: fileobj.read(READ_CHUNK), b""):
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def iter_text_lines(fileobj, encoding):
     """
-    Maps detected speakers to Speaker 00 / Speaker 01 labels.
-    - Speaker 00 = Agent (whoever opens with a greeting or is NOT asking for help)
-    - Speaker 01 = Customer
-    - Supports 3+ speakers: Speaker 02, Speaker 03, etc.
+    Decoded lines (without newline) of a binary upload, one at a time. Split on
+    "\n" only, as parse_chat_to_turns splits the whole text: a bare "\r" stays
+    inside its line and "\r\n" leaves a "\r" that the turn parser strips.
     """
-    if not turns:
-        return []
+    fileobj.seek(0)
+    reader = io.TextIOWrapper(fileobj, encoding=encoding, newline="\n")
+    try:
+        for line in reader:
+            yield line.rstrip("\n")
+    finally:
+        reader.detach()   # leave the upload file open for the caller
+
+
+def write_transcript_rows(rows, path):
+    """Writes {"speaker", "text"} rows to `path` atomically, CSV_BATCH rows per write. Returns the count."""
+    written = 0
+    with metrics.timed(metrics.IO_SECONDS, "csv_write"), \
+         storage.atomic_open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(TRANSCRIPT_FIELDS)
+        rows = iter(rows)
+        while True:
+            batch = [(r["speaker"], r["text"]) for r in islice(rows, CSV_BATCH)]
+            if not batch:
+                break
+            writer.writerows(batch)
+            written += len(batch)
+    return written
 
-    # Preserve speaker order of appearance
-    seen = {}
-    for t in turns:
-        if t['speaker'] not in seen:
-            seen[t['speaker']] = len(seen)
-
-    # Determine who is the agent: first speaker, unless their first message
-    # sounds like a customer complaint — then agent is the second speaker
-    all_speakers_in_order = list(seen.keys())
-    first_speaker         = all_speakers_in_order[0]
-    first_msg             = next(
-        (t['text'].lower() for t in turns if t['speaker'] == first_speaker), ""
-    )
-
-    customer_keywords = [
-        "help", "issue", "problem", "broken", "error",
-        "not working", "can't", "cannot", "please", "complaint",
-        "wrong", "fail", "stuck", "unable", "why is"
-    ]
-    agent_keywords = [
-        "welcome", "hello", "hi", "good morning", "good afternoon",
-        "how can i", "how may i", "assist", "support", "thank you for calling"
-    ]
-
-    first_msg_is_customer = any(k in first_msg for k in customer_keywords)
-    first_msg_is_agent    = any(k in first_msg for k in agent_keywords)
-
-    if first_msg_is_customer and not first_msg_is_agent:
-        # Swap: second speaker is the agent
-        if len(all_speakers_in_order) > 1:
-            agent_speaker = all_speakers_in_order[1]
-        else:
-            agent_speaker = first_speaker
-    else:
-        agent_speaker = first_speaker
-
-    formatted = []
-    for t in turns:
-        speaker_name = t['speaker']
-        idx          = seen[speaker_name]
-
-        if speaker_name == agent_speaker:
-            label = "Speaker 00"   # Agent
-        else:
-            label = f"Speaker {idx:02d}"   # Customer or others: 01, 02, ...
-
-        formatted.append({"speaker": label, "text": t['text']})
 
-    return formatted
+# ---------------- SUMMARIZE LOGIC ----------------
+# Summaries go through a pooled keep-alive client, are retried on 429/5xx
+# with exponential backoff (or Deepgram's Retry-After), and are cached by a
+# hash of the whitespace-normalized chat text so re-uploads cost nothing.
+
+SUMMARY_URL        = f"{shared_clients.DEEPGRAM_BASE_URL}/v1/read?summarize=true&language=en"
+SUMMARY_TIMEOUT    = float(os.getenv("DEEPGRAM_SUMMARY_TIMEOUT", "30"))
+SUMMARY_RETRIES    = int(os.getenv("DEEPGRAM_SUMMARY_RETRIES", "3"))
+SUMMARY_BACKOFF    = float(os.getenv("DEEPGRAM_SUMMARY_BACKOFF", "0.5"))
+SUMMARY_CACHE_SIZE = int(os.getenv("SUMMARY_CACHE_SIZE", "512"))
+RETRY_STATUSES     = {429, 500, 502, 503, 504}
+
+_summary_cache      = OrderedDict()
+_summary_cache_lock = threading.Lock()
+
+
+def chat_text_key(chunks) -> str:
+    """sha256 of the chat text with whitespace runs collapsed, fed chunk by chunk."""
+    digest, carry = hashlib.sha256(), ""
+    for chunk in chunks:
+        text  = carry + chunk
+        words = text.split()
+        # A word cut at the chunk boundary is finished by the next chunk
+        carry = words.pop() if words and not text[-1].isspace() else ""
+        for word in words:
+            digest.update(word.encode("utf-8") + b" ")
+    if carry:
+        digest.update(carry.encode("utf-8") + b" ")
+    return digest.hexdigest()
+
+
+def cached_summary(key: str):
+    with _summary_cache_lock:
+        summary = _summary_cache.get(key)
+        if summary is not None:
+            _summary_cache.move_to_end(key)
+    metrics.record_cache("deepgram_summary", summary is not None)
+    return summary
+
+
+def cache_summary(key: str, summary: str):
+    if summary.startswith("Summary failed"):
+        return
+    with _summary_cache_lock:
+        _summary_cache[key] = summary
+        _summary_cache.move_to_end(key)
+        while len(_summary_cache) > SUMMARY_CACHE_SIZE:
+            _summary_cache.popitem(last=False)
+
+
+def json_text_body(chunks):
+    """Encodes {"text": ...} incrementally so a large upload is never joined into one string."""
+    yield b'{"text": "'
+    for chunk in chunks:
+        yield json.dumps(chunk)[1:-1].encode("ascii")
+    yield b'"}'
+
+
+async def _aiter(iterable):
+    for item in iterable:
+        yield item
+
+
+def _summary_headers():
+    return {
+        "Authorization": f"Token {DEEPGRAM_API_KEY}",
+        "Content-Type": "application/json"
+    }
+
+
+def _retry_delay(attempt: int, response=None) -> float:
+    retry_after = response.headers.get("Retry-After", "") if response is not None else ""
+    if retry_after.isdigit():
+        return min(float(retry_after), 30.0)
+    return SUMMARY_BACKOFF * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+def _should_retry(response, attempt: int) -> bool:
+    if response.status_code not in RETRY_STATUSES or attempt >= SUMMARY_RETRIES:
+        return False
+    metrics.ERRORS.labels("chat", f"DeepgramHTTP{response.status_code}").inc()
+    log.warning("Deepgram %s, retrying summary (attempt %d/%d)", response.status_code, attempt + 1, SUMMARY_RETRIES)
+    return True
+
+
+def _read_summary(response) -> str:
+    """Summary text from a requests / httpx response, or the "Summary failed: ..." string."""
+    if response.status_code != 200:
+        metrics.ERRORS.labels("chat", f"DeepgramHTTP{response.status_code}").inc()
+        log.error("Deepgram API error %s: %s", response.status_code, response.text[:500])
+        return f"Summary failed: HTTP {response.status_code}"
 
+    try:
+        data = response.json()
+    except ValueError as e:
+        metrics.record_error("chat", e)
+        log.error("Deepgram returned non-JSON body: %s", response.text[:500])
+        return f"Summary failed: {str(e)}"
+    try:
+        # ✅ Extract summary from response
+        return data["results"]["summary"]["text"]
+    except KeyError as e:
+        metrics.record_error("chat", e)
+        log.error("Deepgram response missing key: %s (response: %s)", e, str(data)[:500])
+        return f"Summary failed (missing key): {str(e)}"
 
-# ---------------- SUMMARIZE LOGIC ----------------
 
-def summarize_with_deepgram(text):
+async def summarize_chat(chunks_factory, key: str = None) -> str:
     """
-    Summarizes chat text using Deepgram Text Intelligence REST API directly.
-    Bypasses SDK version issues entirely — works on ALL SDK versions.
+    Summarizes chat text with the Deepgram Text Intelligence REST API without
+    blocking the event loop. `chunks_factory()` returns a fresh iterable of
+    text chunks; it is called again for every retry.
     """
-    try:
-        url = "https://api.deepgram.com/v1/read?summarize=true&language=en"
-
-        headers = {
-            "Authorization": f"Token {DEEPGRAM_API_KEY}",
-            "Content-Type": "application/json"
-        }
+    key     = key or chat_text_key(chunks_factory())
+    summary = cached_summary(key)
+    if summary is not None:
+        return summary
+
+    client  = shared_clients.async_http_client()
+    timeout = httpx.Timeout(SUMMARY_TIMEOUT, connect=5.0)
+    for attempt in range(SUMMARY_RETRIES + 1):
+        try:
+            with metrics.timed(metrics.UPSTREAM_SECONDS, "deepgram", "read_summarize"), \
+                 tracing.span(log, "deepgram.read_summarize", attempt=attempt):
+                response = await client.post(SUMMARY_URL, headers=_summary_headers(), timeout=timeout,
+                                             content=_aiter(json_text_body(chunks_factory())))
+        except httpx.TransportError as e:
+            metrics.record_error("chat", e)
+            if attempt < SUMMARY_RETRIES:
+                await asyncio.sleep(_retry_delay(attempt))
+                continue
+            log.exception("Deepgram Error: %s", e)
+            return f"Summary failed: {str(e) or type(e).__name__}"
+        except Exception as e:
+            metrics.record_error("chat", e)
+            log.exception("Deepgram Error: %s", e)
+            return f"Summary failed: {str(e)}"
 
-        payload = {"text": text}
+        if _should_retry(response, attempt):
+            await asyncio.sleep(_retry_delay(attempt, response))
+            continue
+        summary = _read_summary(response)
+        cache_summary(key, summary)
+        return summary
 
-        response = requests.post(url, headers=headers, json=payload, timeout=30)
 
-        if response.status_code != 200:
-            print(f"Deepgram API error {response.status_code}: {response.text}")
-            return f"Summary failed: HTTP {response.status_code}"
+def summarize_with_deepgram(text):
+    """
+    Blocking variant of summarize_chat for worker threads (job_queue): same
+    pooled session, retries and cache.
+    """
+    import requests
+    key     = chat_text_key([text])
+    summary = cached_summary(key)
+    if summary is not None:
+        return summary
 
-        data = response.json()
+    for attempt in range(SUMMARY_RETRIES + 1):
+        try:
+            with metrics.timed(metrics.UPSTREAM_SECONDS, "deepgram", "read_summarize"), \
+                 tracing.span(log, "deepgram.read_summarize", chars=len(text), attempt=attempt):
+                response = shared_clients.http_session().post(
+                    SUMMARY_URL, headers=_summary_headers(), json={"text": text}, timeout=(5, SUMMARY_TIMEOUT),
+                )
+        except requests.RequestException as e:
+            metrics.record_error("chat", e)
+            if attempt < SUMMARY_RETRIES:
+                time.sleep(_retry_delay(attempt))
+                continue
+            log.exception("Deepgram Error: %s", e)
+            return f"Summary failed: {str(e)}"
+
+        if _should_retry(response, attempt):
+            time.sleep(_retry_delay(attempt, response))
+            continue
+        summary = _read_summary(response)
+        cache_summary(key, summary)
+        return summary
+
+
+# ---------------- LOCAL SUMMARY ----------------
+# Chats up to LOCAL_SUMMARY_MAX_BYTES are summarized in-process (a few ms,
+# no network), and a failed Deepgram call falls back to the same extractive
+# summary instead of returning "Summary failed: ...".
+
+LOCAL_SUMMARY_MAX_BYTES = int(os.getenv("LOCAL_SUMMARY_MAX_BYTES", "2048"))
+LOCAL_SUMMARY_FALLBACK  = os.getenv("LOCAL_SUMMARY_FALLBACK", "1") == "1"
+
+
+def local_summary(text: str) -> str:
+    with tracing.span(log, "local.summarize", chars=len(text)):
+        return local_summarizer.summarize(text) or "No summary available."
+
+
+def upload_size(fileobj) -> int:
+    fileobj.seek(0, os.SEEK_END)
+    size = fileobj.tell()
+    fileobj.seek(0)
+    return size
+
+
+async def summarize_upload(fileobj, encoding: str) -> str:
+    """Local summary for small chats, else Deepgram with the local summary as fallback."""
+    chunks = lambda: iter_text_chunks(fileobj, encoding)
+    if await run_in_threadpool(upload_size, fileobj) <= LOCAL_SUMMARY_MAX_BYTES:
+        metrics.SUMMARIES.labels("chat", "local").inc()
+        return await run_in_threadpool(lambda: local_summary("".join(chunks())))
+
+    key     = await run_in_threadpool(chat_text_key, chunks())
+    summary = await summarize_chat(chunks, key)
+    if summary.startswith("Summary failed") and LOCAL_SUMMARY_FALLBACK:
+        log.warning("Falling back to local summary: %s", summary)
+        metrics.SUMMARIES.labels("chat", "fallback").inc()
+        # Large chats are summarized from their first MAX_INPUT_CHARS characters
+        head = "".join(islice(chunks(), local_summarizer.MAX_INPUT_CHARS // READ_CHUNK + 1))
+        return await run_in_threadpool(local_summary, head)
+    metrics.SUMMARIES.labels("chat", "deepgram").inc()
+    return summary
+
+
+def summarize_text(text: str, fallback: bool = LOCAL_SUMMARY_FALLBACK) -> str:
+    """Blocking counterpart of summarize_upload for worker threads."""
+    if len(text.encode("utf-8")) <= LOCAL_SUMMARY_MAX_BYTES:
+        metrics.SUMMARIES.labels("chat", "local").inc()
+        return local_summary(text)
+    summary = summarize_with_deepgram(text)
+    if not summary.startswith("Summary failed"):
+        metrics.SUMMARIES.labels("chat", "deepgram").inc()
+    elif fallback:
+        log.warning("Falling back to local summary: %s", summary)
+        metrics.SUMMARIES.labels("chat", "fallback").inc()
+        return local_summary(text)
+    return summary
+
+# ---------------- SAVE RESULTS ----------------
+
+def save_chat_transcript(chat_content, filename=None, session=storage.DEFAULT_SESSION):
+    """
+    Parses chat text into UI-formatted turns and writes the transcript CSV.
+    Returns the formatted turns (turns.Turns).
+    """
+    # ✅ Parse chat into speaker turns and format like audio transcript
+    parsed = parse_chat_to_turns(chat_content)
+    formatted = turns.Turns.from_records(format_chat_for_ui(parsed))
+
+    # Fallback: if parsing fails (unrecognized format), store raw
+    if not formatted:
+        formatted = turns.Turns.from_texts(["Speaker 00"], [chat_content])
+
+    with metrics.timed(metrics.IO_SECONDS, "csv_write"), \
+         storage.atomic_open(storage.session_path(TRANSCRIPT_FILE, session), "w", newline="", encoding="utf-8") as f:
+        formatted.write_csv(f)
+    handoff.publish("text", filename, formatted, session)
+    search_index.index_transcript(filename, "text", formatted)
+    return formatted
 
-        # ✅ Extract summary from response
-        summary_text = data["results"]["summary"]["text"]
-        return summary_text
 
-    except KeyError as e:
-        print(f"Deepgram response missing key: {e}")
-        print(f"Full response: {data}")
-        return f"Summary failed (missing key): {str(e)}"
+def stream_chat_transcript(fileobj, encoding, filename=None, session=storage.DEFAULT_SESSION):
+    """
+    save_chat_transcript for an upload file: lines are decoded, parsed and
+    written out in batches, so memory stays around one turn per line.
+    Returns the number of turns written.
+    """
+    rows = chat_parser.iter_chat_for_ui(chat_parser.iter_line_turns(iter_text_lines(fileobj, encoding)))
+
+    # The in-memory handoff (gateway mode) needs the turns as a list anyway
+    kept = [] if handoff.ENABLED else None
+    if kept is not None:
+        rows = _tee(rows, kept)
+
+    written = write_transcript_rows(rows, storage.session_path(TRANSCRIPT_FILE, session))
+    if written == 0:
+        # Single block of text (inline "A: ... B: ...") or no speakers at all
+        fileobj.seek(0)
+        return len(save_chat_transcript(fileobj.read().decode(encoding), filename, session))
+
+    if kept is not None:
+        handoff.publish("text", filename, turns.Turns.from_records(kept), session)
+    if search_index.ENABLED and filename:
+        # Streamed back from the CSV just written, so memory stays bounded here too
+        with open(storage.session_path(TRANSCRIPT_FILE, session), newline="", encoding="utf-8") as f:
+            search_index.index_transcript(filename, "text", csv.DictReader(f))
+    return written
+
+
+def _tee(rows, sink):
+    for row in rows:
+        sink.append(row)
+        yield row
+
+
+def record_text_summary(filename, summary_text, history=True):
+    """Appends the summary to history (unless history=False) and saves the per-file summary JSON."""
+    # Append to summary history
+    if history:
+        summary_log.append(SUMMARY_FILE, SUMMARY_FIELDS, {
+            "file_name": filename,
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "summary":   summary_text,
+        })
+    search_index.index_summary(filename, "text", summary_text)
+
+    # Save per-file summary for PDF download
+    try:
+        safe_name    = re.sub(r'[^a-zA-Z0-9_\-]', '_', filename)
+        summary_path = os.path.join(SUMMARIES_DIR, f"{safe_name}.json")
+        log.debug("Saving summary for %s to %s", filename, summary_path)
+        storage.write_json_in_dir(SUMMARIES_DIR, f"{safe_name}.json", {
+            "filename": filename,
+            "summary":  summary_text,
+            "saved_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }, indent=4)
     except Exception as e:
-        print(f"Deepgram Error: {e}")
-        return f"Summary failed: {str(e)}"
+        log.exception("Per-file summary save error: %s", e)
+
 
 # ---------------- ENDPOINTS ----------------
 
 @app.post("/upload-text")
-async def upload_text(file: UploadFile = File(...)):
-    temp_file = f"temp_{file.filename}"
-    try:
-        with open(temp_file, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-
-        with open(temp_file, "r", encoding="utf-8") as f:
-            chat_content = f.read()
-
-        summary_text = summarize_with_deepgram(chat_content)
-
-        # ✅ Parse chat into speaker turns and format like audio transcript
-        turns = parse_chat_to_turns(chat_content)
-        formatted = format_chat_for_ui(turns)
-
-        # Fallback: if parsing fails (unrecognized format), store raw
-        if not formatted:
-            formatted = [{"speaker": "Speaker 00", "text": chat_content}]
-
-        df_t = pd.DataFrame(formatted)
-        df_t.to_csv(TRANSCRIPT_FILE, index=False)
-
-        # Append to summary history
-        file_exists = os.path.isfile(SUMMARY_FILE)
-        with open(SUMMARY_FILE, mode="a", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=["file_name", "timestamp", "summary"])
-            if not file_exists:
-                writer.writeheader()
-            writer.writerow({
-                "file_name": file.filename,
-                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "summary":   summary_text,
-            })
-
-         # Save per-file summary for PDF download
-        try:
-            import re 
-            print(f"DEBUG SUMMARY SAVE: file.filename='{file.filename}'")
-            safe_name    = re.sub(r'[^a-zA-Z0-9_\-]', '_', file.filename)
-            summary_path = os.path.join(SUMMARIES_DIR, f"{safe_name}.json")
-            print(f"DEBUG SUMMARY SAVE: saving to '{summary_path}'")
-            with open(summary_path, "w") as sf:
-                json.dump({
-                    "filename": file.filename,
-                    "summary":  summary_text,
-                    "saved_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                },sf, indent=4)
-        except Exception as e:
-            print(f"Per-file summary save error: {e}")
+async def upload_text(file: UploadFile = File(...), session: str = Depends(storage.session_id)):
+    # File scanning and CSV writes run in the threadpool and the summary is
+    # awaited, so concurrent uploads no longer queue behind each other
+    encoding     = await run_in_threadpool(detect_encoding, file.file)
+    summary_text = await summarize_upload(file.file, encoding)
+    await run_in_threadpool(stream_chat_transcript, file.file, encoding, file.filename, session)
+    await run_in_threadpool(record_text_summary, file.filename, summary_text)
 
-        return {"status": "success", "summary": summary_text}
-
-    finally:
-        if os.path.exists(temp_file):
-            os.remove(temp_file)
-        gc.collect()
+    return {"status": "success", "summary": summary_text}
 
 
 @app.get("/get-text-transcript")
-async def get_text_transcript():
-    if not os.path.exists(TRANSCRIPT_FILE):
+async def get_text_transcript(session: str = Depends(storage.session_id)):
+    transcript_path = storage.session_path(TRANSCRIPT_FILE, session)
+    if not os.path.exists(transcript_path):
         return []
-    return pd.read_csv(TRANSCRIPT_FILE).to_dict(orient="records")
+    with metrics.timed(metrics.IO_SECONDS, "csv_read"):
+        return turns.Turns.read_csv(transcript_path).to_records()
 
 
 @app.get("/get-text-summary")
 async def get_text_summary():
     if not os.path.exists(SUMMARY_FILE):
         return {"summary": "No summary found."}
-    df = pd.read_csv(SUMMARY_FILE)
-    if df.empty:
+    row = await run_in_threadpool(summary_log.latest, SUMMARY_FILE)   # seeks to the last row
+    if not row:
         return {"summary": "Empty history."}
-    latest = df.iloc[-1]["summary"]
-    return JSONResponse(content={"summary": str(latest)})
+    return JSONResponse(content={"summary": str(row["summary"])})
 
 @app.get("/get-file-summary/{filename:path}")
 async def get_file_summary(filename: str):
@@ -274,49 +499,51 @@ async def get_file_summary(filename: str):
         decoded   = unquote(filename)
         safe_name = re.sub(r'[^a-zA-Z0-9_\-]', '_', decoded)
         path      = os.path.join(SUMMARIES_DIR, f"{safe_name}.json")
-        print(f"DEBUG: Looking for summary at {path}")
-        if os.path.exists(path):
-            with open(path) as f:
-                return json.load(f)
-        return {"summary": "No summary available."}
+        log.debug("Looking for summary at %s", path)
+        data = archive.load_json(SUMMARIES_DIR, f"{safe_name}.json")   # hot file, else archived
+        return data if data is not None else {"summary": "No summary available."}
     except Exception as e:
-        print(f"Summary fetch error: {e}")
+        log.exception("Summary fetch error: %s", e)
         return {"summary": "Error fetching summary."}
 
 
 # ---------------- HISTORY ----------------
 
+# e.g. /history?limit=20, then /history?limit=20&before=<X-Next-Cursor> — newest first
 @app.get("/history")
-async def get_history():
+async def get_history(response: Response, limit: int = None, before: int = None):
     try:
         if os.path.exists(SUMMARY_FILE):
-            df = pd.read_csv(SUMMARY_FILE)
-            df = df.fillna("")
-            df = df.iloc[::-1]
-            return df.to_dict(orient="records")
+            rows, total, cursor = await run_in_threadpool(summary_log.page, SUMMARY_FILE, limit, before)
+            response.headers["X-Total-Count"] = str(total)
+            if cursor is not None:
+                response.headers["X-Next-Cursor"] = str(cursor)
+            return rows
         return []
     except Exception as e:
-        print(f"History error: {e}")
+        log.exception("History error: %s", e)
         return []
 
 
 @app.post("/clear-history")
-async def clear_history():
+async def clear_history(session: str = Depends(storage.session_id)):
     try:
         if os.path.exists(SUMMARY_FILE):
-            os.remove(SUMMARY_FILE)
-        if os.path.exists(TRANSCRIPT_FILE):
-            os.remove(TRANSCRIPT_FILE)
-
-        # Clear file_summaries folde
+            summary_log.reset(SUMMARY_FILE)
+        transcript_path = storage.session_path(TRANSCRIPT_FILE, session)
+        if os.path.exists(transcript_path):
+            os.remove(transcript_path)
+        handoff.clear("text", session)
+        await run_in_threadpool(search_index.clear, "text")
+
+        # Swap in an empty generation; the old one is deleted in the background (generations.py)
         if os.path.exists(SUMMARIES_DIR):
-            shutil.rmtree(SUMMARIES_DIR)
-            os.makedirs(SUMMARIES_DIR)
-            print(f"DEBUG: Cleared file_summaries at {SUMMARIES_DIR}")
+            generations.clear(SUMMARIES_DIR)
+            log.info("Cleared file_summaries at %s", SUMMARIES_DIR)
 
         return {"status": "cleared"}
     except Exception as e:
-        print(f"Clear history error: {e}")
+        log.exception("Clear history error: %s", e)
         return {"status": "error", "message": str(e)}
 
 
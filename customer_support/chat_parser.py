@@ -0,0 +1,256 @@
+import re
+from collections import Counter
+
+# ---------------- CHAT PARSER ENGINE ----------------
+# Turns exported chat logs into {"speaker", "text"} turns and labels them for
+# the UI. Everything here is linear in the size of the input:
+#   - multi-line chats: one precompiled match per line
+#   - inline chats ("A: hi B: hello ..."): two scans over the colons, each
+#     looking back at most MAX_NAME characters, instead of splitting on a
+#     regex alternation of every candidate name
+#   - agent / customer keywords: one Aho-Corasick pass over the first message
+
+MAX_NAME = 40
+
+# Pattern: "Speaker Name: message" — greedy match for name, stops at first colon
+SPEAKER_LINE = re.compile(r'^([A-Za-z][A-Za-z0-9_ ]{1,40}?)\s*:\s*(.+)$')
+
+# Inline candidate: the leftmost word-boundary-anchored name that runs right up
+# to the text before a colon (same names as r'\b([A-Za-z][A-Za-z0-9 ]{1,39}?)\s*:')
+NAME_BEFORE_COLON = re.compile(r'\b[A-Za-z][A-Za-z0-9 ]*\Z')
+
+CUSTOMER_KEYWORDS = (
+    "help", "issue", "problem", "broken", "error",
+    "not working", "can't", "cannot", "please", "complaint",
+    "wrong", "fail", "stuck", "unable", "why is"
+)
+AGENT_KEYWORDS = (
+    "welcome", "hello", "hi", "good morning", "good afternoon",
+    "how can i", "how may i", "assist", "support", "thank you for calling"
+)
+
+
+# ---------------- MATCHERS ----------------
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton: reports whether any keyword occurs as a substring, in one pass."""
+
+    def __init__(self, keywords):
+        self.goto = [{}]
+        self.fail = [0]
+        self.hit  = [False]
+        for keyword in keywords:
+            state = 0
+            for ch in keyword:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.hit.append(False)
+                state = nxt
+            self.hit[state] = True
+
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.hit[nxt]  = self.hit[nxt] or self.hit[self.fail[nxt]]
+
+    def search(self, text: str) -> bool:
+        goto, fail, hit = self.goto, self.fail, self.hit
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if hit[state]:
+                return True
+        return False
+
+
+class SuffixTrie:
+    """Reversed trie of speaker names: finds the longest name that ends at a given position."""
+
+    _END = None
+
+    def __init__(self, names):
+        self.root = {}
+        for name in names:
+            node = self.root
+            for ch in reversed(name):
+                node = node.setdefault(ch, {})
+            node[self._END] = name
+
+    def longest_ending_at(self, text: str, end: int, floor: int):
+        node, best, i = self.root, None, end - 1
+        while i >= floor:
+            node = node.get(text[i])
+            if node is None:
+                break
+            best = node.get(self._END, best)
+            i -= 1
+        return best
+
+
+CUSTOMER_MATCHER = KeywordAutomaton(CUSTOMER_KEYWORDS)
+AGENT_MATCHER    = KeywordAutomaton(AGENT_KEYWORDS)
+
+
+# ---------------- PARSING ----------------
+
+def iter_line_turns(lines):
+    """
+    Line-oriented speaker detection: yields {"speaker", "text"} per "Name: message" line.
+    Only applies to multi-line chats, so the first turn is held back until a
+    second non-blank line shows up.
+    """
+    pending   = None
+    multiline = False
+    match     = SPEAKER_LINE.match
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        m    = match(line)
+        turn = None
+        if m:
+            name = m.group(1).strip()
+            msg  = m.group(2).strip()
+            if name and msg:
+                turn = {"speaker": name, "text": msg}
+        if multiline:
+            if turn:
+                yield turn
+            continue
+        if pending is None:
+            pending = (turn,)
+            continue
+        multiline = True
+        if pending[0]:
+            yield pending[0]
+        if turn:
+            yield turn
+
+
+def _colon_spans(text: str):
+    """Yields (floor, name_end, colon) per colon: the text before the colon, minus trailing whitespace."""
+    floor = 0
+    colon = text.find(":")
+    while colon != -1:
+        end = floor + len(text[floor:colon].rstrip())
+        yield floor, end, colon
+        floor = colon + 1
+        colon = text.find(":", floor)
+
+
+def parse_inline_turns(text: str) -> list:
+    """Fallback for an inline format — everything on one block of text."""
+    # Scan 1: candidate names, one per colon at most
+    counts = Counter()
+    search = NAME_BEFORE_COLON.search
+    for floor, end, _ in _colon_spans(text):
+        m = search(text, max(floor, end - MAX_NAME), end)
+        if m and end - m.start() > 1:
+            counts[m.group()] += 1
+    if not counts:
+        return []
+
+    # Scan 2: split at the longest known name in front of each colon
+    names   = SuffixTrie(counts)
+    turns   = []
+    speaker = None
+    start   = 0
+    for floor, end, colon in _colon_spans(text):
+        name = names.longest_ending_at(text, end, max(floor, end - MAX_NAME))
+        if name is None:
+            continue
+        if speaker is not None:
+            msg = text[start:end - len(name)].strip()
+            if msg:
+                turns.append({"speaker": speaker, "text": msg})
+        speaker, start = name, colon + 1
+    if speaker is not None:
+        msg = text[start:].strip()
+        if msg:
+            turns.append({"speaker": speaker, "text": msg})
+    return turns
+
+
+def parse_chat_to_turns(text: str) -> list:
+    """
+    Dynamically detects ANY speaker format — no hardcoded names.
+    Handles multi-word names, single-word names, numbered speakers, etc.
+    """
+    turns = list(iter_line_turns(text.split('\n')))
+    return turns or parse_inline_turns(text)
+
+
+# ---------------- FORMAT FOR UI ----------------
+
+def pick_agent_speaker(turns, speakers_in_order):
+    """
+    Determine who is the agent: first speaker, unless their first message
+    sounds like a customer complaint — then agent is the second speaker.
+    """
+    first_speaker = speakers_in_order[0]
+    first_msg     = next(
+        (t['text'].lower() for t in turns if t['speaker'] == first_speaker), ""
+    )
+
+    first_msg_is_customer = CUSTOMER_MATCHER.search(first_msg)
+    first_msg_is_agent    = AGENT_MATCHER.search(first_msg)
+
+    if first_msg_is_customer and not first_msg_is_agent and len(speakers_in_order) > 1:
+        # Swap: second speaker is the agent
+        return speakers_in_order[1]
+    return first_speaker
+
+
+def iter_chat_for_ui(turns):
+    """
+    Maps detected speakers to Speaker 00 / Speaker 01 labels as turns stream
+    in. Only the turns up to the second distinct speaker are buffered (that
+    is all the agent decision needs).
+    """
+    seen     = {}
+    buffered = []
+    agent    = None
+
+    def label(speaker_name):
+        if speaker_name == agent:
+            return "Speaker 00"                     # Agent
+        return f"Speaker {seen[speaker_name]:02d}"  # Customer or others: 01, 02, ...
+
+    for t in turns:
+        if t['speaker'] not in seen:
+            seen[t['speaker']] = len(seen)
+        if agent is None:
+            buffered.append(t)
+            if len(seen) < 2:
+                continue
+            agent = pick_agent_speaker(buffered, list(seen))
+            for b in buffered:
+                yield {"speaker": label(b['speaker']), "text": b['text']}
+            buffered = None
+            continue
+        yield {"speaker": label(t['speaker']), "text": t['text']}
+
+    if buffered:
+        agent = pick_agent_speaker(buffered, list(seen))
+        for b in buffered:
+            yield {"speaker": label(b['speaker']), "text": b['text']}
+
+
+def format_chat_for_ui(turns) -> list:
+    """
+    - Speaker 00 = Agent (whoever opens with a greeting or is NOT asking for help)
+    - Speaker 01 = Customer
+    - Supports 3+ speakers: Speaker 02, Speaker 03, etc.
+    """
+    return list(iter_chat_for_ui(turns))
@@ -0,0 +1,127 @@
+import os
+import time
+import threading
+from collections import deque
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+
+# Must be switched on before the services are imported so their first
+# transcript is already published in memory.
+import handoff
+handoff.enable()
+
+import metrics
+
+import app as audio_service
+import chat_app as chat_service
+import Customer_Emotion_Satisfaction as emotion_service
+import scoring_server as scoring_service
+
+# ---------------- CONFIG ----------------
+# Combined deployment: one process, one set of pooled clients, transcripts
+# handed over in memory. Point the UI config at
+#   AUDIO   = http://<host>:8080/audio
+#   CHAT    = http://<host>:8080/chat
+#   EMOTION = http://<host>:8080/emotion
+#   SCORING = http://<host>:8080/scoring
+# The per-port mode (python app.py, python chat_app.py, ...) is unchanged.
+GATEWAY_PORT = int(os.getenv("GATEWAY_PORT", "8080"))
+
+MOUNTS = {
+    "/audio":   audio_service.app,
+    "/chat":    chat_service.app,
+    "/emotion": emotion_service.app,
+    "/scoring": scoring_service.app,
+}
+
+gateway = FastAPI()
+gateway.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_methods=["*"],
+    allow_headers=["*"],
+    allow_credentials=False,
+    expose_headers=["X-Call-Id", "X-Request-Id", "X-Total-Count", "X-Next-Cursor"],
+)
+
+
+# ---------------- LATENCY TRACKING ----------------
+
+_latency_lock = threading.Lock()
+_latencies    = {prefix: deque(maxlen=2048) for prefix in MOUNTS}
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+@gateway.middleware("http")
+async def track_latency(request: Request, call_next):
+    start    = time.perf_counter()
+    response = await call_next(request)
+    elapsed  = (time.perf_counter() - start) * 1000
+    for prefix in MOUNTS:
+        if request.url.path.startswith(prefix + "/"):
+            with _latency_lock:
+                _latencies[prefix].append(elapsed)
+            break
+    return response
+
+
+def rss_mb() -> float:
+    """Resident set size of this process in MB."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+@gateway.on_event("startup")
+async def start_lag_probe():
+    gateway.state.loop_lag_task = metrics.start_loop_lag_monitor("gateway")
+
+
+# ---------------- API ENDPOINTS ----------------
+
+@gateway.get("/gateway/stats")
+async def gateway_stats():
+    services = {}
+    with _latency_lock:
+        snapshot = {prefix: sorted(values) for prefix, values in _latencies.items()}
+    for prefix, values in snapshot.items():
+        services[prefix] = {
+            "requests": len(values),
+            "p50_ms":   round(_percentile(values, 50), 2),
+            "p95_ms":   round(_percentile(values, 95), 2),
+            "max_ms":   round(values[-1], 2) if values else 0.0,
+        }
+    return {"mode": "gateway", "rss_mb": round(rss_mb(), 1), "services": services}
+
+
+@gateway.get("/metrics", include_in_schema=False)
+async def gateway_metrics():
+    # One registry per process, so this covers all four mounted services
+    return PlainTextResponse(metrics.render_all(), media_type="text/plain; version=0.0.4")
+
+
+@gateway.get("/health")
+async def health():
+    return {"status": "running", "server": "gateway", "port": GATEWAY_PORT, "mounts": list(MOUNTS)}
+
+
+for prefix, service_app in MOUNTS.items():
+    gateway.mount(prefix, service_app)
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(gateway, host="127.0.0.1", port=GATEWAY_PORT)
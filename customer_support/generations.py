@@ -0,0 +1,194 @@
+import os
+import glob
+import time
+import threading
+
+import metrics
+import storage
+import tracing
+
+log = tracing.get_logger("generations")
+
+# ---------------- STORAGE GENERATIONS ----------------
+# The per-call result folders (file_scores/, file_summaries/) are symlinks to
+# their active generation, a plain folder under "<folder>.gen/":
+#
+#     file_scores -> file_scores.gen/00001760861234567890
+#
+# Clearing a folder deletes nothing in the request. Under the folder's
+# exclusive lock (writers hold it shared for each write, see
+# storage.write_json_in_dir) it creates an empty generation and renames a new
+# symlink over the old one. The rename is atomic: readers and writers see the
+# old tree or the new empty one, never a half-deleted one, and the clear costs
+# the same for ten calls as for a million. Retired generations are deleted by
+# a background thread at RECLAIM_FILES_PER_SECOND, so a large history does not
+# starve the disk the services are still using.
+#
+# A folder that is still a plain directory (the first clear after an upgrade)
+# is renamed into "<folder>.gen/" as the oldest retired generation. Every
+# generation older than the active one is reclaimable, so leftovers of a
+# process that exited mid-reclaim go with the next clear. Without flock
+# (Windows dev machines) writers cannot be held off and the folder is emptied
+# in place as before.
+#
+# A single file that is replaced wholesale (the search index database) gets
+# the same treatment with swap_file(): the path is a symlink to the file in
+# its generation folder, "search_index.db -> search_index.db.gen/<name>/
+# search_index.db", so companions created next to it (SQLite's -wal / -shm)
+# live in, and retire with, its generation.
+
+SUFFIX                   = ".gen"
+RECLAIM_FILES_PER_SECOND = float(os.getenv("RECLAIM_FILES_PER_SECOND", "500"))   # 0: unthrottled
+
+
+def generations_dir(directory: str) -> str:
+    return directory.rstrip("/\\") + SUFFIX
+
+
+def _name() -> str:
+    return f"{time.time_ns():020d}"
+
+
+# ---------------- SWAP ----------------
+
+def swap(directory: str) -> bool:
+    """
+    Points `directory` at a new empty generation and leaves the old tree to
+    reclaim(); False when the folder had to be emptied in place instead.
+    """
+    directory = directory.rstrip("/\\")
+    if storage.fcntl is None or not hasattr(os, "symlink"):
+        storage.clear_directory(directory)
+        return False
+    gens = generations_dir(directory)
+    with storage.file_lock(directory):
+        os.makedirs(gens, exist_ok=True)
+        if os.path.isdir(directory) and not os.path.islink(directory):
+            os.rename(directory, os.path.join(gens, _name()))
+        new = os.path.join(gens, _name())
+        os.mkdir(new)
+        link = f"{directory}.{os.getpid()}.tmp"
+        if os.path.lexists(link):
+            os.remove(link)
+        os.symlink(os.path.relpath(new, os.path.dirname(os.path.abspath(directory))), link)
+        os.replace(link, directory)
+    return True
+
+
+def swap_file(path: str) -> bool:
+    """
+    swap() for one file: points `path` at a new generation folder holding no
+    file yet (its owner creates it on first use); False when symlinks are
+    unavailable and nothing was swapped.
+    """
+    if storage.fcntl is None or not hasattr(os, "symlink"):
+        return False
+    gens, name = generations_dir(path), os.path.basename(path)
+    with storage.file_lock(path):
+        os.makedirs(gens, exist_ok=True)
+        if os.path.exists(path) and not os.path.islink(path):
+            old = os.path.join(gens, _name())
+            os.mkdir(old)
+            for companion in sorted(glob.glob(glob.escape(path) + "*")):
+                if companion == path or companion[len(path):] in ("-wal", "-shm", "-journal"):
+                    os.rename(companion, os.path.join(old, os.path.basename(companion)))
+        new = os.path.join(gens, _name())
+        os.mkdir(new)
+        link = f"{path}.{os.getpid()}.tmp"
+        if os.path.lexists(link):
+            os.remove(link)
+        os.symlink(os.path.relpath(os.path.join(new, name), os.path.dirname(os.path.abspath(path))), link)
+        os.replace(link, path)
+    return True
+
+
+def active(path: str):
+    """Name of the generation `path` points at, or None while it is not a generation symlink."""
+    if not os.path.islink(path):
+        return None
+    target = os.path.relpath(os.path.realpath(path), os.path.realpath(generations_dir(path)))
+    return target.split(os.sep)[0]
+
+
+def retired(directory: str) -> list:
+    """Generations older than the active one, oldest first (read under the shared lock: never mid-swap)."""
+    directory = directory.rstrip("/\\")
+    with storage.file_lock(directory, shared=True):
+        try:
+            names = sorted(os.listdir(generations_dir(directory)))
+        except FileNotFoundError:
+            return []
+        current = active(directory)
+    return [os.path.join(generations_dir(directory), name) for name in names if current is None or name < current]
+
+
+# ---------------- RECLAIM ----------------
+
+def reclaim(directory: str, rate: float = None) -> int:
+    """Deletes the retired generations of `directory`, at most `rate` files per second; returns files removed."""
+    rate    = RECLAIM_FILES_PER_SECOND if rate is None else rate
+    folder  = os.path.basename(directory.rstrip("/\\"))
+    removed = 0
+    started = time.monotonic()
+    for generation in retired(directory):
+        for root, _, files in os.walk(generation, topdown=False):
+            for name in files:
+                try:
+                    os.remove(os.path.join(root, name))
+                except FileNotFoundError:      # another worker is reclaiming the same generation
+                    continue
+                removed += 1
+                metrics.RECLAIMED_FILES.labels(folder).inc()
+                ahead = removed / rate - (time.monotonic() - started) if rate > 0 else 0
+                if ahead > 0.05:
+                    time.sleep(ahead)
+            try:
+                os.rmdir(root)
+            except OSError:
+                pass
+    return removed
+
+
+_running      = set()
+_running_lock = threading.Lock()
+
+
+def reclaim_in_background(directory: str):
+    """Starts a reclaimer thread for `directory` unless this process already runs one."""
+    directory = os.path.abspath(directory.rstrip("/\\"))
+    with _running_lock:
+        if directory in _running:
+            return
+        _running.add(directory)
+
+    def run():
+        try:
+            while True:
+                started = time.perf_counter()
+                removed = reclaim(directory)
+                log.info("Reclaimed %d files of %s in %.1f s", removed, directory, time.perf_counter() - started)
+                with _running_lock:
+                    # A clear during the run retires another generation: go again
+                    if not retired(directory):
+                        _running.discard(directory)
+                        return
+        except Exception as e:
+            log.exception("Reclaim of %s failed: %s", directory, e)
+            with _running_lock:
+                _running.discard(directory)
+
+    threading.Thread(target=run, name=f"reclaim-{os.path.basename(directory)}", daemon=True).start()
+
+
+def clear(directory: str):
+    """Constant-time clear: swap in an empty generation, reclaim the old one in the background."""
+    if swap(directory):
+        reclaim_in_background(directory)
+
+
+def clear_file(path: str) -> bool:
+    """clear() for one file (swap_file); False when it could not be swapped and the caller must empty it."""
+    if not swap_file(path):
+        return False
+    reclaim_in_background(path)
+    return True
@@ -0,0 +1,13 @@
+# Multi-worker mode, e.g. from this directory:
+#   gunicorn scoring_server:app
+#   PORT=8000 gunicorn app:app
+# Result files are written atomically, history appends are flock'ed and the
+# "latest result" files are scoped per X-Session-Id (see storage.py), so any
+# worker can serve any request.
+import os
+import multiprocessing
+
+bind         = f"{os.getenv('HOST', '127.0.0.1')}:{os.getenv('PORT', '8003')}"
+workers      = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn_worker.UvicornWorker"   # uvicorn.workers is deprecated
+timeout      = int(os.getenv("WORKER_TIMEOUT", "120"))
@@ -0,0 +1,54 @@
+import os
+import time
+import threading
+
+import metrics
+
+# ---------------- IN-MEMORY TRANSCRIPT HANDOFF ----------------
+# When all services run inside gateway.py, the transcript produced by
+# /upload or /upload-text is handed to /analyze-quality and /analyze as a
+# Python object instead of being re-read from the CSV files. In the default
+# per-port mode ENABLED stays False and every call here is a no-op.
+
+ENABLED = os.getenv("AUDITOR_GATEWAY", "0") == "1"
+
+_lock   = threading.Lock()
+_latest = {}   # (session, source) -> {"filename", "transcript", "published_at"}
+
+DEFAULT_SESSION = "default"
+
+
+def enable():
+    global ENABLED
+    ENABLED = True
+
+
+def publish(source: str, filename: str, transcript: list, session: str = DEFAULT_SESSION):
+    if not ENABLED:
+        return
+    with _lock:
+        _latest[(session, source)] = {
+            "filename":     filename,
+            "transcript":   transcript,
+            "published_at": time.time(),
+        }
+
+
+def latest(source: str, filename: str = None, session: str = DEFAULT_SESSION):
+    """Returns the most recent transcript for `source`, optionally only if it belongs to `filename`."""
+    if not ENABLED:
+        return None
+    with _lock:
+        entry = _latest.get((session, source))
+    if entry is None or (filename is not None and entry["filename"] != filename):
+        metrics.record_cache("transcript_handoff", False)
+        return None
+    metrics.record_cache("transcript_handoff", True)
+    return entry["transcript"]
+
+
+def clear(source: str = None, session: str = None):
+    with _lock:
+        for key in list(_latest):
+            if (session is None or key[0] == session) and (source is None or key[1] == source):
+                del _latest[key]
@@ -0,0 +1,532 @@
+import os
+import json
+import time
+import uuid
+import random
+import socket
+import sqlite3
+import threading
+from contextlib import contextmanager
+from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi.middleware.cors import CORSMiddleware
+
+import metrics
+import tracing
+import turns
+
+log = tracing.get_logger("jobs")
+
+# ---------------- CONFIG ----------------
+BASE_DIR     = os.path.dirname(os.path.abspath(__file__))
+JOBS_DB      = os.getenv("JOBS_DB", os.path.join(BASE_DIR, "pipeline_jobs.db"))
+PAYLOADS_DIR = os.path.join(BASE_DIR, "job_payloads")
+os.makedirs(PAYLOADS_DIR, exist_ok=True)
+
+# Stages run in this order; a job only moves forward once a stage finished.
+STAGES = ["transcribe", "summarize", "score", "analyze"]
+
+# Parallelism per stage, e.g. JOB_WORKERS_SCORE=4
+STAGE_WORKERS = {
+    stage: int(os.getenv(f"JOB_WORKERS_{stage.upper()}", "2"))
+    for stage in STAGES
+}
+
+MAX_ATTEMPTS  = int(os.getenv("JOB_MAX_ATTEMPTS", "4"))
+BACKOFF_BASE  = float(os.getenv("JOB_BACKOFF_BASE", "2.0"))   # seconds
+BACKOFF_MAX   = float(os.getenv("JOB_BACKOFF_MAX", "120.0"))
+LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "600"))  # running job considered dead after this
+POLL_SECONDS  = float(os.getenv("JOB_POLL_SECONDS", "1.0"))
+
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".m4a", ".mp4")
+
+# Each lease records its owner, "<host>:<pid>:<boot id>". Several processes
+# may share the queue (gunicorn workers, a restarted process next to live
+# ones): at startup a process only takes over leases whose owner on this
+# host has exited; every other stale lease is requeued once it expires.
+HOST  = socket.gethostname()
+_BOOT = {}      # pid -> boot id; a forked worker gets its own
+
+
+def owner_id() -> str:
+    pid = os.getpid()
+    return f"{HOST}:{pid}:{_BOOT.setdefault(pid, uuid.uuid4().hex[:8])}"
+
+
+def owner_alive(owner: str) -> bool:
+    """False only for an owner known to be gone; owners on other hosts are assumed alive."""
+    host, _, rest = (owner or "").partition(":")
+    pid, _, boot = rest.partition(":")
+    if host != HOST or not pid.isdigit():
+        return True
+    if int(pid) == os.getpid():
+        return owner == owner_id()      # same pid, earlier boot: this process replaced it
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except OSError:                     # exists, but not ours to signal
+        return True
+    return True
+
+
+# ---------------- STORE ----------------
+
+class JobStore:
+    """
+    SQLite-backed job table. Every state change is a single transaction, so a
+    crash leaves each job either at its last completed stage or mid-lease.
+    """
+
+    def __init__(self, path: str = JOBS_DB):
+        self.path = path
+        with self._session() as db:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id           TEXT PRIMARY KEY,
+                    filename     TEXT NOT NULL,
+                    kind         TEXT NOT NULL,
+                    payload_path TEXT NOT NULL,
+                    stage        TEXT NOT NULL,
+                    status       TEXT NOT NULL,
+                    attempts     INTEGER NOT NULL DEFAULT 0,
+                    next_run_at  REAL NOT NULL,
+                    lease_until  REAL,
+                    owner        TEXT,
+                    outputs      TEXT NOT NULL DEFAULT '{}',
+                    error        TEXT,
+                    created_at   REAL NOT NULL,
+                    updated_at   REAL NOT NULL
+                )
+            """)
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (stage, status, next_run_at)"
+            )
+            if "owner" not in {row["name"] for row in db.execute("PRAGMA table_info(jobs)")}:
+                db.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")   # queues created before lease owners
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    @contextmanager
+    def _session(self):
+        db = self._connect()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def enqueue(self, filename: str, kind: str, payload_path: str, job_id: str = None) -> str:
+        job_id = job_id or uuid.uuid4().hex
+        now    = time.time()
+        with self._session() as db:
+            db.execute(
+                "INSERT INTO jobs (id, filename, kind, payload_path, stage, status, "
+                "next_run_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, filename, kind, payload_path, STAGES[0], now, now, now),
+            )
+        return job_id
+
+    def claim(self, stage: str):
+        """Atomically leases the oldest runnable job waiting on `stage`."""
+        now = time.time()
+        db  = self._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute(
+                "SELECT * FROM jobs WHERE stage = ? AND status IN ('queued', 'retry') "
+                "AND next_run_at <= ? ORDER BY created_at LIMIT 1",
+                (stage, now),
+            ).fetchone()
+            if row is None:
+                db.execute("COMMIT")
+                return None
+            db.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, "
+                "lease_until = ?, owner = ?, updated_at = ? WHERE id = ?",
+                (now + LEASE_SECONDS, owner_id(), now, row["id"]),
+            )
+            db.execute("COMMIT")
+            job = dict(row)
+            job["attempts"]   += 1
+            job["lease_until"] = now + LEASE_SECONDS     # the lease token: later updates must match it
+            job["owner"]       = owner_id()
+            job["outputs"]     = json.loads(job["outputs"])
+            return job
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        finally:
+            db.close()
+
+    # Updates of a claimed job only apply while the worker still holds its
+    # lease: once it expired and the job was re-leased, they match no row.
+    _OWNED = "id = ? AND stage = ? AND status = 'running' AND lease_until = ?"
+
+    def _owned(self, job: dict) -> tuple:
+        return job["id"], job["stage"], job["lease_until"]
+
+    def checkpoint(self, job: dict, name: str, value) -> bool:
+        """Persists a partial result of the running stage in the job's outputs (seen again by a retry)."""
+        job["outputs"] = dict(job["outputs"], **{name: value})
+        with self._session() as db:
+            cur = db.execute(
+                f"UPDATE jobs SET outputs = ?, updated_at = ? WHERE {self._OWNED}",
+                (json.dumps(job["outputs"]), time.time(), *self._owned(job)),
+            )
+            return cur.rowcount == 1
+
+    def complete_stage(self, job: dict, output) -> bool:
+        """Stores the stage output and advances the job to the next stage; False if the lease was lost."""
+        outputs = dict(job["outputs"])
+        outputs[job["stage"]] = output
+        idx = STAGES.index(job["stage"])
+        if idx + 1 < len(STAGES):
+            next_stage, status = STAGES[idx + 1], "queued"
+        else:
+            next_stage, status = job["stage"], "done"
+        now = time.time()
+        with self._session() as db:
+            cur = db.execute(
+                "UPDATE jobs SET stage = ?, status = ?, attempts = 0, next_run_at = ?, "
+                f"lease_until = NULL, outputs = ?, error = NULL, updated_at = ? WHERE {self._OWNED}",
+                (next_stage, status, now, json.dumps(outputs), now, *self._owned(job)),
+            )
+            return cur.rowcount == 1
+
+    def fail_stage(self, job: dict, error: str):
+        """Schedules a retry with exponential backoff, or marks the job failed; "lost" if the lease was lost."""
+        now = time.time()
+        if job["attempts"] >= MAX_ATTEMPTS:
+            status, next_run_at = "failed", now
+        else:
+            delay = min(BACKOFF_BASE * (2 ** (job["attempts"] - 1)), BACKOFF_MAX)
+            status, next_run_at = "retry", now + delay * random.uniform(0.8, 1.2)
+        with self._session() as db:
+            cur = db.execute(
+                "UPDATE jobs SET status = ?, next_run_at = ?, lease_until = NULL, "
+                f"error = ?, updated_at = ? WHERE {self._OWNED}",
+                (status, next_run_at, error[:500], now, *self._owned(job)),
+            )
+        return status if cur.rowcount == 1 else "lost"
+
+    def recover_expired(self) -> int:
+        """Requeues jobs whose worker died mid-stage (expired lease)."""
+        now = time.time()
+        with self._session() as db:
+            cur = db.execute(
+                "UPDATE jobs SET status = 'queued', lease_until = NULL, updated_at = ? "
+                "WHERE status = 'running' AND lease_until < ?",
+                (now, now),
+            )
+            return cur.rowcount
+
+    def recover_dead_owners(self) -> int:
+        """Requeues running jobs whose owner process on this host has exited (a restart), lease or not."""
+        now = time.time()
+        with self._session() as db:
+            running = db.execute("SELECT id, owner FROM jobs WHERE status = 'running' AND owner IS NOT NULL").fetchall()
+            dead    = [(now, row["id"], row["owner"]) for row in running if not owner_alive(row["owner"])]
+            cur = db.executemany(
+                "UPDATE jobs SET status = 'queued', lease_until = NULL, updated_at = ? "
+                "WHERE id = ? AND owner = ? AND status = 'running'",
+                dead,
+            )
+            return cur.rowcount
+
+    def requeue(self, job_id: str):
+        """Puts a failed job back in the queue at the stage it failed on."""
+        now = time.time()
+        with self._session() as db:
+            cur = db.execute(
+                "UPDATE jobs SET status = 'queued', attempts = 0, next_run_at = ?, "
+                "updated_at = ? WHERE id = ? AND status = 'failed'",
+                (now, now, job_id),
+            )
+            return cur.rowcount == 1
+
+    def get(self, job_id: str):
+        with self._session() as db:
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["outputs"] = json.loads(job["outputs"])
+        return job
+
+    def list_jobs(self, status: str = None, limit: int = 50) -> list:
+        query, args = "SELECT id, filename, kind, stage, status, attempts, error, created_at, updated_at FROM jobs", []
+        if status:
+            query += " WHERE status = ?"
+            args.append(status)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        args.append(limit)
+        with self._session() as db:
+            return [dict(r) for r in db.execute(query, args).fetchall()]
+
+    def counts(self) -> dict:
+        with self._session() as db:
+            rows = db.execute(
+                "SELECT stage, status, COUNT(*) AS n FROM jobs GROUP BY stage, status"
+            ).fetchall()
+        counts = {}
+        for r in rows:
+            counts.setdefault(r["stage"], {})[r["status"]] = r["n"]
+        return counts
+
+
+# ---------------- STAGE HANDLERS ----------------
+# Each handler only depends on the job payload and the outputs of earlier
+# stages, and every file it writes is overwritten, so re-running a stage
+# after a crash produces the same result. The one append, the summary
+# history row, is made idempotent with a checkpoint (see _record_summary).
+
+class LeaseLost(RuntimeError):
+    """The job's lease expired and another worker owns it now."""
+
+def _read_payload(job: dict) -> bytes:
+    with open(job["payload_path"], "rb") as f:
+        return f.read()
+
+
+def _decode_text(raw: bytes) -> str:
+    try:
+        return raw.decode("utf-8")
+    except Exception:
+        return raw.decode("latin-1")
+
+
+def handle_transcribe(job: dict):
+    if job["kind"] == "audio":
+        import app as audio_service
+        transcript, summary = audio_service.transcribe_audio(_read_payload(job), job["filename"])
+        return {"transcript": transcript.to_records(), "summary": summary}
+
+    import chat_app
+    transcript = chat_app.save_chat_transcript(_decode_text(_read_payload(job)), job["filename"])
+    return {"transcript": transcript.to_records()}
+
+
+def _record_summary(job: dict, path: str, summary: str, record):
+    """
+    Runs record(filename, summary, history=...) so the history row is
+    appended once per job: before the append, the log's row count and the
+    summary are checkpointed on the job; a retry that finds the row after
+    that mark skips the append.
+    """
+    import summary_log
+    mark = job["outputs"].get("summary_log")
+    if mark is not None and summary_log.appended_since(path, mark["rows"], job["filename"], mark["summary"]):
+        record(job["filename"], mark["summary"], history=False)
+        return
+    if not store.checkpoint(job, "summary_log", {"rows": summary_log.count(path), "summary": summary}):
+        raise LeaseLost(job["id"])
+    record(job["filename"], summary)
+
+
+def handle_summarize(job: dict):
+    retried = (job["outputs"].get("summary_log") or {}).get("summary")
+    if job["kind"] == "audio":
+        import app as audio_service
+        summary = job["outputs"]["transcribe"]["summary"]
+        _record_summary(job, audio_service.SUMMARY_FILE, summary, audio_service.record_audio_summary)
+        return {"summary": summary}
+
+    import chat_app
+    # No local fallback here: a failure is surfaced as an error so the queue
+    # retries with backoff (small chats are still summarized locally)
+    summary = retried or chat_app.summarize_text(_decode_text(_read_payload(job)), fallback=False)
+    if summary.startswith("Summary failed"):
+        raise RuntimeError(summary)
+    _record_summary(job, chat_app.SUMMARY_FILE, summary, chat_app.record_text_summary)
+    return {"summary": summary}
+
+
+def handle_score(job: dict):
+    import scoring_server
+    transcript = turns.Turns.from_records(job["outputs"]["transcribe"]["transcript"])
+    return scoring_server.score_conversation(transcript.conversation(), job["filename"])
+
+
+def handle_analyze(job: dict):
+    import Customer_Emotion_Satisfaction as emotion_service
+    transcript = turns.Turns.from_records(job["outputs"]["transcribe"]["transcript"])
+    return emotion_service.run_analysis(transcript, job["kind"])
+
+
+STAGE_HANDLERS = {
+    "transcribe": handle_transcribe,
+    "summarize":  handle_summarize,
+    "score":      handle_score,
+    "analyze":    handle_analyze,
+}
+
+
+# ---------------- WORKER POOLS ----------------
+
+class StagePool:
+    """A fixed number of threads pulling jobs for a single stage."""
+
+    def __init__(self, store: JobStore, stage: str, workers: int):
+        self.store   = store
+        self.stage   = stage
+        self.workers = workers
+        self.wakeup  = threading.Event()
+        self.stopped = threading.Event()
+        self.threads = []
+
+    def start(self):
+        for i in range(self.workers):
+            t = threading.Thread(target=self._run, name=f"{self.stage}-worker-{i}", daemon=True)
+            t.start()
+            self.threads.append(t)
+
+    def stop(self):
+        self.stopped.set()
+        self.wakeup.set()
+        for t in self.threads:
+            t.join(timeout=5)
+
+    def _run(self):
+        handler = STAGE_HANDLERS[self.stage]
+        while not self.stopped.is_set():
+            job = self.store.claim(self.stage)
+            if job is None:
+                self.wakeup.wait(POLL_SECONDS)
+                self.wakeup.clear()
+                continue
+            try:
+                with tracing.bind_call(job["id"]), \
+                     tracing.span(log, f"job.{self.stage}", attempt=job["attempts"]):
+                    output = handler(job)
+                if not self.store.complete_stage(job, output):
+                    raise LeaseLost(job["id"])
+                if self.stage == STAGES[-1] and os.path.exists(job["payload_path"]):
+                    os.remove(job["payload_path"])
+                log.info("job %s finished stage %r", job["id"], self.stage)
+                on_stage_done(job["stage"])
+            except LeaseLost:
+                log.warning("job %s lost its lease on stage %r; leaving it to its new worker", job["id"], self.stage)
+            except Exception as e:
+                metrics.record_error("jobs", e)
+                status = self.store.fail_stage(job, f"{type(e).__name__}: {e}")
+                log.warning("job %s stage %r failed (attempt %d/%d) → %s: %s",
+                            job["id"], self.stage, job["attempts"], MAX_ATTEMPTS, status, e)
+
+
+store = JobStore()
+pools = {stage: StagePool(store, stage, STAGE_WORKERS[stage]) for stage in STAGES}
+
+
+def on_stage_done(stage: str):
+    """Wakes the next stage's pool instead of waiting for its poll interval."""
+    idx = STAGES.index(stage)
+    if idx + 1 < len(STAGES):
+        pools[STAGES[idx + 1]].wakeup.set()
+
+
+def _reaper():
+    while not pools[STAGES[0]].stopped.is_set():
+        time.sleep(LEASE_SECONDS / 4)
+        recovered = store.recover_expired()
+        if recovered:
+            log.warning("requeued %d job(s) with expired leases", recovered)
+
+
+def start_workers():
+    recovered = store.recover_dead_owners()
+    if recovered:
+        log.info("resuming %d interrupted job(s) from their last completed stage", recovered)
+    for pool in pools.values():
+        pool.start()
+    threading.Thread(target=_reaper, name="job-reaper", daemon=True).start()
+
+
+def stop_workers():
+    for pool in pools.values():
+        pool.stop()
+
+
+# ---------------- API ENDPOINTS ----------------
+
+app = FastAPI()
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_methods=["*"],
+    allow_headers=["*"],
+    allow_credentials=False,
+    expose_headers=["X-Call-Id", "X-Request-Id"],
+)
+metrics.instrument(app, "jobs")
+tracing.instrument(app, "jobs")
+
+
+@app.on_event("startup")
+async def on_startup():
+    start_workers()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    stop_workers()
+
+
+@app.post("/jobs")
+async def submit_job(file: UploadFile = File(...)):
+    data = await file.read()
+    if not data:
+        raise HTTPException(status_code=400, detail="Empty file.")
+
+    job_id       = uuid.uuid4().hex
+    kind         = "audio" if file.filename.lower().endswith(AUDIO_EXTENSIONS) else "text"
+    payload_path = os.path.join(PAYLOADS_DIR, job_id)
+    with open(payload_path, "wb") as f:
+        f.write(data)
+
+    store.enqueue(file.filename, kind, payload_path, job_id=job_id)
+    pools[STAGES[0]].wakeup.set()
+    return {"job_id": job_id, "kind": kind, "stage": STAGES[0], "status": "queued"}
+
+
+@app.get("/jobs")
+async def list_jobs(status: str = None, limit: int = 50):
+    return store.list_jobs(status=status, limit=min(limit, 500))
+
+
+@app.get("/jobs/stats")
+async def job_stats():
+    return {"workers": STAGE_WORKERS, "counts": store.counts()}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found: " + job_id)
+    job.pop("payload_path", None)
+    return job
+
+
+@app.post("/jobs/{job_id}/retry")
+async def retry_job(job_id: str):
+    job = store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found: " + job_id)
+    if not store.requeue(job_id):
+        raise HTTPException(status_code=409, detail="Only failed jobs can be retried.")
+    pools[job["stage"]].wakeup.set()
+    return {"job_id": job_id, "stage": job["stage"], "status": "queued"}
+
+
+@app.get("/health")
+async def health():
+    return {"status": "running", "server": "job_queue", "port": 8004}
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="127.0.0.1", port=8004)
@@ -0,0 +1,122 @@
+import re
+import numpy as np
+
+# ---------------- LOCAL EXTRACTIVE SUMMARIZER ----------------
+# Centroid summarization over TF-IDF: every sentence is scored by cosine
+# similarity to the document centroid and the best ones are returned in
+# their original order, skipping near-duplicates. The term matrix is kept
+# in coordinate form (row, term, weight) so all scoring is a handful of
+# NumPy bincounts — a few milliseconds for a normal chat on one core.
+# Used for short chats (no Deepgram round trip) and when Deepgram fails.
+
+MAX_SENTENCES   = 4
+MAX_CHARS       = 600
+MIN_WORDS       = 4
+MAX_INPUT_CHARS = 200_000     # longer inputs are summarized from their first 200k characters
+REDUNDANCY      = 0.6         # cosine above which a candidate repeats an already picked sentence
+POSITION_WEIGHT = 0.5         # calls state their purpose early: boost by 1 + w / sqrt(1 + index)
+
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+|\n+')
+# Leading "[10:02 AM]"-style timestamps and "Name (Company):" speaker labels
+SPEAKER_PREFIX = re.compile(
+    r'^\s*(?:\[?\d{1,2}(?::\d{2})*\s*(?:[AaPp][Mm])?\]?\s*)?'
+    r'(?:[A-Za-z][A-Za-z0-9_ ()]{0,40}?\s*:\s+)?'
+)
+WORD           = re.compile(r"[a-z0-9']+")
+
+STOPWORDS = frozenset("""
+a about above after again all am an and any are as at be because been before being below between both
+but by can could did do does doing down during each few for from further had has have having he her here
+hers him his how i if in into is it its itself just let me more most my no nor not now of off on once only
+or other our ours out over own same she should so some such than that the their theirs them then there
+these they this those through to too under until up very was we were what when where which while who whom
+why will with would you your yours yeah yes ok okay oh um uh hi hello thanks thank please i'm it's that's
+don't i'll you're we're can't
+""".split())
+
+
+def split_sentences(text: str) -> list:
+    sentences = []
+    for raw in SENTENCE_SPLIT.split(text[:MAX_INPUT_CHARS]):
+        sentence = SPEAKER_PREFIX.sub("", raw).strip()
+        if sentence:
+            sentences.append(sentence)
+    return sentences
+
+
+def _term_matrix(sentences: list):
+    """COO TF-IDF: (row index, term index, weight) arrays plus the vocabulary size."""
+    vocab, rows, cols = {}, [], []
+    for i, sentence in enumerate(sentences):
+        for word in WORD.findall(sentence.lower()):
+            if word in STOPWORDS or len(word) < 2:
+                continue
+            rows.append(i)
+            cols.append(vocab.setdefault(word, len(vocab)))
+    if not rows:
+        return None
+
+    rows = np.asarray(rows, dtype=np.int64)
+    cols = np.asarray(cols, dtype=np.int64)
+    # Collapse repeated (sentence, term) pairs into counts
+    keys, counts = np.unique(rows * len(vocab) + cols, return_counts=True)
+    rows, cols   = keys // len(vocab), keys % len(vocab)
+
+    doc_freq = np.bincount(cols, minlength=len(vocab))
+    idf      = np.log((1 + len(sentences)) / (1 + doc_freq)) + 1.0
+    weights  = (1.0 + np.log(counts)) * idf[cols]
+    return rows, cols, weights, len(vocab)
+
+
+def _cosine_to_centroid(rows, cols, weights, n_rows: int, n_terms: int) -> np.ndarray:
+    centroid  = np.bincount(cols, weights=weights, minlength=n_terms) / n_rows
+    dots      = np.bincount(rows, weights=weights * centroid[cols], minlength=n_rows)
+    row_norms = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=n_rows))
+    denom     = row_norms * np.linalg.norm(centroid)
+    return np.divide(dots, denom, out=np.zeros(n_rows), where=denom > 0)
+
+
+def _dense_rows(rows, cols, weights, picked: np.ndarray, n_terms: int) -> np.ndarray:
+    """Unit-normalized dense vectors for a few candidate sentences (redundancy check)."""
+    index = {r: i for i, r in enumerate(picked.tolist())}
+    mask  = np.isin(rows, picked)
+    dense = np.zeros((len(picked), n_terms))
+    dense[[index[r] for r in rows[mask].tolist()], cols[mask]] = weights[mask]
+    norms = np.linalg.norm(dense, axis=1, keepdims=True)
+    return np.divide(dense, norms, out=np.zeros_like(dense), where=norms > 0)
+
+
+def summarize(text: str, max_sentences: int = MAX_SENTENCES, max_chars: int = MAX_CHARS) -> str:
+    """Extractive summary of a chat or transcript; "" when there is nothing to summarize."""
+    sentences = split_sentences(text)
+    if len(sentences) <= 1:
+        return sentences[0][:max_chars] if sentences else ""
+
+    matrix = _term_matrix(sentences)
+    if matrix is None:
+        return " ".join(sentences[:max_sentences])[:max_chars]
+    rows, cols, weights, n_terms = matrix
+
+    scores = _cosine_to_centroid(rows, cols, weights, len(sentences), n_terms)
+    words  = np.fromiter((len(s.split()) for s in sentences), dtype=np.int64, count=len(sentences))
+    scores[words < MIN_WORDS] *= 0.25      # fillers like "Sure." rarely carry the topic
+    scores *= 1.0 + POSITION_WEIGHT / np.sqrt(1.0 + np.arange(len(sentences)))
+
+    candidates = np.argsort(-scores, kind="stable")[: max_sentences * 4]
+    vectors    = _dense_rows(rows, cols, weights, candidates, n_terms)
+
+    chosen, chosen_vecs, length = [], [], 0
+    for idx, vec in zip(candidates.tolist(), vectors):
+        if scores[idx] <= 0 or len(chosen) >= max_sentences:
+            break
+        if chosen_vecs and float(np.max(np.stack(chosen_vecs) @ vec)) > REDUNDANCY:
+            continue
+        if chosen and length + len(sentences[idx]) > max_chars:
+            continue
+        chosen.append(idx)
+        chosen_vecs.append(vec)
+        length += len(sentences[idx]) + 1
+
+    if not chosen:
+        return sentences[0][:max_chars]
+    return " ".join(sentences[i] for i in sorted(chosen))
@@ -0,0 +1,330 @@
+import os
+import asyncio
+import threading
+from bisect import bisect_left
+from time import perf_counter
+from fastapi.responses import PlainTextResponse
+
+# ---------------- PROMETHEUS-STYLE METRICS ----------------
+# Dependency-free registry exposed as text format on GET /metrics.
+# Hot-path cost is kept flat: label children are created once and cached,
+# histogram buckets are a pre-allocated list, and observe() is a bisect plus
+# two additions under a lock. Each process (gunicorn worker) has its own
+# registry; scrape every worker or aggregate on the Prometheus side.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+IO_BUCKETS      = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0)
+BYTES_BUCKETS   = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+LAG_BUCKETS     = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.05"))
+
+_registry      = []
+_registry_lock = threading.Lock()
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name       = name
+        self.doc        = documentation
+        self.labelnames = tuple(labelnames)
+        self._children  = {}
+        self._lock      = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._new_child()
+                    self._children[values] = child
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(child.render(self.name, self.labelnames, values))
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock  = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    def render(self, name, labelnames, values):
+        return [f"{name}{_format_labels(labelnames, values)} {self._value}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def set(self, value: float):
+        self._value = value
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+
+class _HistogramChild:
+    __slots__ = ("_bounds", "_counts", "_sum", "_lock")
+
+    def __init__(self, bounds):
+        self._bounds = bounds
+        self._counts = [0] * (len(bounds) + 1)   # last slot is +Inf
+        self._sum    = 0.0
+        self._lock   = threading.Lock()
+
+    def observe(self, value: float):
+        idx = bisect_left(self._bounds, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum         += value
+
+    def render(self, name, labelnames, values):
+        with self._lock:
+            counts, total = list(self._counts), self._sum
+        lines, cumulative = [], 0
+        for bound, count in zip(self._bounds, counts):
+            cumulative += count
+            le = 'le="%s"' % bound
+            lines.append(f"{name}_bucket{_format_labels(labelnames, values, le)} {cumulative}")
+        cumulative += counts[-1]
+        inf = 'le="+Inf"'
+        lines.append(f"{name}_bucket{_format_labels(labelnames, values, inf)} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labelnames, values)} {total}")
+        lines.append(f"{name}_count{_format_labels(labelnames, values)} {cumulative}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+
+class _Timer:
+    __slots__ = ("_child", "_start")
+
+    def __init__(self, child):
+        self._child = child
+
+    def __enter__(self):
+        self._start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._child.observe(perf_counter() - self._start)
+        return False
+
+
+def timed(histogram: Histogram, *labels):
+    """`with timed(UPSTREAM_SECONDS, "groq", "chat_completion"): ...`"""
+    return _Timer(histogram.labels(*labels))
+
+
+def render_all() -> str:
+    with _registry_lock:
+        metrics = list(_registry)
+    lines = []
+    for m in metrics:
+        lines.extend(m.render())
+    return "\n".join(lines) + "\n"
+
+
+# ---------------- AUDITOR METRICS ----------------
+
+REQUEST_SECONDS = Histogram(
+    "auditor_request_seconds", "Total request time by service and route.",
+    ("service", "method", "route", "status"),
+)
+UPSTREAM_SECONDS = Histogram(
+    "auditor_upstream_seconds", "Latency of Deepgram / Groq calls.",
+    ("provider", "operation"),
+)
+IO_SECONDS = Histogram(
+    "auditor_io_seconds", "CSV / JSON file read and write time.",
+    ("operation",), buckets=IO_BUCKETS,
+)
+PAYLOAD_BYTES = Histogram(
+    "auditor_payload_bytes", "Request and response body sizes.",
+    ("service", "direction"), buckets=BYTES_BUCKETS,
+)
+TOKENS = Counter(
+    "auditor_llm_tokens_total", "LLM tokens used, split into prompt and completion.",
+    ("model", "kind"),
+)
+CACHE_REQUESTS = Counter(
+    "auditor_cache_requests_total", "Cache lookups by cache and result (hit/miss).",
+    ("cache", "result"),
+)
+ERRORS = Counter(
+    "auditor_errors_total", "Errors by service and exception type.",
+    ("service", "exception"),
+)
+SUMMARIES = Counter(
+    "auditor_summaries_total", "Summaries produced, by service and source (deepgram/local/fallback).",
+    ("service", "source"),
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "auditor_admission_in_flight", "Admitted requests currently running, per gated route.",
+    ("service", "route"),
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "auditor_admission_queue_depth", "Requests waiting for a slot, per gated route.",
+    ("service", "route"),
+)
+ADMISSION_WAIT_SECONDS = Histogram(
+    "auditor_admission_wait_seconds", "Time queued requests waited for a slot.",
+    ("service", "route"),
+)
+ADMISSION_REJECTIONS = Counter(
+    "auditor_admission_rejections_total",
+    "429s by route and reason (queue_full/predicted_wait/wait_timeout/upstream).",
+    ("service", "route", "reason"),
+)
+RECLAIMED_FILES = Counter(
+    "auditor_reclaimed_files_total", "Files deleted from retired storage generations, by folder.",
+    ("folder",),
+)
+LOOP_LAG_SECONDS = Histogram(
+    "auditor_event_loop_lag_seconds",
+    "How late the event loop woke a periodic timer; sustained lag means blocking code in async handlers.",
+    ("service",), buckets=LAG_BUCKETS,
+)
+
+
+def record_tokens(model: str, usage):
+    """Records the `usage` block of a Groq chat completion, if present."""
+    if usage is None:
+        return
+    TOKENS.labels(model, "prompt").inc(getattr(usage, "prompt_tokens", 0) or 0)
+    TOKENS.labels(model, "completion").inc(getattr(usage, "completion_tokens", 0) or 0)
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def record_error(service: str, exc: BaseException):
+    ERRORS.labels(service, type(exc).__name__).inc()
+
+
+# ---------------- EVENT LOOP LAG ----------------
+
+async def _watch_loop_lag(child, interval: float):
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        child.observe(max(0.0, loop.time() - start - interval))
+
+
+def start_loop_lag_monitor(service: str):
+    """Starts the lag probe on the running loop; call from a startup handler."""
+    return asyncio.get_running_loop().create_task(
+        _watch_loop_lag(LOOP_LAG_SECONDS.labels(service), LOOP_LAG_INTERVAL)
+    )
+
+
+# ---------------- ASGI INSTRUMENTATION ----------------
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: total request time, payload sizes and uncaught errors."""
+
+    def __init__(self, app, service: str):
+        self.app     = app
+        self.service = service
+        self.bytes_in  = PAYLOAD_BYTES.labels(service, "request")
+        self.bytes_out = PAYLOAD_BYTES.labels(service, "response")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = perf_counter()
+        state = [500, 0]   # status, response bytes
+
+        for key, value in scope.get("headers", ()):
+            if key == b"content-length":
+                self.bytes_in.observe(int(value))
+                break
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state[0] = message["status"]
+            elif message["type"] == "http.response.body":
+                state[1] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            record_error(self.service, e)
+            raise
+        finally:
+            route = scope.get("route")
+            path  = getattr(route, "path", None) or "unmatched"
+            REQUEST_SECONDS.labels(self.service, scope["method"], path, str(state[0])).observe(
+                perf_counter() - start
+            )
+            self.bytes_out.observe(state[1])
+
+
+def instrument(app, service: str):
+    """Adds the metrics middleware, the loop lag probe and a GET /metrics endpoint to a service app."""
+    app.add_middleware(MetricsMiddleware, service=service)
+
+    # Mounted apps (gateway.py) never see startup events; the gateway runs its own probe
+    @app.on_event("startup")
+    async def start_lag_probe():
+        app.state.loop_lag_task = start_loop_lag_monitor(service)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics_endpoint():
+        return PlainTextResponse(render_all(), media_type="text/plain; version=0.0.4")
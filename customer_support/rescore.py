@@ -0,0 +1,331 @@
+"""
+Offline re-scoring after a rubric change. Re-grades the stored transcript of
+every call in file_scores/ under a named rubric version and writes the
+results next to the live scores, never over them:
+
+    file_scores/<call>.json                          live scores (rubric_version inside)
+    file_scores/transcripts/<call>.json              the conversation they were graded from
+    file_scores/versions/<version>/<call>.json       re-scored results
+    file_scores/versions/<version>/rubric.txt        the prompt the version is graded with
+    file_scores/versions/<version>/checkpoint.db     finished / failed calls
+
+Calls scored before transcripts were kept fall back to their turns in the
+search index. Groq calls run --concurrency at a time inside --rpm / --tpm
+(sliding one-minute windows); progress is checkpointed per call, so an
+interrupted run picks up where it stopped when it is run again.
+
+    python rescore.py run v3 --prompt-file rubric_v3.txt
+    python rescore.py run v2 --concurrency 8 --rpm 300       # a version from scoring_server.RUBRICS
+    python rescore.py diff live v2 --top 20
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from collections import deque
+
+import archive
+import bulk_ingest
+import scoring_server
+import search_index
+import storage
+import tracing
+
+log = tracing.get_logger("rescore")
+
+# ---------------- CONFIG ----------------
+SCORES_DIR       = scoring_server.SCORES_DIR
+SCORE_FIELDS     = ("empathy", "compliance", "resolution")
+BIG_CHANGE       = 3          # |delta| counted as a large change in diff reports
+CHARS_PER_TOKEN  = 4          # rough prompt-token estimate for --tpm
+REPLY_TOKENS     = 1500       # grade_conversation's max_tokens
+MAX_CONV_CHARS   = 8000       # grade_conversation trims longer transcripts
+PROGRESS_SECONDS = 1.0
+
+
+def version_dir(version: str) -> str:
+    return scoring_server.scores_dir(version)
+
+
+# ---------------- STORED CALLS ----------------
+
+def stored_calls() -> list:
+    """(key, original filename) of every call with live scores, hot or archived."""
+    calls = {}
+    for name in os.listdir(SCORES_DIR) if os.path.isdir(SCORES_DIR) else []:
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(SCORES_DIR, name), encoding="utf-8") as f:
+                filename = json.load(f).get("original_filename")
+        except (OSError, ValueError):
+            filename = None
+        calls[name[:-5]] = filename or name[:-5]
+    for name, _, meta in archive.entries(SCORES_DIR):
+        calls.setdefault(name[:-5], meta.get("original_filename") or name[:-5])
+    return sorted(calls.items())
+
+
+def load_transcript(key: str, filename: str):
+    """The conversation a call was scored from, or None if nothing was kept."""
+    stored = archive.load_json(os.path.join(SCORES_DIR, scoring_server.TRANSCRIPTS_DIR), f"{key}.json")
+    if stored is not None:
+        return stored.get("conversation")
+    return search_index.conversation(filename)
+
+
+def load_scores(version: str) -> dict:
+    """{call key: scores} of a version; "live" is file_scores/ itself."""
+    directory = version_dir(version)
+    if directory is None or not os.path.isdir(directory):
+        raise FileNotFoundError(f"No scores for version {version!r} ({directory})")
+    scores = {}
+    for name in os.listdir(directory):
+        if name.endswith(".json"):
+            with open(os.path.join(directory, name), encoding="utf-8") as f:
+                scores[name[:-5]] = json.load(f)
+    for name, raw in archive.iter_archived(directory, skip={f"{key}.json" for key in scores}):
+        scores[name[:-5]] = json.loads(raw)
+    return scores
+
+
+# ---------------- RATE LIMIT ----------------
+
+class RateLimit:
+    """
+    Requests and estimated tokens per sliding minute, the way Groq meters
+    them (RPM / TPM). 0 disables a limit.
+    """
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm    = rpm
+        self.tpm    = tpm
+        self.window = deque()      # (start time, tokens)
+        self.lock   = asyncio.Lock()
+
+    async def acquire(self, tokens: int):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                while self.window and now - self.window[0][0] >= 60:
+                    self.window.popleft()
+                used = sum(t for _, t in self.window)
+                if (not self.rpm or len(self.window) < self.rpm) and \
+                   (not self.tpm or not self.window or used + tokens <= self.tpm):
+                    self.window.append((now, tokens))
+                    return
+                await asyncio.sleep(60 - (now - self.window[0][0]) + 0.01)
+
+
+def estimate_tokens(conv: str, rubric: str) -> int:
+    return (min(len(conv), MAX_CONV_CHARS) + len(rubric)) // CHARS_PER_TOKEN + REPLY_TOKENS
+
+
+# ---------------- RUN ----------------
+
+class Rescore:
+    def __init__(self, version: str, concurrency: int, rpm: int, tpm: int, limit: int = 0):
+        self.version     = version
+        self.rubric      = scoring_server.RUBRICS[version]
+        self.limit       = limit
+        self.slots       = asyncio.Semaphore(concurrency)
+        self.rate        = RateLimit(rpm, tpm)
+        os.makedirs(version_dir(version), exist_ok=True)
+        self.checkpoint  = bulk_ingest.Checkpoint(os.path.join(version_dir(version), "checkpoint.db"))
+        self.stats       = {"calls": 0, "skipped": 0, "scored": 0, "failed": 0}
+        self.pending     = 0
+        self.started     = time.perf_counter()
+        self.printed     = 0.0
+
+    async def run(self) -> dict:
+        finished = self.checkpoint.done()
+        calls    = stored_calls()
+        todo     = [(key, name) for key, name in calls if self.version not in finished.get(key, ())]
+        if self.limit:
+            todo = todo[:self.limit]
+        self.stats.update(calls=len(calls), skipped=len(calls) - len(todo))
+        self.pending = len(todo)
+
+        progress = asyncio.get_running_loop().create_task(self._progress())
+        tasks    = set()
+        for key, filename in todo:
+            await self.slots.acquire()
+            task = asyncio.get_running_loop().create_task(self._rescore(key, filename))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+        progress.cancel()
+        self._print_progress(final=True)
+
+        failures = self.checkpoint.failure_count()
+        self.checkpoint.close()
+        return {"version": self.version, **self.stats, "open_failures": failures,
+                "seconds": round(time.perf_counter() - self.started, 1)}
+
+    async def _rescore(self, key: str, filename: str):
+        try:
+            conv = await asyncio.to_thread(load_transcript, key, filename)
+            if not conv or not conv.strip():
+                raise LookupError("no stored transcript")
+            await self.rate.acquire(estimate_tokens(conv, self.rubric))
+            with tracing.span(log, "rescore.grade", call=key, version=self.version):
+                data = await asyncio.to_thread(scoring_server.grade_conversation, conv, self.version)
+            data["original_filename"] = filename
+            data["saved_at"]          = time.strftime("%Y-%m-%d %H:%M:%S")
+            await asyncio.to_thread(storage.write_json_in_dir, SCORES_DIR,
+                                    os.path.join(scoring_server.VERSIONS_DIR, self.version, f"{key}.json"),
+                                    data, indent=4)
+            self.checkpoint.mark(key, self.version, filename)
+            self.stats["scored"] += 1
+        except Exception as e:
+            self.stats["failed"] += 1
+            self.checkpoint.fail(key, self.version, f"{type(e).__name__}: {e}")
+            log.warning("Re-scoring %s failed: %s", filename, e)
+        finally:
+            self.slots.release()
+
+    async def _progress(self):
+        while True:
+            await asyncio.sleep(PROGRESS_SECONDS)
+            self._print_progress()
+
+    def _print_progress(self, final: bool = False):
+        """One live line (throughput and ETA over this run's calls) on stderr."""
+        done    = self.stats["scored"] + self.stats["failed"]
+        elapsed = time.perf_counter() - self.started
+        rate    = done / elapsed if elapsed else 0.0
+        eta     = (self.pending - done) / rate if rate else float("inf")
+        line    = (f"{self.version}: {done}/{self.pending}  scored {self.stats['scored']}  "
+                   f"failed {self.stats['failed']}  {rate:.2f} calls/s  "
+                   f"ETA {time.strftime('%H:%M:%S', time.gmtime(eta)) if eta != float('inf') else '--:--:--'}")
+        if sys.stderr.isatty():
+            sys.stderr.write("\r" + line + ("\n" if final else ""))
+        elif final or elapsed - self.printed >= 15:     # logs: one line every 15 s
+            sys.stderr.write(line + "\n")
+            self.printed = elapsed
+        sys.stderr.flush()
+
+
+def prepare_rubric(version: str, prompt_file: str = None):
+    """
+    Registers the version's prompt and pins it in rubric.txt: a resumed run,
+    or a later one, under the same name must grade with the same text.
+    """
+    if prompt_file:
+        with open(prompt_file, encoding="utf-8") as f:
+            prompt = f.read()
+        if scoring_server.RUBRICS.get(version, prompt) != prompt:
+            raise ValueError(f"Version {version!r} is a built-in rubric with a different prompt")
+    elif version in scoring_server.RUBRICS:
+        prompt = scoring_server.RUBRICS[version]
+    else:
+        raise ValueError(f"Unknown rubric version {version!r}: pass --prompt-file "
+                         f"(built in: {', '.join(scoring_server.RUBRICS)})")
+
+    pinned = os.path.join(version_dir(version), "rubric.txt")
+    if os.path.exists(pinned):
+        with open(pinned, encoding="utf-8") as f:
+            if f.read() != prompt:
+                raise ValueError(f"Version {version!r} was already graded with a different prompt; "
+                                 f"use a new version name")
+    else:
+        with storage.atomic_open(pinned, "w", encoding="utf-8") as f:
+            f.write(prompt)
+    scoring_server.RUBRICS[version] = prompt
+
+
+# ---------------- DIFF ----------------
+
+def _number(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def diff(old: str, new: str, top: int = 10) -> dict:
+    """Score changes from version `old` to `new` over the calls both contain."""
+    a, b   = load_scores(old), load_scores(new)
+    common = sorted(set(a) & set(b))
+    fields = {}
+    for field in SCORE_FIELDS:
+        before = [_number(a[k].get(field)) for k in common]
+        after  = [_number(b[k].get(field)) for k in common]
+        deltas = [y - x for x, y in zip(before, after)]
+        n      = len(common) or 1
+        fields[field] = {
+            "mean_old":       round(sum(before) / n, 2),
+            "mean_new":       round(sum(after) / n, 2),
+            "mean_delta":     round(sum(deltas) / n, 2),
+            "mean_abs_delta": round(sum(map(abs, deltas)) / n, 2),
+            "changed":        sum(d != 0 for d in deltas),
+            "big_changes":    sum(abs(d) >= BIG_CHANGE for d in deltas),
+        }
+
+    def moved(key):
+        return sum(abs(_number(b[key].get(f)) - _number(a[key].get(f))) for f in SCORE_FIELDS)
+
+    largest = [
+        {"filename": b[k].get("original_filename", k),
+         **{f: [_number(a[k].get(f)), _number(b[k].get(f))] for f in SCORE_FIELDS}}
+        for k in sorted(common, key=moved, reverse=True)[:top] if moved(k)
+    ]
+    return {"old": old, "new": new, "calls": len(common),
+            "only_old": len(set(a) - set(b)), "only_new": len(set(b) - set(a)),
+            "fields": fields, "largest_changes": largest}
+
+
+def print_diff(report: dict):
+    print(f"{report['old']} -> {report['new']}: {report['calls']} calls in both "
+          f"({report['only_old']} only in {report['old']}, {report['only_new']} only in {report['new']})")
+    print(f"{'score':<12} {'mean old':>8} {'mean new':>8} {'delta':>7} {'|delta|':>7} {'changed':>8} {f'>={BIG_CHANGE}':>6}")
+    for field, s in report["fields"].items():
+        print(f"{field:<12} {s['mean_old']:>8.2f} {s['mean_new']:>8.2f} {s['mean_delta']:>+7.2f} "
+              f"{s['mean_abs_delta']:>7.2f} {s['changed']:>8} {s['big_changes']:>6}")
+    if report["largest_changes"]:
+        print("\nlargest changes (old -> new):")
+        for row in report["largest_changes"]:
+            print(f"  {row['filename']:<40} " + "  ".join(
+                f"{f} {row[f][0]:g}->{row[f][1]:g}" for f in SCORE_FIELDS))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_cmd = commands.add_parser("run", help="re-score every stored call under a rubric version")
+    run_cmd.add_argument("version", help="rubric version name (a key of scoring_server.RUBRICS, or new with --prompt-file)")
+    run_cmd.add_argument("--prompt-file", help="system prompt for a new version")
+    run_cmd.add_argument("--concurrency", type=int, default=4, help="Groq calls in flight")
+    run_cmd.add_argument("--rpm", type=int, default=30, help="requests per minute (0 = no limit)")
+    run_cmd.add_argument("--tpm", type=int, default=0, help="estimated tokens per minute (0 = no limit)")
+    run_cmd.add_argument("--limit", type=int, default=0, help="stop after this many calls")
+
+    diff_cmd = commands.add_parser("diff", help="score changes between two versions")
+    diff_cmd.add_argument("old", help='version name, or "live" for the current file_scores/')
+    diff_cmd.add_argument("new")
+    diff_cmd.add_argument("--top", type=int, default=10, help="list the calls that moved most")
+    diff_cmd.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        if args.version == "live" or scoring_server.scores_dir(args.version) is None:
+            parser.error(f"invalid version name {args.version!r}")
+        try:
+            prepare_rubric(args.version, args.prompt_file)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        result = asyncio.run(Rescore(args.version, args.concurrency, args.rpm, args.tpm, args.limit).run())
+        print(json.dumps(result, indent=2))
+    else:
+        try:
+            report = diff(args.old, args.new, args.top)
+        except FileNotFoundError as e:
+            parser.error(str(e))
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            print_diff(report)
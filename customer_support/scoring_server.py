@@ -1,38 +1,34 @@
-import os, json, time, re
-import pandas as pd
-from fastapi import FastAPI, UploadFile, File, Form
+import os, json, time, re, asyncio
+import sqlite3
+from fastapi import FastAPI, UploadFile, File, Form, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from groq import Groq
+from fastapi.responses import StreamingResponse
+from tracing import run_in_threadpool
 from pathlib import Path 
-import dotenv
 from dotenv import load_dotenv
-print(f"DEBUG: Loading .env from: {dotenv.find_dotenv()}")
+
+import admission
+import anonymizer
+import archive
+import audit_export
+import handoff
+import metrics
+import search_index
+import shared_clients
+import similar_calls
+import storage
+import tracing
+import turns
+
+log = tracing.get_logger("scoring")
 load_dotenv(override=True)
 
 
 # ── Bias reduction functions ─────────────────────────────────
 def anonymize_text(text: str):
-    exclude = {
-        'Speaker', 'Agent', 'Customer', 'Human', 'User',
-        'Hello', 'Thank', 'Sorry', 'Please', 'Yes', 'No',
-        'Good', 'Great', 'Sure', 'Okay', 'Well', 'Just',
-        'This', 'That', 'With', 'Your', 'Have', 'Will',
-        'From', 'They', 'Their', 'What', 'When', 'Where',
-        'Which', 'There', 'About', 'Would', 'Could', 'Should'
-    }
-
-    words_found = re.findall(r"\b[A-Z][a-z]{2,}\b", text)
-    names_found = [w for w in words_found if w not in exclude]
-    unique_names = list(set(names_found))
-
-    def replace_name(match):
-        word = match.group(0)
-        if word in exclude:
-            return word
-        return "[NAME]"
-
-    anonymized = re.sub(r"\b[A-Z][a-z]{2,}\b", replace_name, text)
-    return anonymized, unique_names
+    """Names, emails and phone numbers masked (anonymizer.py); returns (text, names found)."""
+    anonymized, originals = anonymizer.anonymize(text)
+    return anonymized, anonymizer.names(originals)
 
 
 from datetime import datetime
@@ -67,18 +63,29 @@ def calculate_efficiency(conv: str):
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
 GROQ_API_KEY=GROQ_API_KEY.strip().replace("'","").replace('"',"")
-print(f"Key loaded: {GROQ_API_KEY[:5]}...{GROQ_API_KEY[-3:]}") # Prints 'gsk_1...xyz'
-print(f"Key length: {len(GROQ_API_KEY) if GROQ_API_KEY else 0}")
 
 TRANSCRIPT_FILE = "transcriptions_with_speakers.csv"
 BASE_DIR        = os.path.dirname(os.path.abspath(__file__))
 SCORES_FILE     = os.path.join(BASE_DIR, "audit_scores.json")
 SCORES_DIR      = os.path.join(BASE_DIR, "file_scores")
+# Subdirectories of SCORES_DIR (written under its lock, emptied by clear-history):
+TRANSCRIPTS_DIR = "transcripts"   # the conversation each live score was graded from
+VERSIONS_DIR    = "versions"      # rescore.py results, one folder per rubric version
+_VERSION_RE     = re.compile(r"^[A-Za-z0-9_\-][A-Za-z0-9_.\-]{0,63}$")
 os.makedirs(SCORES_DIR, exist_ok=True)
 
 app = FastAPI()
-app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
-client = Groq(api_key=GROQ_API_KEY)
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"],
+                   expose_headers=["X-Call-Id", "X-Request-Id"])
+# At most 4 gradings at once, 16 more queued for up to 30 s; the rest get 429
+admission.protect(app, "scoring", {"/analyze-quality": (4, 16, 30)})
+metrics.instrument(app, "scoring")
+tracing.instrument(app, "scoring")
+
+
+def groq():
+    """The shared Groq client; built (and the SDK imported) on the first LLM call, not at startup."""
+    return shared_clients.groq_client(GROQ_API_KEY)
 
 
 def build_empty_response():
@@ -115,82 +122,12 @@ def build_empty_response():
     }
 
 
-# ── ANALYZE QUALITY ───────────────────────────────────────────────────────────
-@app.post("/analyze-quality")
-async def analyze_quality(
-    file:              UploadFile = File(...),
-    original_filename: str        = Form(None),   # ← Form(None) so FastAPI reads it correctly
-):
-    try:
-        conv = ""
-
-        # ── Step 1: resolve display name and detect file type ────────
-        # audio files are sent as blob named "audio_transcript.txt"
-        # but original_filename carries the real name e.g. "call log.m4a"
-        display_name   = original_filename if original_filename else file.filename
-        original_lower = display_name.lower().strip()
-
-        print(f"DEBUG: blob='{file.filename}'  original='{display_name}'")
-
-        is_audio = (
-            original_lower.endswith(".mp3") or
-            original_lower.endswith(".wav") or
-            original_lower.endswith(".m4a") or
-            original_lower.endswith(".mp4")
-        )
-        is_text = not is_audio
-
-        # ── Step 2: read content ─────────────────────────────────────
-        if is_text:
-            raw = await file.read()
-            print(f"DEBUG: Raw bytes received: {len(raw)}")
-
-            if len(raw) == 0:
-                print("ERROR: File is empty — 0 bytes received")
-                return build_empty_response()
-
-            try:
-                conv = raw.decode("utf-8")
-            except Exception:
-                conv = raw.decode("latin-1")
-
-            print(f"DEBUG: Decoded text length: {len(conv)} chars")
-
-        else:  # is_audio
-            print("DEBUG: Audio file — waiting for Deepgram CSV...")
-            time.sleep(10)
-
-            if os.path.exists(TRANSCRIPT_FILE):
-                df   = pd.read_csv(TRANSCRIPT_FILE)
-                conv = "\n".join(
-                    f"{row['speaker']}: {row['text']}"
-                    for _, row in df.iterrows()
-                    if str(row['text']).strip()
-                )
-                print(f"DEBUG: Audio transcript length: {len(conv)} chars")
-            else:
-                print("ERROR: No transcript CSV found after waiting")
-                return build_empty_response()
-
-        # ── Step 3: guard empty content ──────────────────────────────
-        conv = conv.strip()
-        if not conv:
-            print("ERROR: Empty transcript — returning empty response")
-            return build_empty_response()
-
-        # ── Step 4: trim if too long ─────────────────────────────────
-        conv_anonymized, names_found = anonymize_text(conv)
-        print(f"DEBUG: Names anonymized: {names_found}")
-        print(f"DEBUG: First 300 chars:\n{conv[:300]}")
-        
-        MAX_SAFE_CHARS = 8000
-        if len(conv_anonymized) > MAX_SAFE_CHARS:
-            print(f"DEBUG: Trimming from {len(conv_anonymized)} to {MAX_SAFE_CHARS} chars")
-            conv_anonymized = conv_anonymized[:MAX_SAFE_CHARS]
-        print(f"DEBUG: Final conv length sent to Groq: {len(conv_anonymized)} chars")
-
-        # ── Step 5: Groq analysis ────────────────────────────────────
-        sys_msg = """You are a Call Quality Auditor for CUSTOMER SUPPORT calls only.
+# ── RUBRICS ───────────────────────────────────────────────────────────────────
+# Audit prompts by version. Every score records the rubric_version it was
+# graded with; after a rubric change, rescore.py re-grades the stored
+# transcripts under the new version (file_scores/versions/<version>/).
+RUBRICS = {
+    "v1": """You are a Call Quality Auditor for CUSTOMER SUPPORT calls only.
                     Note: All names in this transcript have been replaced with [NAME] to ensure unbiased scoring.
                     STEP 1 — IDENTIFY CALL TYPE:
                     Check if this is a real customer support call:
@@ -290,9 +227,53 @@ async def analyze_quality(
                     tone_consistency: Was the agent tone consistently warm and professional?
                     equal_effort: Did the agent put equal effort into resolving the issue?
 
-                    Return ONLY the JSON object. No extra text, no markdown."""
+                    Return ONLY the JSON object. No extra text, no markdown.""",
+}
+# v2: the v1 audit with the placeholders anonymizer.py actually writes (one
+# numbered token per person, email and phone number, stable within a call)
+RUBRICS["v2"] = RUBRICS["v1"].replace(
+    "Note: All names in this transcript have been replaced with [NAME] to ensure unbiased scoring.",
+    "Note: Personal details in this transcript have been replaced with placeholders to ensure unbiased scoring:\n"
+    "                    each person's name with [NAME_1], [NAME_2], ..., email addresses with [EMAIL_1], ... and phone\n"
+    "                    numbers with [PHONE_1], ... The same placeholder always refers to the same person or value.",
+).replace(
+    "7-8:  Used customer name, acknowledged problem impact,",
+    "7-8:  Used customer name ([NAME_n] counts), acknowledged problem impact,",
+)
+RUBRIC_VERSION = os.getenv("RUBRIC_VERSION", "v2")
+
+
+# ── SCORE CONVERSATION ────────────────────────────────────────────────────────
+def grade_conversation(conv: str, rubric: str = None):
+    """
+    Anonymizes the conversation and scores it with Groq under `rubric`
+    (default RUBRIC_VERSION), without saving anything (bulk ingestion and
+    rescore.py keep their own stores). Raises on Groq / parsing errors.
+    """
+    # ── Step 3: guard empty content ──────────────────────────────
+    conv = conv.strip()
+    if not conv:
+        log.warning("Empty transcript — returning empty response")
+        return build_empty_response()
 
-        r = client.chat.completions.create(
+    # ── Step 4: trim if too long ─────────────────────────────────
+    conv_anonymized, names_found = anonymize_text(conv)
+    log.debug("Names anonymized: %s", names_found)
+    log.debug("First 300 chars:\n%s", conv[:300])
+    
+    MAX_SAFE_CHARS = 8000
+    if len(conv_anonymized) > MAX_SAFE_CHARS:
+        log.debug("Trimming from %d to %d chars", len(conv_anonymized), MAX_SAFE_CHARS)
+        conv_anonymized = conv_anonymized[:MAX_SAFE_CHARS]
+    log.debug("Final conv length sent to Groq: %d chars", len(conv_anonymized))
+
+    # ── Step 5: Groq analysis ────────────────────────────────────
+    version = rubric or RUBRIC_VERSION
+    sys_msg = RUBRICS[version]
+
+    with metrics.timed(metrics.UPSTREAM_SECONDS, "groq", "score"), \
+         tracing.span(log, "groq.score", chars=len(conv_anonymized)):
+        r = groq().chat.completions.create(
             messages=[
                 {"role": "system", "content": sys_msg},
                 {"role": "user",   "content": f"Analyze this conversation ({len(conv_anonymized)} chars):\n\n{conv_anonymized}"}
@@ -303,82 +284,179 @@ async def analyze_quality(
             temperature=0.1,
         )
 
-        raw_response = r.choices[0].message.content
-        print(f"DEBUG: Groq raw response: {raw_response[:300]}")
+    metrics.record_tokens("llama-3.1-8b-instant", getattr(r, "usage", None))
+    raw_response = r.choices[0].message.content
+    log.debug("Groq raw response: %s", raw_response[:300])
+
+    data = json.loads(raw_response)
+
+    # ── Step 6: enrich data ──────────────────────────────────────
+    efficiency              = calculate_efficiency(conv)
+    data["efficiency_score"] = efficiency["efficiency_score"]
+    data["total_messages"]   = efficiency["total_messages"]
+    data["names_anonymized"] = names_found
+    data["bias_reduction_applied"] = True
+    data["rubric_version"]   = version
+
+    if "fairness_scores" not in data:
+        data["fairness_scores"] = {
+            "name_neutrality":     5,
+            "language_neutrality": 5,
+            "tone_consistency":    5,
+            "equal_effort":        5,
+        }
+
+    # Fallback chart arrays
+    if "empathy_timeline" not in data or not data["empathy_timeline"]:
+        e = data.get("empathy", 0)
+        data["empathy_timeline"] = [
+            {"stage": "Opening",  "score": max(0, e - 2)},
+            {"stage": "Mid-Call", "score": e},
+            {"stage": "Issue",    "score": max(0, e - 1)},
+            {"stage": "Closing",  "score": min(10, e + 1)},
+        ]
+
+    if "compliance_steps" not in data or not data["compliance_steps"]:
+        c = data.get("compliance", 0)
+        data["compliance_steps"] = [
+            {"step": "Greeting",     "score": c},
+            {"step": "Verification", "score": c},
+            {"step": "Process",      "score": c},
+            {"step": "Closing",      "score": c},
+        ]
+
+    if "resolution_progress" not in data or not data["resolution_progress"]:
+        res = data.get("resolution", 0)
+        data["resolution_progress"] = [
+            {"stage": "Issue Raised", "score": max(0, res - 2)},
+            {"stage": "Diagnosed",    "score": max(0, res - 1)},
+            {"stage": "Action Taken", "score": res},
+            {"stage": "Resolved",     "score": min(10, res + 1)},
+        ]
+    return data
+
+
+def score_conversation(conv: str, display_name: str, session: str = storage.DEFAULT_SESSION):
+    """
+    Scores the conversation (grade_conversation) and saves both the global
+    and the per-file scores. Raises on Groq / parsing errors.
+    """
+    if not conv.strip():
+        return grade_conversation(conv)
+    data = grade_conversation(conv)
+
+    # ── Step 7: save global scores ───────────────────────────────
+    try:
+        scores_path = storage.session_path(SCORES_FILE, session)
+        storage.write_json(scores_path, data, indent=4)
+        log.debug("Global scores saved to %s", scores_path)
+    except Exception as save_err:
+        log.exception("Could not save global scores: %s", save_err)
 
-        data = json.loads(raw_response)
+    # ── Step 8: save per-file scores (for Downloads modal) ───────
+    try:
+        safe_name       = re.sub(r'[^a-zA-Z0-9_\-]', '_', display_name)
+        file_score_path = os.path.join(SCORES_DIR, f"{safe_name}.json")
+        data["original_filename"] = display_name
+        data["saved_at"]          = time.strftime("%Y-%m-%d %H:%M:%S")
+        storage.write_json_in_dir(SCORES_DIR, f"{safe_name}.json", data, indent=4)
+        log.debug("Per-file scores saved → %s (display_name=%r)", file_score_path, display_name)
+    except Exception as e:
+        log.exception("Could not save per-file scores: %s", e)
 
-        # ── Step 6: enrich data ──────────────────────────────────────
-        efficiency              = calculate_efficiency(conv)
-        data["efficiency_score"] = efficiency["efficiency_score"]
-        data["total_messages"]   = efficiency["total_messages"]
-        data["names_anonymized"] = names_found
-        data["bias_reduction_applied"] = True
+    # ── Step 8b: keep the graded transcript (rescore.py re-grades it) ─
+    try:
+        storage.write_json_in_dir(SCORES_DIR, os.path.join(TRANSCRIPTS_DIR, f"{safe_name}.json"), {
+            "original_filename": display_name,
+            "conversation":      conv,
+            "saved_at":          data["saved_at"],
+        })
+    except Exception as e:
+        log.exception("Could not save the scored transcript: %s", e)
+    search_index.index_scores(display_name, data)
 
-        if "fairness_scores" not in data:
-            data["fairness_scores"] = {
-                "name_neutrality":     5,
-                "language_neutrality": 5,
-                "tone_consistency":    5,
-                "equal_effort":        5,
-            }
+    # ── Step 9: embed for /similar (anonymized text only) ────────
+    try:
+        similar_calls.add(display_name, anonymize_text(conv.strip())[0], data)
+    except Exception as e:
+        log.exception("Could not add %s to the similar-call index: %s", display_name, e)
 
-        # Fallback chart arrays
-        if "empathy_timeline" not in data or not data["empathy_timeline"]:
-            e = data.get("empathy", 0)
-            data["empathy_timeline"] = [
-                {"stage": "Opening",  "score": max(0, e - 2)},
-                {"stage": "Mid-Call", "score": e},
-                {"stage": "Issue",    "score": max(0, e - 1)},
-                {"stage": "Closing",  "score": min(10, e + 1)},
-            ]
+    log.info("SCORES: empathy=%s compliance=%s resolution=%s",
+             data.get('empathy'), data.get('compliance'), data.get('resolution'))
+    return data
 
-        if "compliance_steps" not in data or not data["compliance_steps"]:
-            c = data.get("compliance", 0)
-            data["compliance_steps"] = [
-                {"step": "Greeting",     "score": c},
-                {"step": "Verification", "score": c},
-                {"step": "Process",      "score": c},
-                {"step": "Closing",      "score": c},
-            ]
 
-        if "resolution_progress" not in data or not data["resolution_progress"]:
-            res = data.get("resolution", 0)
-            data["resolution_progress"] = [
-                {"stage": "Issue Raised", "score": max(0, res - 2)},
-                {"stage": "Diagnosed",    "score": max(0, res - 1)},
-                {"stage": "Action Taken", "score": res},
-                {"stage": "Resolved",     "score": min(10, res + 1)},
-            ]
+# ── ANALYZE QUALITY ───────────────────────────────────────────────────────────
+@app.post("/analyze-quality")
+async def analyze_quality(
+    file:              UploadFile = File(...),
+    original_filename: str        = Form(None),   # ← Form(None) so FastAPI reads it correctly
+    session:           str        = Depends(storage.session_id),
+):
+    try:
+        conv = ""
 
-        # ── Step 7: save global scores ───────────────────────────────
-        try:
-            with open(SCORES_FILE, "w") as f:
-                json.dump(data, f, indent=4)
-            print(f"DEBUG: Global scores saved to {SCORES_FILE}")
-        except Exception as save_err:
-            print(f"DEBUG: Could not save global scores: {save_err}")
-
-        # ── Step 8: save per-file scores (for Downloads modal) ───────
-        try:
-            safe_name       = re.sub(r'[^a-zA-Z0-9_\-]', '_', display_name)
-            file_score_path = os.path.join(SCORES_DIR, f"{safe_name}.json")
-            data["original_filename"] = display_name
-            data["saved_at"]          = time.strftime("%Y-%m-%d %H:%M:%S")
-            with open(file_score_path, "w") as f:
-                json.dump(data, f, indent=4)
-            print(f"DEBUG: Per-file scores saved → {file_score_path}")
-            print(f"DEBUG: display_name='{display_name}'  safe_name='{safe_name}'")
-        except Exception as e:
-            print(f"DEBUG: Could not save per-file scores: {e}")
-
-        print(f"SCORES: empathy={data.get('empathy')} compliance={data.get('compliance')} resolution={data.get('resolution')}")
-        return data
+        # ── Step 1: resolve display name and detect file type ────────
+        # audio files are sent as blob named "audio_transcript.txt"
+        # but original_filename carries the real name e.g. "call log.m4a"
+        display_name   = original_filename if original_filename else file.filename
+        original_lower = display_name.lower().strip()
+
+        log.debug("blob=%r  original=%r", file.filename, display_name)
+
+        is_audio = (
+            original_lower.endswith(".mp3") or
+            original_lower.endswith(".wav") or
+            original_lower.endswith(".m4a") or
+            original_lower.endswith(".mp4")
+        )
+        is_text = not is_audio
+
+        # ── Step 2: read content ─────────────────────────────────────
+        if is_text:
+            raw = await file.read()
+            log.debug("Raw bytes received: %d", len(raw))
+
+            if len(raw) == 0:
+                log.warning("File is empty — 0 bytes received")
+                return build_empty_response()
+
+            try:
+                conv = raw.decode("utf-8")
+            except Exception:
+                conv = raw.decode("latin-1")
+
+            log.debug("Decoded text length: %d chars", len(conv))
+
+        elif handoff.latest("audio", display_name, session) is not None:
+            # Gateway mode: /upload already finished in this process
+            conv = turns.Turns.from_records(handoff.latest("audio", display_name, session)).conversation()
+            log.debug("Audio transcript from handoff: %d chars", len(conv))
+
+        else:  # is_audio
+            log.debug("Audio file — waiting for Deepgram CSV...")
+            await asyncio.sleep(10)
+
+            transcript_path = storage.session_path(TRANSCRIPT_FILE, session)
+            if os.path.exists(transcript_path):
+                with metrics.timed(metrics.IO_SECONDS, "csv_read"):
+                    conv = turns.Turns.read_csv(transcript_path).conversation()
+                log.debug("Audio transcript length: %d chars", len(conv))
+            else:
+                log.error("No transcript CSV found after waiting")
+                return build_empty_response()
+
+        # Groq call and file writes off the event loop, so admitted requests run side by side
+        return await run_in_threadpool(score_conversation, conv, display_name, session)
 
     except Exception as e:
-        import traceback
-        print("SCORING ERROR:", e)
-        print(traceback.format_exc())
+        retry_after = admission.upstream_retry_after(e)
+        if retry_after is not None:   # Groq is rate limiting us: tell the client when to come back
+            metrics.ADMISSION_REJECTIONS.labels("scoring", "/analyze-quality", "upstream").inc()
+            log.warning("Groq rate limited, retry after %ds", retry_after)
+            return admission.busy_response("upstream", retry_after)
+        metrics.record_error("scoring", e)
+        log.exception("SCORING ERROR: %s", e)
         err = build_empty_response()
         err["reasoning"] = f"Analysis failed: {str(e)[:200]}"
         return err
@@ -386,9 +464,10 @@ async def analyze_quality(
 
 # ── GET QUALITY SCORES ────────────────────────────────────────────────────────
 @app.get("/get-quality-scores")
-async def get_scores():
-    if os.path.exists(SCORES_FILE):
-        with open(SCORES_FILE) as f:
+async def get_scores(session: str = Depends(storage.session_id)):
+    scores_path = storage.session_path(SCORES_FILE, session)
+    if os.path.exists(scores_path):
+        with open(scores_path) as f:
             data = json.load(f)
 
         if "empathy_timeline" not in data:
@@ -428,41 +507,121 @@ async def get_file_scores(filename: str):
         decoded         = unquote(filename)
         safe_name       = re.sub(r'[^a-zA-Z0-9_\-]', '_', decoded)
         file_score_path = os.path.join(SCORES_DIR, f"{safe_name}.json")
-        print(f"DEBUG: Looking for file scores at {file_score_path}")
-        if os.path.exists(file_score_path):
-            with open(file_score_path) as f:
-                return json.load(f)
-        return build_empty_response()
+        log.debug("Looking for file scores at %s", file_score_path)
+        data = archive.load_json(SCORES_DIR, f"{safe_name}.json")   # hot file, else its archived copy
+        return data if data is not None else build_empty_response()
     except Exception as e:
-        print(f"Error fetching file scores: {e}")
+        log.exception("Error fetching file scores: %s", e)
         return build_empty_response()
 
 
 # ── LIST FILE SCORES (Downloads modal) ───────────────────────────────────────
+def file_score_row(fname: str, data: dict) -> dict:
+    return {
+        "filename":   data.get("original_filename", fname),
+        "saved_at":   data.get("saved_at", ""),
+        "empathy":    data.get("empathy",    0),
+        "compliance": data.get("compliance", 0),
+        "resolution": data.get("resolution", 0),
+    }
+
+
 @app.get("/list-file-scores")
 async def list_file_scores():
     try:
-        files = []
+        files, hot = [], set()
         for fname in os.listdir(SCORES_DIR):
             if fname.endswith(".json"):
                 path = os.path.join(SCORES_DIR, fname)
                 with open(path) as fp:
                     data = json.load(fp)
-                files.append({
-                    "filename":   data.get("original_filename", fname),
-                    "saved_at":   data.get("saved_at", ""),
-                    "empathy":    data.get("empathy",    0),
-                    "compliance": data.get("compliance", 0),
-                    "resolution": data.get("resolution", 0),
-                })
+                hot.add(fname)
+                files.append(file_score_row(fname, data))
+        # Archived calls: the listing fields are in the segment indexes, nothing is inflated
+        files += [file_score_row(fname, meta) for fname, _, meta in archive.entries(SCORES_DIR) if fname not in hot]
         files.sort(key=lambda x: x["saved_at"], reverse=True)
-        print(f"DEBUG: list-file-scores returning {len(files)} files")
+        log.debug("list-file-scores returning %d files", len(files))
         return files
     except Exception as e:
-        print(f"Error listing file scores: {e}")
+        log.exception("Error listing file scores: %s", e)
         return []
 
 
+# ── SEARCH ────────────────────────────────────────────────────────────────────
+# e.g. /search?q="password reset"&max_resolution=4 — ranked full-text search
+# over transcripts, summaries and audit reasoning (search_index.py)
+@app.get("/search")
+async def search(
+    q:              str   = "",
+    kind:           str   = None,    # "audio" | "text"
+    field:          str   = None,    # "turn" | "summary" | "reasoning"
+    min_empathy:    float = None, max_empathy:    float = None,
+    min_compliance: float = None, max_compliance: float = None,
+    min_resolution: float = None, max_resolution: float = None,
+    min_efficiency: float = None, max_efficiency: float = None,
+    limit:          int   = 20,
+):
+    ranges = {
+        "empathy":    (min_empathy, max_empathy),
+        "compliance": (min_compliance, max_compliance),
+        "resolution": (min_resolution, max_resolution),
+        "efficiency": (min_efficiency, max_efficiency),
+    }
+    try:
+        return await run_in_threadpool(search_index.search, q, kind, ranges, field, limit)
+    except sqlite3.OperationalError as e:
+        log.warning("Search failed for %r: %s", q, e)
+        raise HTTPException(status_code=400, detail=f"Invalid search: {e}")
+
+
+# ── SIMILAR CALLS ─────────────────────────────────────────────────────────────
+# e.g. /similar/call_17.wav?k=10&quality=good — coaching examples closest to
+# an audited call (similar_calls.py, local embeddings, no network)
+@app.get("/similar/{filename:path}")
+async def similar(filename: str, k: int = 10, quality: str = None):
+    from urllib.parse import unquote
+    decoded = unquote(filename)
+    results = await run_in_threadpool(similar_calls.similar, decoded, k, quality)
+    if results is None:
+        raise HTTPException(status_code=404, detail=f"No audit found for {decoded}")
+    return {"filename": decoded, "quality": quality, "results": results}
+
+
+# ── EXPORT ────────────────────────────────────────────────────────────────────
+# e.g. /export?format=parquet&start=2026-01-01&end=2026-01-31 — every audit
+# result saved in the range, flattened to one row per call (audit_export.py).
+# version=<rubric version> exports rescore.py results instead of live scores.
+@app.get("/export")
+async def export(format: str = "csv", start: str = None, end: str = None, version: str = "live"):
+    if format not in audit_export.FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(audit_export.FORMATS)}")
+    if format == "parquet" and not audit_export.parquet_available():
+        raise HTTPException(status_code=501, detail="Parquet export needs pyarrow installed")
+    try:
+        start, end = audit_export.parse_range(start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    directory = scores_dir(version)
+    if directory is None or not os.path.isdir(directory):
+        raise HTTPException(status_code=404, detail=f"No scores for version {version!r}")
+
+    media_type, ext = audit_export.FORMATS[format]
+    return StreamingResponse(
+        audit_export.stream(directory, format, build_empty_response(), start, end),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="audit_scores_{version}.{ext}"'},
+    )
+
+
+def scores_dir(version: str = "live"):
+    """file_scores/ for "live", else the rescore.py folder of a rubric version (None if the name is invalid)."""
+    if version == "live":
+        return SCORES_DIR
+    if not _VERSION_RE.match(version or ""):
+        return None
+    return os.path.join(SCORES_DIR, VERSIONS_DIR, version)
+
+
 # ── HEALTH ────────────────────────────────────────────────────────────────────
 @app.get("/health")
 async def health():
@@ -0,0 +1,392 @@
+import os
+import re
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import generations
+import tracing
+import turns
+
+log = tracing.get_logger("search")
+
+# ---------------- FULL-TEXT SEARCH INDEX ----------------
+# One SQLite database shared by every service (WAL, so readers never wait
+# on a writer). Each saved artifact is indexed where it is written:
+#   transcript turns   app.transcribe_audio, chat_app save / stream
+#   summaries          record_audio_summary, record_text_summary
+#   scores + reasoning scoring_server.score_conversation
+# Calls are keyed like file_scores/ (non [A-Za-z0-9_-] -> "_"), so the
+# transcript, summary and scores of one upload land on the same row.
+# Indexing is best effort: a failure is logged and the upload carries on.
+#
+# Passage rowids encode their call: call_id << 24 | field << 22 | seq, so
+# matches group by call with a shift instead of a join, and a field of one
+# call is a rowid range. Very common terms match a large share of all
+# turns; BM25 is only computed for the newest RANK_WINDOW matches (rowid
+# order = call order) that pass the call and field filters, which keeps every
+# query bounded without hiding older calls from a filtered search.
+#
+# Clearing never walks the FTS index in the request. Clearing everything
+# swaps SEARCH_DB to a fresh database generation (generations.swap_file; the
+# old one is deleted in the background) and every process reconnects on its
+# next query. Clearing one kind deletes its rows from `calls`, which hides
+# their passages from every query at once; the passages themselves (the FTS
+# deletes) are purged in the background from the `orphans` table. Call ids
+# are never reused, so a new call cannot inherit an orphaned passage.
+
+SEARCH_DB   = os.getenv("SEARCH_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "search_index.db"))
+ENABLED     = os.getenv("SEARCH_INDEX", "1") == "1"
+RANK_WINDOW = int(os.getenv("SEARCH_RANK_WINDOW", "10000"))   # matching passages ranked per query
+SCORES      = ("empathy", "compliance", "resolution", "efficiency")
+FIELDS      = ("turn", "summary", "reasoning")
+MAX_LIMIT   = 100
+PURGE_BATCH = 50      # orphaned calls purged per transaction
+SNIPPET_TOKENS = 12
+
+CALL_SHIFT  = 24
+FIELD_SHIFT = 22
+MAX_SEQ     = (1 << FIELD_SHIFT) - 1
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS calls (
+        id          INTEGER PRIMARY KEY,
+        key         TEXT NOT NULL UNIQUE,
+        filename    TEXT NOT NULL,
+        kind        TEXT,
+        empathy     REAL,
+        compliance  REAL,
+        resolution  REAL,
+        efficiency  REAL,
+        updated_at  REAL NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS passages (
+        id       INTEGER PRIMARY KEY,          -- call_id << 24 | field << 22 | seq
+        speaker  TEXT,
+        text     TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS orphans (
+        call_id  INTEGER PRIMARY KEY           -- cleared call whose passages are still to be purged
+    );
+    CREATE VIRTUAL TABLE IF NOT EXISTS passages_fts USING fts5(
+        text, content='passages', content_rowid='id', tokenize='porter unicode61'
+    );
+    CREATE TRIGGER IF NOT EXISTS passages_ai AFTER INSERT ON passages BEGIN
+        INSERT INTO passages_fts (rowid, text) VALUES (new.id, new.text);
+    END;
+    CREATE TRIGGER IF NOT EXISTS passages_ad AFTER DELETE ON passages BEGIN
+        INSERT INTO passages_fts (passages_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    END;
+"""
+
+_local = threading.local()
+
+
+def call_key(filename: str) -> str:
+    return re.sub(r'[^a-zA-Z0-9_\-]', '_', filename)
+
+
+# ---------------- CONNECTIONS ----------------
+
+def _connect(path: str = None):
+    """
+    One connection per thread and database, kept open: closing the last
+    connection checkpoints the WAL, which would turn every upload's index
+    update into a synchronous checkpoint. Reopened when a clear (in any
+    process) has pointed the path at a new generation.
+    """
+    path  = path or SEARCH_DB
+    real  = os.path.realpath(path)
+    conns = _local.__dict__.setdefault("conns", {})
+    db, opened = conns.get(path, (None, None))
+    if opened != real:
+        if db is not None:
+            db.close()
+        db = sqlite3.connect(real, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.executescript(_SCHEMA)
+        conns[path] = (db, real)
+    return db
+
+
+@contextmanager
+def _writing(what: str, filename: str):
+    """One write transaction; errors are logged, never raised to the upload."""
+    db = None
+    try:
+        db = _connect()
+        db.execute("BEGIN IMMEDIATE")
+        yield db
+        db.execute("COMMIT")
+    except sqlite3.Error as e:
+        log.warning("Search index %s update failed for %s: %s", what, filename, e)
+        if db is not None and db.in_transaction:
+            db.execute("ROLLBACK")
+
+
+def _call_id(db, filename: str, kind: str = None) -> int:
+    # A new call gets an id past every call that still has passages (cleared ones included)
+    db.execute(
+        "INSERT INTO calls (id, key, filename, kind, updated_at) VALUES ("
+        f"    MAX(IFNULL((SELECT MAX(id) FROM calls), 0), IFNULL((SELECT MAX(id) FROM passages), 0) >> {CALL_SHIFT}) + 1,"
+        "    ?, ?, ?, ?) "
+        "ON CONFLICT (key) DO UPDATE SET filename = excluded.filename, "
+        "kind = COALESCE(excluded.kind, calls.kind), updated_at = excluded.updated_at",
+        (call_key(filename), filename, kind, time.time()),
+    )
+    return db.execute("SELECT id FROM calls WHERE key = ?", (call_key(filename),)).fetchone()[0]
+
+
+def _replace_field(db, call_id: int, field: str, rows):
+    """rows: iterable of (speaker, text); replaces what `field` held for the call."""
+    base = call_id << CALL_SHIFT | FIELDS.index(field) << FIELD_SHIFT
+    db.execute("DELETE FROM passages WHERE id BETWEEN ? AND ?", (base, base + MAX_SEQ))
+    db.executemany(
+        "INSERT INTO passages (id, speaker, text) VALUES (?, ?, ?)",
+        ((base + seq, speaker, text) for seq, (speaker, text) in enumerate(rows)
+         if seq <= MAX_SEQ and text and text.strip()),
+    )
+
+
+# ---------------- UPDATES ----------------
+
+def index_transcript(filename: str, kind: str, transcript):
+    """transcript: turns.Turns or {"speaker", "text"} rows (streamed, e.g. a csv.DictReader)."""
+    if not (ENABLED and filename):
+        return
+    rows = transcript.pairs() if isinstance(transcript, turns.Turns) else \
+        ((r.get("speaker"), r.get("text")) for r in transcript)
+    with _writing("transcript", filename) as db:
+        _replace_field(db, _call_id(db, filename, kind), "turn", rows)
+
+
+def index_summary(filename: str, kind: str, summary: str):
+    if not (ENABLED and filename):
+        return
+    with _writing("summary", filename) as db:
+        _replace_field(db, _call_id(db, filename, kind), "summary", [(None, summary)])
+
+
+def index_scores(filename: str, data: dict):
+    """Scores become filterable columns, the audit reasoning a searchable passage."""
+    if not (ENABLED and filename):
+        return
+    values = [data.get(name, data.get(f"{name}_score")) for name in SCORES]
+    with _writing("scores", filename) as db:
+        call_id = _call_id(db, filename)
+        db.execute(
+            "UPDATE calls SET empathy = ?, compliance = ?, resolution = ?, efficiency = ? WHERE id = ?",
+            (*values, call_id),
+        )
+        _replace_field(db, call_id, "reasoning", [(None, data.get("reasoning") or "")])
+
+
+def clear(kind: str = None):
+    """
+    Drops every call (or only calls of `kind`) from the index: everything by
+    swapping in an empty database, one kind by orphaning its calls (their
+    passages are purged in the background).
+    """
+    if not ENABLED:
+        return
+    if kind is None and generations.clear_file(SEARCH_DB):
+        return
+    with _writing("clear", kind or "all") as db:
+        where  = "" if kind is None else " WHERE kind = ?"
+        params = () if kind is None else (kind,)
+        db.execute(f"INSERT OR IGNORE INTO orphans (call_id) SELECT id FROM calls{where}", params)
+        db.execute(f"DELETE FROM calls{where}", params)
+    purge_in_background()
+
+
+def purge_orphans(path: str = None) -> int:
+    """Deletes the passages of cleared calls, PURGE_BATCH calls per transaction; returns calls purged."""
+    db     = _connect(path)
+    purged = 0
+    while True:
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            ids = [row[0] for row in db.execute("SELECT call_id FROM orphans LIMIT ?", (PURGE_BATCH,))]
+            for call_id in ids:
+                db.execute("DELETE FROM passages WHERE id BETWEEN ? AND ?",
+                           (call_id << CALL_SHIFT, (call_id + 1 << CALL_SHIFT) - 1))
+            db.executemany("DELETE FROM orphans WHERE call_id = ?", [(call_id,) for call_id in ids])
+            db.execute("COMMIT")
+        except sqlite3.Error:
+            db.execute("ROLLBACK")
+            raise
+        if not ids:
+            return purged
+        purged += len(ids)
+
+
+_purging      = False
+_purging_lock = threading.Lock()
+
+
+def purge_in_background():
+    """Starts a purger thread unless this process already runs one."""
+    global _purging
+    with _purging_lock:
+        if _purging:
+            return
+        _purging = True
+
+    def run():
+        global _purging
+        try:
+            while True:
+                started = time.perf_counter()
+                purged  = purge_orphans()
+                log.info("Purged the passages of %d cleared calls in %.1f s", purged, time.perf_counter() - started)
+                with _purging_lock:
+                    # A clear during the run orphans more calls: go again
+                    if not _connect().execute("SELECT 1 FROM orphans LIMIT 1").fetchone():
+                        _purging = False
+                        return
+        except sqlite3.Error as e:
+            log.warning("Search index purge failed: %s", e)
+            with _purging_lock:
+                _purging = False
+
+    threading.Thread(target=run, name="search-purge", daemon=True).start()
+
+
+# ---------------- TRANSCRIPTS ----------------
+
+def conversation(filename: str, path: str = None):
+    """The indexed turns of a call as "speaker: text" lines, or None if it has none."""
+    db  = _connect(path)
+    row = db.execute("SELECT id FROM calls WHERE key = ?", (call_key(filename),)).fetchone()
+    if row is None:
+        return None
+    base = row["id"] << CALL_SHIFT | FIELDS.index("turn") << FIELD_SHIFT
+    rows = db.execute("SELECT speaker, text FROM passages WHERE id BETWEEN ? AND ? ORDER BY id",
+                      (base, base + MAX_SEQ)).fetchall()
+    return "\n".join(f"{speaker}: {text}" for speaker, text in rows) or None
+
+
+# ---------------- SEARCH ----------------
+
+_TOKEN = re.compile(r'"[^"]*"|\S+')
+
+
+def fts_query(q: str) -> str:
+    """
+    User text -> FTS5 query. "quoted phrases", OR / NOT / AND and a trailing
+    * (prefix) keep their FTS5 meaning; every other token is quoted, so
+    punctuation (can't, e-mail, 50%) never becomes query syntax.
+    """
+    parts = []
+    for token in _TOKEN.findall(q):
+        if token in ("OR", "NOT", "AND"):
+            if parts and parts[-1] not in ("OR", "NOT", "AND"):   # operators need a left operand
+                parts.append(token)
+            continue
+        prefix = token.endswith("*") and len(token) > 1
+        body   = token.rstrip("*").strip('"') if prefix else token.strip('"')
+        if body:
+            parts.append('"' + body.replace('"', '""') + '"' + ("*" if prefix else ""))
+    while parts and parts[-1] in ("OR", "NOT", "AND"):
+        parts.pop()
+    return " ".join(parts)
+
+
+def _call_filters(kind: str, ranges: dict):
+    """SQL conditions on calls (alias c) plus their parameters."""
+    where, params = [], []
+    if kind:
+        where.append("c.kind = ?")
+        params.append(kind)
+    for name, (low, high) in ranges.items():
+        if low is not None:
+            where.append(f"c.{name} >= ?")
+            params.append(low)
+        if high is not None:
+            where.append(f"c.{name} <= ?")
+            params.append(high)
+    return where, params
+
+
+def _matches(db, query: str, call_id: int, field: str = None) -> int:
+    """Passages of one call (one field of it, if given) matching `query`: a rowid range, not a scan."""
+    if field in FIELDS:
+        low  = call_id << CALL_SHIFT | FIELDS.index(field) << FIELD_SHIFT
+        high = low + MAX_SEQ
+    else:
+        low, high = call_id << CALL_SHIFT, (call_id + 1 << CALL_SHIFT) - 1
+    return db.execute("SELECT COUNT(*) FROM passages_fts WHERE passages_fts MATCH ? AND rowid BETWEEN ? AND ?",
+                      (query, low, high)).fetchone()[0]
+
+
+def search(q: str = "", kind: str = None, ranges: dict = None, field: str = None,
+           limit: int = 20, path: str = None) -> dict:
+    """
+    Calls matching `q` (best passage first, BM25) that pass the score
+    `ranges` {"resolution": (min, max), ...}; one row per call with the
+    number of matching passages and a snippet of the best one. An empty `q`
+    lists the most recently updated calls that pass the filters. Only the
+    newest RANK_WINDOW passages that match and pass the filters are ranked;
+    `matches` counts every matching passage of a returned call.
+    """
+    start = time.perf_counter()
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    query = fts_query(q or "")
+    where, params = _call_filters(kind, {k: v for k, v in (ranges or {}).items() if k in SCORES})
+    db = _connect(path)
+    if not query:
+        rows = db.execute(
+            "SELECT c.*, 0 AS matches, NULL AS passage_id FROM calls c"
+            + (" WHERE " + " AND ".join(where) if where else "")
+            + " ORDER BY c.updated_at DESC LIMIT ?",
+            [*params, limit],
+        ).fetchall()
+        snippets = speakers = {}
+    else:
+        if field in FIELDS:
+            where  = [*where, f"(f.rowid >> {FIELD_SHIFT}) & 3 = ?"]
+            params = [*params, FIELDS.index(field)]
+        # BM25 for the newest RANK_WINDOW matches that pass the filters (the
+        # window bounds ranking cost, not which calls can match), best
+        # passage per call (SQLite returns the bare columns of the MIN()
+        # row); match counts, passage details and snippets only for the
+        # rows that are returned
+        rows = [dict(r) for r in db.execute(
+            "SELECT c.*, h.id AS passage_id, MIN(h.rank) AS score FROM ("
+            "    SELECT f.rowid AS id, f.rank FROM passages_fts f"
+            f"    JOIN calls c ON c.id = f.rowid >> {CALL_SHIFT}"
+            "    WHERE passages_fts MATCH ?" + "".join(" AND " + w for w in where)
+            + " ORDER BY f.rowid DESC LIMIT ?"
+            f") h JOIN calls c ON c.id = h.id >> {CALL_SHIFT}"
+            " GROUP BY c.id ORDER BY score LIMIT ?",
+            [query, *params, RANK_WINDOW, limit],
+        ).fetchall()]
+        for r in rows:
+            r["matches"] = _matches(db, query, r["id"], field)
+        ids      = [r["passage_id"] for r in rows]
+        marks    = ",".join("?" * len(ids))
+        snippets = dict(db.execute(
+            f"SELECT rowid, snippet(passages_fts, 0, '[', ']', '…', {SNIPPET_TOKENS}) FROM passages_fts "
+            f"WHERE passages_fts MATCH ? AND rowid IN ({marks})",
+            [query, *ids],
+        ).fetchall()) if ids else {}
+        speakers = dict(db.execute(f"SELECT id, speaker FROM passages WHERE id IN ({marks})", ids).fetchall()) \
+            if ids else {}
+
+    results = []
+    for r in rows:
+        passage = r["passage_id"]
+        results.append({
+            "filename":   r["filename"],
+            "kind":       r["kind"],
+            **{name: r[name] for name in SCORES},
+            "updated_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(r["updated_at"])),
+            "matches":    r["matches"],
+            "field":      None if passage is None else FIELDS[passage >> FIELD_SHIFT & 3],
+            "speaker":    speakers.get(passage) if passage is not None else None,
+            "snippet":    snippets.get(passage),
+        })
+    return {"query": query, "results": results, "took_ms": round((time.perf_counter() - start) * 1000, 2)}
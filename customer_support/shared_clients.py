@@ -0,0 +1,51 @@
+import os
+import threading
+
+# ---------------- SHARED CLIENTS ----------------
+# Every service used to build its own Groq / Deepgram / HTTP client at import
+# time. Going through this registry keeps the per-port deployment identical
+# (one process, one client) while letting gateway.py share a single pooled
+# instance across all four services.
+
+# Upstream endpoints. benchmarks/ points these at local stand-ins so runs
+# cost no API credits; the Groq SDK reads GROQ_BASE_URL on its own.
+DEEPGRAM_BASE_URL = os.getenv("DEEPGRAM_BASE_URL", "https://api.deepgram.com").rstrip("/")
+
+_lock    = threading.Lock()
+_clients = {}
+
+
+def _get_or_create(key, factory):
+    with _lock:
+        if key not in _clients:
+            _clients[key] = factory()
+        return _clients[key]
+
+
+def groq_client(api_key: str):
+    from groq import Groq
+    return _get_or_create(("groq", api_key), lambda: Groq(api_key=api_key))
+
+
+def async_http_client():
+    """A keep-alive httpx.AsyncClient for the running event loop; connections are pooled per loop."""
+    import asyncio
+    import httpx
+    loop = asyncio.get_running_loop()
+    return _get_or_create(("async_http", loop), lambda: httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=60),
+        timeout=httpx.Timeout(30.0, connect=5.0),
+    ))
+
+
+def http_session():
+    """A keep-alive requests.Session with a connection pool sized for concurrent handlers."""
+    def build():
+        import requests
+        from requests.adapters import HTTPAdapter
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+    return _get_or_create(("http",), build)
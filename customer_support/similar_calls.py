@@ -0,0 +1,210 @@
+import os
+import re
+import zlib
+
+import numpy as np
+
+import local_summarizer
+import search_index
+import storage
+
+# ---------------- SIMILAR-CALL INDEX ----------------
+# Offline, network-free call embeddings for "calls most like this one":
+#   - features: word unigrams + bigrams of the anonymized transcript,
+#     hashed (crc32) into 2^FEATURE_BITS buckets
+#   - weights: sublinear tf x idf, with document frequencies kept per
+#     bucket in df.i32 and updated on every audit (calls embedded early
+#     used the idf of their time; it settles after a few hundred calls)
+#   - projection: very sparse random projection to DIM floats; every
+#     bucket adds +-w to PROBES dimensions derived from its hash, so no
+#     projection matrix is stored and the result is deterministic
+#   - storage: vectors.f32 (rows x DIM, unit length, float32) and
+#     scores.f32 (rows x 3) are appended under a file lock and read through
+#     np.memmap; names.txt (one line per row) says which call a row is,
+#     the last row of a name wins when a call is audited again
+
+VECTORS_DIR  = os.getenv("SIMILAR_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "call_vectors"))
+ENABLED      = os.getenv("SIMILAR_INDEX", "1") == "1"
+DIM          = 256
+PROBES       = 4
+FEATURE_BITS = 20
+SCORE_FIELDS = ("empathy", "compliance", "resolution")
+GOOD_SCORE   = 7.0           # mean of SCORE_FIELDS at or above this = "good" example
+BAD_SCORE    = 4.0           # ... at or below this = "bad" example
+MAX_K        = 100
+
+_WORD  = re.compile(r"[a-z][a-z']+")
+_NOISE = frozenset(("name", "speaker", "agent", "customer")) | local_summarizer.STOPWORDS
+_MIX   = (np.uint64(0x9E3779B97F4A7C15), np.uint64(0xBF58476D1CE4E5B9), np.uint64(0x94D049BB133111EB))
+
+
+def _paths(directory: str = None) -> dict:
+    directory = directory or VECTORS_DIR
+    return {name: os.path.join(directory, name) for name in ("vectors.f32", "scores.f32", "names.txt", "df.i32")}
+
+
+# ---------------- EMBEDDING ----------------
+
+def features(text: str):
+    """(bucket ids, counts) of the hashed unigrams and bigrams of `text`."""
+    words = [w for w in _WORD.findall(text.lower()) if w not in _NOISE]
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    if not grams:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+    unique, counts = np.unique(np.array(grams, dtype=object), return_counts=True)
+    ids = np.fromiter((zlib.crc32(g.encode()) for g in unique), dtype=np.uint32, count=len(unique))
+    ids = ids.astype(np.int64) & ((1 << FEATURE_BITS) - 1)
+    # Two grams can share a bucket: merge their counts
+    buckets, inverse = np.unique(ids, return_inverse=True)
+    return buckets, np.bincount(inverse, weights=counts)
+
+
+def project(buckets: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Sparse random projection of a weighted bucket vector to DIM, unit length."""
+    x = buckets.astype(np.uint64)[:, None] * _MIX[0] + np.arange(1, PROBES + 1, dtype=np.uint64)[None, :] * _MIX[1]
+    x ^= x >> np.uint64(31)
+    x *= _MIX[2]
+    x ^= x >> np.uint64(29)
+    dims  = (x % np.uint64(DIM)).astype(np.int64)
+    signs = np.where((x >> np.uint64(40)) & np.uint64(1), 1.0, -1.0)
+    vec   = np.bincount(dims.ravel(), weights=(signs * weights[:, None]).ravel(), minlength=DIM)
+    norm  = np.linalg.norm(vec)
+    return (vec / norm if norm else vec).astype(np.float32)
+
+
+def _open_df(path: str):
+    """Document frequency per bucket; the extra last slot holds the number of documents."""
+    if not os.path.exists(path):
+        np.zeros((1 << FEATURE_BITS) + 1, dtype=np.int32).tofile(path)
+    return np.memmap(path, dtype=np.int32, mode="r+")
+
+
+def embed(text: str, df: np.ndarray) -> np.ndarray:
+    buckets, counts = features(text)
+    if not len(buckets):
+        return np.zeros(DIM, dtype=np.float32)
+    idf = np.log((1.0 + df[-1]) / (1.0 + df[buckets])) + 1.0
+    return project(buckets, (1.0 + np.log(counts)) * idf)
+
+
+# ---------------- APPEND ----------------
+
+def add(filename: str, text: str, scores: dict, directory: str = None):
+    """Embeds one audited call (text already anonymized) and appends it."""
+    if not (ENABLED and filename):
+        return
+    paths = _paths(directory)
+    os.makedirs(os.path.dirname(paths["names.txt"]), exist_ok=True)
+    with storage.file_lock(paths["names.txt"]):
+        df = _open_df(paths["df.i32"])
+        buckets, _ = features(text)
+        df[buckets] += 1
+        df[-1] += 1
+        vec = embed(text, df)
+        df.flush()
+
+        # Row = number of names; vectors / scores are written at that row,
+        # so a crash between the appends never shifts later rows
+        row = _count_lines(paths["names.txt"])
+        values = np.array([float(scores.get(k) or 0) for k in SCORE_FIELDS], dtype=np.float32)
+        for key, data in (("vectors.f32", vec), ("scores.f32", values)):
+            with open(paths[key], "r+b" if os.path.exists(paths[key]) else "wb") as f:
+                f.seek(row * data.nbytes)
+                f.write(data.tobytes())
+                f.truncate()
+        with open(paths["names.txt"], "a", encoding="utf-8") as f:
+            f.write(filename.replace("\n", " ") + "\n")
+
+
+_line_counts = {}   # names.txt -> (inode, size, lines) seen by this process; appends only count the tail
+
+
+def _count_lines(path: str) -> int:
+    if not os.path.exists(path):
+        _line_counts.pop(path, None)    # cleared: a rebuilt file may reuse the inode
+        return 0
+    st = os.stat(path)
+    ino, seen, lines = _line_counts.get(path, (st.st_ino, 0, 0))
+    if ino != st.st_ino or st.st_size < seen:     # cleared and rebuilt since
+        seen, lines = 0, 0
+    with open(path, "rb") as f:
+        f.seek(seen)
+        lines += sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 20), b""))
+    _line_counts[path] = (st.st_ino, st.st_size, lines)
+    return lines
+
+
+def clear(directory: str = None):
+    paths = _paths(directory)
+    with storage.file_lock(paths["names.txt"]):
+        for path in paths.values():
+            if os.path.exists(path):
+                os.remove(path)
+    _cache.clear()
+
+
+# ---------------- SEARCH ----------------
+
+_cache = {}   # names.txt -> loaded names / memmaps, refreshed when names.txt grows or is replaced
+
+
+def _load(directory: str = None):
+    paths = _paths(directory)
+    if not os.path.exists(paths["names.txt"]):
+        return None
+    # A clear in another process deletes and rebuilds the files: the size
+    # alone can match again, so the inode (and mtime, inodes get reused) count too
+    st     = os.stat(paths["names.txt"])
+    stamp  = (st.st_ino, st.st_size, st.st_mtime_ns)
+    cached = _cache.get(paths["names.txt"])
+    if cached and cached["stamp"] == stamp:
+        return cached
+    with open(paths["names.txt"], encoding="utf-8") as f:
+        names = f.read().splitlines()
+    n    = len(names)
+    rows = {search_index.call_key(name): i for i, name in enumerate(names)}   # last row of a name wins
+    live = np.zeros(n, dtype=bool)
+    live[list(rows.values())] = True
+    cached = {
+        "stamp":   stamp,
+        "names":   names,
+        "rows":    rows,
+        "live":    live,
+        "vectors": np.memmap(paths["vectors.f32"], dtype=np.float32, mode="r", shape=(n, DIM)) if n else None,
+        "scores":  np.fromfile(paths["scores.f32"], dtype=np.float32, count=n * len(SCORE_FIELDS))
+                   .reshape(n, len(SCORE_FIELDS)) if n else None,
+    }
+    _cache[paths["names.txt"]] = cached
+    return cached
+
+
+def similar(filename: str, k: int = 10, quality: str = None, directory: str = None):
+    """
+    The k stored calls closest (cosine) to `filename`'s latest audit, or
+    None when that call was never audited. quality="good" / "bad" keeps only
+    calls whose mean score is >= GOOD_SCORE / <= BAD_SCORE.
+    """
+    index = _load(directory)
+    row   = index["rows"].get(search_index.call_key(filename)) if index else None
+    if row is None:
+        return None
+    vectors, scores = index["vectors"], index["scores"]
+    sims = vectors @ vectors[row]
+    mask = index["live"].copy()
+    mask[row] = False
+    if quality in ("good", "bad"):
+        mean  = scores.mean(axis=1)
+        mask &= mean >= GOOD_SCORE if quality == "good" else mean <= BAD_SCORE
+    sims[~mask] = -np.inf
+
+    k   = max(1, min(int(k), MAX_K, int(mask.sum()) or 1))
+    top = np.argpartition(-sims, k - 1)[:k]
+    top = top[np.argsort(-sims[top])]
+    return [
+        {
+            "filename":   index["names"][i],
+            "similarity": round(float(sims[i]), 4),
+            **{name: float(scores[i, j]) for j, name in enumerate(SCORE_FIELDS)},
+        }
+        for i in top.tolist() if np.isfinite(sims[i])
+    ]
@@ -0,0 +1,150 @@
+import os
+import re
+import csv
+import json
+import tempfile
+from contextlib import contextmanager
+from fastapi import Header, Query
+
+import metrics
+
+try:
+    import fcntl
+except ImportError:   # Windows dev machines: locks degrade to no-ops
+    fcntl = None
+
+# ---------------- MULTI-WORKER SAFE STORAGE ----------------
+# Several gunicorn workers (and several services) read and write the same
+# files. Rules used everywhere:
+#   - whole-file results are written to a temp file and renamed into place
+#   - appends and directory clears happen under an flock on "<path>.lock"
+#   - "latest result" files are scoped per session (X-Session-Id header)
+
+DEFAULT_SESSION = "default"
+SESSIONS_DIR    = "sessions"
+_SESSION_RE     = re.compile(r"^[A-Za-z0-9_\-]{1,64}$")
+
+
+# ---------------- SESSIONS ----------------
+
+def session_id(
+    x_session_id: str = Header(None),
+    session: str      = Query(None),
+) -> str:
+    """FastAPI dependency: the caller's session from the X-Session-Id header or ?session=."""
+    value = x_session_id or session
+    if value and _SESSION_RE.match(value):
+        return value
+    return DEFAULT_SESSION
+
+
+def session_path(path: str, session: str = DEFAULT_SESSION) -> str:
+    """
+    Maps a "latest result" file to its per-session location. The default
+    session keeps the original path, so single-user setups see no change.
+    """
+    if not session or session == DEFAULT_SESSION:
+        return path
+    directory, name = os.path.split(path)
+    return os.path.join(directory, SESSIONS_DIR, session, name)
+
+
+# ---------------- LOCKS ----------------
+
+@contextmanager
+def file_lock(path: str, shared: bool = False):
+    """Advisory inter-process lock on `<path>.lock`."""
+    if fcntl is None:
+        yield
+        return
+    lock_path = path.rstrip("/\\") + ".lock"
+    os.makedirs(os.path.dirname(os.path.abspath(lock_path)), exist_ok=True)
+    with open(lock_path, "a") as lf:
+        fcntl.flock(lf.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lf.fileno(), fcntl.LOCK_UN)
+
+
+# ---------------- ATOMIC WRITES ----------------
+
+@contextmanager
+def atomic_open(path: str, mode: str = "w", **kwargs):
+    """
+    Yields a temp file next to `path`; on clean exit it is fsync'ed and
+    renamed over `path`, so readers only ever see the old or the new file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix="." + os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, **kwargs) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def write_json(path: str, data, **dump_kwargs):
+    with metrics.timed(metrics.IO_SECONDS, "json_write"), atomic_open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, **dump_kwargs)
+
+
+def write_json_in_dir(directory: str, name: str, data, **dump_kwargs):
+    """Atomic write into a directory that /clear-history may be emptying concurrently."""
+    with file_lock(directory, shared=True):
+        os.makedirs(directory, exist_ok=True)
+        write_json(os.path.join(directory, name), data, **dump_kwargs)
+
+
+def append_csv_row(path: str, fieldnames: list, row: dict):
+    """Appends one row under an exclusive lock, writing the header for a new file."""
+    with metrics.timed(metrics.IO_SECONDS, "csv_append"), file_lock(path):
+        file_exists = os.path.isfile(path) and os.path.getsize(path) > 0
+        with open(path, mode="a", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            if not file_exists:
+                writer.writeheader()
+            writer.writerow(row)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def read_csv_rows(path: str) -> list:
+    """Every row as a dict of strings; empty and missing cells read as ""."""
+    with open(path, newline="", encoding="utf-8") as f:
+        return [{k: v or "" for k, v in row.items()} for row in csv.DictReader(f, restval="")]
+
+
+def reset_csv(path: str, fieldnames: list = None):
+    """Truncates a CSV (keeping only the header if given) or removes it."""
+    with file_lock(path):
+        if fieldnames is None:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        with atomic_open(path, "w", newline="", encoding="utf-8") as f:
+            csv.DictWriter(f, fieldnames=fieldnames).writeheader()
+
+
+def clear_directory(directory: str) -> int:
+    """
+    Empties `directory` and its subdirectories in place under an exclusive
+    lock. Unlike rmtree + makedirs, no directory ever disappears while other
+    workers write to it.
+    """
+    removed = 0
+    with file_lock(directory):
+        if not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
+            return 0
+        for root, _, files in os.walk(directory):
+            for name in files:
+                os.remove(os.path.join(root, name))
+                removed += 1
+    return removed
@@ -0,0 +1,272 @@
+import os
+import io
+import re
+import csv
+import heapq
+from array import array
+from contextlib import contextmanager
+
+import metrics
+import storage
+
+# ---------------- SUMMARY LOG ----------------
+# final_summaries.csv and text_summaries.csv stay plain append-only CSVs.
+# Next to each one, "<csv>.idx" holds the byte offset at which every record
+# ends (the header first) as 8-byte integers, appended under the same lock as
+# the row itself. Reads seek straight to the rows they return: the newest
+# row, or one page of history before a cursor, costs the same for ten rows
+# of history as for a million. An index that is missing or behind its CSV (a
+# file written before the index existed, or a crash between the two appends)
+# is caught up from its last offset on the next read or append.
+#
+# Rows are numbered 0, 1, ... in append order. A page holds the `limit`
+# newest rows before row `before`, newest first, and `before` for the next
+# page is the number of the oldest row returned (None once row 0 is out).
+# The audio and text logs belong to different services, which may run on
+# different hosts: merged() pages each through a "pager" (a local log, or the
+# owning service's /history over HTTP, see app.py) and merges the pages.
+
+BASE_DIR     = os.path.dirname(os.path.abspath(__file__))
+SOURCES      = {"audio": os.path.join(BASE_DIR, "final_summaries.csv"),
+                "text":  os.path.join(BASE_DIR, "text_summaries.csv")}
+INDEX_SUFFIX = ".idx"
+ENTRY        = 8      # bytes per offset
+_DATED       = re.compile(r"^\d{4}-\d\d-\d\d")
+
+
+def _index_path(path: str) -> str:
+    return path + INDEX_SUFFIX
+
+
+def _record_ends(f, start: int):
+    """End offset of each complete CSV record from `start` (a newline outside quotes ends a record)."""
+    f.seek(start)
+    pos, quotes = start, 0
+    for line in f:
+        pos    += len(line)
+        quotes += line.count(b'"')
+        if quotes % 2 == 0 and line.endswith(b"\n"):
+            quotes = 0
+            yield pos
+
+
+def _entries(idx, first: int, count: int) -> array:
+    """Index entries [first, first + count)."""
+    ends = array("q")
+    idx.seek(first * ENTRY)
+    data = idx.read(count * ENTRY)
+    ends.frombytes(data[:len(data) - len(data) % ENTRY])
+    return ends
+
+
+def _size(f) -> int:
+    return os.fstat(f.fileno()).st_size
+
+
+def _fresh(data, idx) -> bool:
+    """True when the index ends exactly where the CSV does."""
+    n = _size(idx) // ENTRY
+    if not n:
+        return _size(data) == 0
+    return _entries(idx, n - 1, 1)[0] == _size(data)
+
+
+def _sync(path: str):
+    """Brings the index up to date with the CSV; caller holds the exclusive lock."""
+    with open(path, "ab+") as data, open(_index_path(path), "ab+") as idx:
+        if _fresh(data, idx):
+            return
+        n     = _size(idx) // ENTRY
+        last  = _entries(idx, n - 1, 1)[0] if n else 0
+        if last > _size(data):          # CSV replaced or truncated behind our back: rebuild
+            idx.truncate(0)
+            n, last = 0, 0
+        idx.truncate(n * ENTRY)         # drop a torn trailing entry
+        idx.seek(0, os.SEEK_END)
+        idx.write(array("q", _record_ends(data, last)).tobytes())
+        idx.flush()
+        os.fsync(idx.fileno())
+
+
+@contextmanager
+def _reading(path: str):
+    """
+    Yields (csv file, index file) under a shared lock, the index fresh, or
+    (None, None) if there is no log. A stale index is caught up first under
+    the exclusive lock (not while holding the shared one: flock would deadlock).
+    """
+    for attempt in range(2):
+        with storage.file_lock(path, shared=True):
+            try:
+                data = open(path, "rb")
+            except FileNotFoundError:
+                yield None, None
+                return
+            with data:
+                try:
+                    idx = open(_index_path(path), "rb")
+                except FileNotFoundError:
+                    idx = None
+                if idx is not None:
+                    with idx:
+                        if _fresh(data, idx):
+                            yield data, idx
+                            return
+        if attempt:
+            break
+        with storage.file_lock(path):
+            _sync(path)
+    raise OSError(f"summary log index for {path} could not be brought up to date")
+
+
+def _read(f, offset: int, length: int) -> bytes:
+    f.seek(offset)
+    return f.read(length)
+
+
+def _parse(chunk: bytes) -> list:
+    return list(csv.reader(io.StringIO(chunk.decode("utf-8"), newline="")))
+
+
+# ---------------- WRITES ----------------
+
+def append(path: str, fieldnames: list, row: dict):
+    """Appends one row (the header first, for a new file) and its index entries under an exclusive lock."""
+    with metrics.timed(metrics.IO_SECONDS, "csv_append"), storage.file_lock(path):
+        _sync(path)
+        with open(path, "ab") as data, open(_index_path(path), "ab") as idx:
+            text   = io.StringIO(newline="")
+            writer = csv.DictWriter(text, fieldnames=fieldnames)
+            ends   = array("q")
+            if not _size(data):
+                writer.writeheader()
+                ends.append(len(text.getvalue().encode("utf-8")))
+            writer.writerow(row)
+            encoded = text.getvalue().encode("utf-8")
+            data.write(encoded)
+            data.flush()
+            os.fsync(data.fileno())
+            ends.append(_size(data))
+            # The index entry lands after the row: readers never see an offset past the data
+            idx.write(ends.tobytes())
+            idx.flush()
+            os.fsync(idx.fileno())
+
+
+def reset(path: str, fieldnames: list = None):
+    """Empties the log, keeping only the header if given (as storage.reset_csv), and its index."""
+    with storage.file_lock(path):
+        if fieldnames is None:
+            for p in (path, _index_path(path)):
+                if os.path.exists(p):
+                    os.remove(p)
+            return
+        header = io.StringIO(newline="")
+        csv.DictWriter(header, fieldnames=fieldnames).writeheader()
+        encoded = header.getvalue().encode("utf-8")
+        with storage.atomic_open(path, "wb") as f:
+            f.write(encoded)
+        with storage.atomic_open(_index_path(path), "wb") as f:
+            f.write(array("q", [len(encoded)]).tobytes())
+
+
+# ---------------- READS ----------------
+
+def count(path: str) -> int:
+    """Number of rows in the log, from the index size alone."""
+    with _reading(path) as (data, idx):
+        return max(_size(idx) // ENTRY - 1, 0) if data else 0
+
+
+def page(path: str, limit: int = None, before: int = None):
+    """
+    (rows newest first, total rows, `before` for the next page or None).
+    limit=None returns everything before `before`.
+    """
+    with metrics.timed(metrics.IO_SECONDS, "csv_read"), _reading(path) as (data, idx):
+        total = max(_size(idx) // ENTRY - 1, 0) if data else 0
+        if not total:
+            return [], 0, None
+        stop   = total if before is None else max(0, min(int(before), total))
+        start  = 0 if limit is None else max(0, stop - max(int(limit), 0))
+        header = _parse(_read(data, 0, _entries(idx, 0, 1)[0]))[0]
+        rows   = []
+        if stop > start:
+            # entry i + 1 is where row i ends; entry `start` is where it begins
+            ends = _entries(idx, start, stop - start + 1)
+            rows = _parse(_read(data, ends[0], ends[-1] - ends[0]))
+    rows = [{k: (values[i] if i < len(values) else "") or "" for i, k in enumerate(header)} for values in rows]
+    return rows[::-1], total, (start or None)
+
+
+def appended_since(path: str, start: int, file_name: str, summary: str) -> bool:
+    """True if a row numbered `start` or later has this file name and summary (a retried append already landed)."""
+    total = count(path)
+    if total <= start:
+        return False
+    rows, _, _ = page(path, total - start)
+    return any(row.get("file_name") == file_name and row.get("summary") == summary for row in rows)
+
+
+def latest(path: str):
+    """The newest row, or None for an empty or missing log."""
+    rows, _, _ = page(path, 1)
+    return rows[0] if rows else None
+
+
+
+# ---------------- MERGED HISTORY ----------------
+
+def local(path: str):
+    """Pager over a log on this host: (limit, before) -> (rows newest first, total rows, next before)."""
+    return lambda limit, before: page(path, limit, before)
+
+
+def parse_cursor(cursor: str, sources) -> dict:
+    """Cursor "audio:40,text:3" -> {"audio": 40, "text": 3}; no cursor: every source from its newest row."""
+    if not cursor:
+        return {source: None for source in sources}
+    out = {}
+    for part in cursor.split(","):
+        source, _, before = part.partition(":")
+        if source in sources and before.isdigit():
+            out[source] = int(before)
+    return out
+
+
+def sort_key(row: dict) -> str:
+    """Dated timestamps ("YYYY-mm-dd HH:MM:SS") sort as text; older audio rows kept only the time of day and sort last."""
+    timestamp = row.get("timestamp", "")
+    return timestamp if _DATED.match(timestamp) else ""
+
+
+def merged(limit: int = None, cursor: str = None, sources: dict = None):
+    """
+    Several histories as one list, newest first (by timestamp), each row
+    tagged with its "source"; (rows, total rows, next cursor or None).
+    `sources` maps a source name to its pager (default: the local logs of
+    SOURCES). Each source contributes at most one page of `limit` rows.
+    """
+    sources = sources or {source: local(path) for source, path in SOURCES.items()}
+    wanted  = parse_cursor(cursor, sources)
+    pages, total = {}, 0
+    for source, pager in sources.items():
+        if source in wanted:
+            rows, n, _ = pager(limit, wanted[source])
+            stop = n if wanted[source] is None else min(wanted[source], n)
+        else:                           # left out of the cursor: already exhausted, only counted
+            _, n, _ = pager(0, None)
+            rows, stop = [], 0
+        pages[source] = (rows, stop)
+        total += n
+
+    tagged = ([(sort_key(row), source, row) for row in rows] for source, (rows, _) in pages.items())
+    out, used = [], dict.fromkeys(pages, 0)
+    for _, source, row in heapq.merge(*tagged, key=lambda t: t[0], reverse=True):
+        if limit is not None and len(out) >= limit:
+            break
+        out.append({**row, "source": source})
+        used[source] += 1
+
+    left = {source: stop - used[source] for source, (_, stop) in pages.items() if stop - used[source] > 0}
+    return out, total, ",".join(f"{source}:{before}" for source, before in left.items()) or None
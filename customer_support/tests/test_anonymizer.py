@@ -0,0 +1,80 @@
+"""
+anonymizer.py on the sample conversations in tests/fixtures/: the labelled
+names, emails and phone numbers are masked, placeholders are stable within
+a conversation, and capitalized lexicon names used as ordinary words are not.
+The fixtures are copies: the live transcriptions_with_speakers.csv is
+rewritten by every upload and deleted by /clear-history.
+
+    python -m pytest -q tests
+"""
+import os
+import re
+import sys
+
+import pytest
+
+BASE_DIR     = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+sys.path.insert(0, BASE_DIR)
+
+import anonymizer
+import turns
+
+FIXTURES = {
+    "chat.txt": ["Sarah", "Mike"],
+    "human_chat.txt": ["Tom", "Christopher Columbus", "Daniel Craig", "Peter Thiel", "Sean Carroll",
+                       "john mayer", "john nash"],
+    "transcriptions_with_speakers.csv": ["Martha", "Randall", "Thomas", "R-A-N-D-A-L-L", "T-H-O-N-A-N",
+                                         "Gladys", "409-866-5088", "866-5088", "randall.thomas at gmail.com"],
+}
+
+
+def load(name: str) -> str:
+    path = os.path.join(FIXTURES_DIR, name)
+    if name.endswith(".csv"):
+        return turns.Turns.read_csv(path).conversation()
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def survives(label: str, text: str) -> bool:
+    return re.search(rf"(?<![\w-]){re.escape(label)}(?![\w-])", text, re.IGNORECASE) is not None
+
+
+@pytest.mark.parametrize("name", sorted(FIXTURES))
+def test_fixture_pii_is_masked(name):
+    text = load(name)
+    masked, originals = anonymizer.anonymize(text)
+    for label in FIXTURES[name]:
+        assert survives(label, text), f"{label!r} is not in {name}"
+        assert not survives(label, masked), f"{label!r} survives in {name}"
+    assert originals
+
+
+def test_placeholders_are_stable():
+    masked, originals = anonymizer.anonymize(
+        "Agent: Hi Randall, is that R-A-N-D-A-L-L?\n"
+        "Customer: Yes. Call me on 409-866-5088 or 4 0 9 8 6 6 5 0 8 8, randall@example.com.\n"
+        "Agent: Thanks Randall, I mailed randall@example.com.\n")
+    assert masked == (
+        "Agent: Hi [NAME_1], is that [NAME_1]?\n"
+        "Customer: Yes. Call me on [PHONE_1] or [PHONE_1], [EMAIL_1].\n"
+        "Agent: Thanks [NAME_1], I mailed [EMAIL_1].\n")
+    assert originals == {"[NAME_1]": "Randall", "[PHONE_1]": "4098665088", "[EMAIL_1]": "randall@example.com"}
+    assert anonymizer.anonymize(load("chat.txt")) == anonymizer.anonymize(load("chat.txt"))
+
+
+@pytest.mark.parametrize("text", [
+    "Your account is covered. Grace period applies until Friday.",
+    "The Grace period applies.",
+    "Will you send the invoice?",
+    "Your June payment is due.",
+])
+def test_cased_names_used_as_words_are_kept(text):
+    assert anonymizer.anonymize(text) == (text, {})
+
+
+def test_cased_names_are_masked_with_evidence():
+    masked, originals = anonymizer.anonymize("Thanks, Grace. My name is June, the Hope period is over.")
+    assert masked == "Thanks, [NAME_1]. My name is [NAME_2], the Hope period is over."
+    assert sorted(anonymizer.names(originals)) == ["Grace", "June"]
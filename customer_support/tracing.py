@@ -0,0 +1,299 @@
+import io
+import os
+import sys
+import json
+import time
+import uuid
+import pstats
+import marshal
+import logging
+import cProfile
+import threading
+import contextvars
+from fastapi import HTTPException
+from fastapi.responses import PlainTextResponse, Response
+from starlette.concurrency import run_in_threadpool as _run_in_threadpool
+
+# ---------------- REQUEST-SCOPED TRACING ----------------
+# Every log line is a JSON object carrying:
+#   call_id    - one audit end to end (set by the UI via X-Call-Id and shared by
+#                /upload, /analyze-quality and /analyze; job id in job_queue)
+#   request_id - one HTTP hop (X-Request-Id, generated if absent)
+#   span       - the innermost open span (request, deepgram.transcribe, ...)
+# Both ids are echoed back as response headers.
+
+LOG_LEVEL         = os.getenv("LOG_LEVEL", "INFO").upper()
+ENABLE_PROFILING  = os.getenv("ENABLE_PROFILING", "0") == "1"
+
+_call_id    = contextvars.ContextVar("call_id",    default="-")
+_request_id = contextvars.ContextVar("request_id", default="-")
+_span       = contextvars.ContextVar("span",       default="-")
+_profiling  = contextvars.ContextVar("profiling",  default=False)
+
+
+def new_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def current_call_id() -> str:
+    return _call_id.get()
+
+
+# ---------------- STRUCTURED LOGGING ----------------
+
+class _JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts":         round(record.created, 3),
+            "level":      record.levelname,
+            "service":    record.name.split(".", 1)[-1],
+            "call_id":    _call_id.get(),
+            "request_id": _request_id.get(),
+            "span":       _span.get(),
+            "msg":        record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+_root = logging.getLogger("auditor")
+if not _root.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(_JsonFormatter())
+    _root.addHandler(_handler)
+    _root.setLevel(LOG_LEVEL)
+    _root.propagate = False
+
+
+def get_logger(service: str) -> logging.Logger:
+    """`log = tracing.get_logger("scoring")`; use log.info(...), log.debug(...)."""
+    return logging.getLogger(f"auditor.{service}")
+
+
+class span:
+    """
+    Times a block and logs one structured line when it closes:
+        with tracing.span(log, "groq.score", chars=len(conv)):
+            ...
+    """
+    __slots__ = ("log", "name", "fields", "_start", "_token")
+
+    def __init__(self, log: logging.Logger, name: str, **fields):
+        self.log    = log
+        self.name   = name
+        self.fields = fields
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        self._token = _span.set(self.name)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = (time.perf_counter() - self._start) * 1000
+        fields   = dict(self.fields, duration_ms=round(duration, 2))
+        if exc is not None:
+            fields["error"] = f"{exc_type.__name__}: {exc}"
+        _span.reset(self._token)
+        self.log.info("span %s", self.name, extra={"fields": dict(fields, span_name=self.name)})
+        return False
+
+
+class bind_call:
+    """Binds a call id outside of HTTP (job_queue workers, CLI tools)."""
+    __slots__ = ("call_id", "_tokens")
+
+    def __init__(self, call_id: str):
+        self.call_id = call_id
+
+    def __enter__(self):
+        self._tokens = (_call_id.set(self.call_id), _request_id.set(new_id()))
+        return self
+
+    def __exit__(self, *exc):
+        _call_id.reset(self._tokens[0])
+        _request_id.reset(self._tokens[1])
+        return False
+
+
+# ---------------- PROFILER HOOK ----------------
+# Up to Python 3.11 cProfile is per thread: a profiled request is captured in
+# two parts, merged into one report, the event-loop side (routing, awaits,
+# async handlers) and every run_in_threadpool call it makes, profiled in its
+# worker thread. The services import run_in_threadpool from here for that
+# reason. The loop-side part also records whatever other requests' coroutines
+# the loop runs meanwhile; their threadpool work and threads the handlers
+# start themselves (app.py's segment pool) are not captured.
+# From 3.12 cProfile runs on sys.monitoring: one profiler per process, which
+# sees every thread (a second one raises ValueError). The loop-side profiler
+# alone captures the request there, along with anything else the process
+# runs while it is enabled.
+
+_PER_THREAD = sys.version_info < (3, 12)
+
+class _ProfileSession:
+    """Captures cProfile data for the next `remaining` requests on one route."""
+
+    def __init__(self):
+        self.lock      = threading.Lock()
+        self.route     = None
+        self.remaining = 0
+        self.captured  = 0
+        self.busy      = False
+        self.stats     = None
+
+    def arm(self, route: str, count: int):
+        with self.lock:
+            self.route, self.remaining, self.captured, self.stats = route, count, 0, None
+
+    def try_acquire(self, path: str) -> bool:
+        # cProfile is per-thread and not re-entrant; profile one request at a time
+        with self.lock:
+            if self.remaining <= 0 or self.busy or path != self.route:
+                return False
+            self.busy = True
+            return True
+
+    def merge(self, profiler: cProfile.Profile):
+        with self.lock:
+            if self.stats is None:
+                self.stats = pstats.Stats(profiler)
+            else:
+                self.stats.add(profiler)
+
+    def release(self, profiler: cProfile.Profile):
+        self.merge(profiler)
+        with self.lock:
+            self.remaining -= 1
+            self.captured  += 1
+            self.busy       = False
+
+    def run(self, func, *args, **kwargs):
+        """Calls func in the current (worker) thread under its own profiler, merged into the report."""
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.disable()
+            self.merge(profiler)
+
+    def report(self, fmt: str):
+        with self.lock:
+            if self.stats is None:
+                return None
+            if fmt == "pstats":
+                # Same bytes Stats.dump_stats() writes; load with pstats.Stats(path)
+                return marshal.dumps(self.stats.stats)
+            out = io.StringIO()
+            self.stats.stream = out
+            self.stats.sort_stats("cumulative").print_stats(60)
+            return out.getvalue()
+
+
+_profile = _ProfileSession()
+
+
+async def run_in_threadpool(func, *args, **kwargs):
+    """starlette's run_in_threadpool; inside a profiled request the call is profiled in its worker thread."""
+    if _PER_THREAD and _profiling.get():
+        return await _run_in_threadpool(_profile.run, func, *args, **kwargs)
+    return await _run_in_threadpool(func, *args, **kwargs)
+
+
+# ---------------- ASGI MIDDLEWARE ----------------
+
+class TracingMiddleware:
+    def __init__(self, app, service: str):
+        self.app     = app
+        self.service = service
+        self.log     = get_logger(service)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        call_id = request_id = None
+        for key, value in scope.get("headers", ()):
+            if key == b"x-call-id":
+                call_id = value.decode("latin-1")[:64]
+            elif key == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+        request_id = request_id or new_id()
+        call_id    = call_id or request_id
+
+        tokens = (_call_id.set(call_id), _request_id.set(request_id), _span.set("request"))
+        start  = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-request-id", request_id.encode()))
+                headers.append((b"x-call-id", call_id.encode()))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        profiler = None
+        if ENABLE_PROFILING and _profile.try_acquire(scope.get("path", "")):
+            profiler = cProfile.Profile()
+            profiling = _profiling.set(True)
+            profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            self.log.exception("unhandled error")
+            raise
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                _profiling.reset(profiling)
+                _profile.release(profiler)
+            route = scope.get("route")
+            self.log.info("span request", extra={"fields": {
+                "span_name":   "request",
+                "method":      scope.get("method"),
+                "path":        scope.get("path"),
+                "route":       getattr(route, "path", None),
+                "status":      status[0],
+                "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+                "profiled":    profiler is not None,
+            }})
+            _span.reset(tokens[2])
+            _request_id.reset(tokens[1])
+            _call_id.reset(tokens[0])
+
+
+def instrument(app, service: str):
+    """Adds tracing middleware and, with ENABLE_PROFILING=1, the /debug/profile hook."""
+    app.add_middleware(TracingMiddleware, service=service)
+
+    if not ENABLE_PROFILING:
+        return
+
+    @app.post("/debug/profile", include_in_schema=False)
+    async def arm_profile(path: str, count: int = 5):
+        """Profile the next `count` requests whose path equals `path`, e.g. /analyze-quality."""
+        if count < 1 or count > 1000:
+            raise HTTPException(status_code=400, detail="count must be between 1 and 1000")
+        _profile.arm(path, count)
+        return {"armed": True, "path": path, "count": count}
+
+    @app.get("/debug/profile", include_in_schema=False)
+    async def profile_status():
+        return {"path": _profile.route, "remaining": _profile.remaining, "captured": _profile.captured}
+
+    @app.get("/debug/profile/report", include_in_schema=False)
+    async def profile_report(format: str = "text"):
+        report = _profile.report(format)
+        if report is None:
+            raise HTTPException(status_code=404, detail="No profile captured yet.")
+        if format == "pstats":
+            return Response(report, media_type="application/octet-stream",
+                            headers={"Content-Disposition": f"attachment; filename={service}.prof"})
+        return PlainTextResponse(report, headers={"Content-Disposition": f"attachment; filename={service}-profile.txt"})
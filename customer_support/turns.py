@@ -0,0 +1,179 @@
+import csv
+from operator import attrgetter, itemgetter
+
+import numpy as np
+
+# ---------------- COMPACT TURNS ----------------
+# A transcript as a few parallel arrays instead of a list of dicts:
+#   codes    int16    speaker index into `labels` ("Speaker 00", ...)
+#   starts   float64  turn start / end in seconds (NaN for chat turns)
+#   ends     float64
+#   offsets  int64    turn i is buffer[offsets[i]:offsets[i + 1] - 1]
+#   buffer   str      every turn's text followed by one separator
+# Deepgram words are grouped into turns with one run-length pass over the
+# speaker array; services pass Turns around (handoff, scoring, emotion,
+# jobs) and dicts are only built at the JSON edge (to_records).
+
+FIELDS        = ["speaker", "text", "start"]
+CUSTOMER_OPEN = ("help", "issue", "problem", "broken")   # first turn sounds like the customer
+
+
+def _pick(times, index: np.ndarray) -> np.ndarray:
+    if callable(times):
+        return np.fromiter(map(times, index.tolist()), dtype=np.float64, count=len(index))
+    return np.asarray(times, dtype=np.float64)[index]
+
+
+class Turns:
+    __slots__ = ("codes", "labels", "starts", "ends", "offsets", "buffer")
+
+    def __init__(self, codes, labels, starts, ends, offsets, buffer: str):
+        self.codes   = codes
+        self.labels  = labels
+        self.starts  = starts
+        self.ends    = ends
+        self.offsets = offsets
+        self.buffer  = buffer
+
+    # ---------------- BUILDING ----------------
+
+    @classmethod
+    def from_words(cls, speakers, words: list, starts, ends) -> "Turns":
+        """
+        Consecutive words of one speaker become one turn: a run-length pass
+        over `speakers` plus one " ".join, no per-word Python. `starts` /
+        `ends` are per-word times, or callables index -> time so callers only
+        fetch them for the first / last word of each turn.
+        """
+        n = len(words)
+        if n == 0:
+            return cls.from_texts([], [])
+        speakers = np.asarray(speakers)
+        first    = np.flatnonzero(np.concatenate(([True], speakers[1:] != speakers[:-1])))
+        last     = np.concatenate((first[1:], [n])) - 1
+
+        # " ".join puts word i at pos[i]; a turn ends one character before the
+        # next turn's first word, so the shared space doubles as the separator
+        lengths = np.fromiter(map(len, words), dtype=np.int64, count=n) + 1
+        pos     = np.cumsum(lengths) - lengths
+        offsets = np.append(pos[first], lengths.sum())
+
+        values, codes = np.unique(speakers[first], return_inverse=True)
+        return cls(codes.astype(np.int16), [f"Speaker {s}" for s in values.tolist()],
+                   _pick(starts, first), _pick(ends, last), offsets, " ".join(words) + " ")
+
+    @classmethod
+    def from_deepgram(cls, words) -> "Turns":
+        """From Deepgram words: JSON dicts, SDK dataclasses or stitched segment words."""
+        get = itemgetter if words and isinstance(words[0], dict) else attrgetter
+        try:
+            speakers = np.fromiter(map(get("speaker"), words), dtype=np.int64, count=len(words))
+        except (KeyError, AttributeError, TypeError):      # not diarized
+            speakers = np.zeros(len(words), dtype=np.int64)
+        start, end = get("start"), get("end")
+        return cls.from_words(speakers, list(map(get("word"), words)),
+                              lambda i: start(words[i]), lambda i: end(words[i]))
+
+    @classmethod
+    def from_texts(cls, speakers: list, texts: list, starts=None) -> "Turns":
+        """One turn per (speaker, text); `starts` may hold None for untimed turns."""
+        labels, codes = np.unique(np.array(speakers, dtype=object).astype(str), return_inverse=True) \
+            if speakers else (np.zeros(0, dtype=str), np.zeros(0, dtype=np.int64))
+        n        = len(texts)
+        starts   = np.array([np.nan if s is None else s for s in starts], dtype=np.float64) \
+            if starts is not None else np.full(n, np.nan)
+        lengths  = np.fromiter(map(len, texts), dtype=np.int64, count=n) + 1
+        offsets  = np.concatenate(([0], np.cumsum(lengths)))
+        return cls(codes.astype(np.int16), labels.tolist(), starts, np.full(n, np.nan),
+                   offsets, " ".join(texts) + " ")
+
+    @classmethod
+    def from_records(cls, records) -> "Turns":
+        """From {"speaker", "text"[, "start"]} rows: chat parser output, job JSON, CSV rows."""
+        if isinstance(records, Turns):
+            return records
+        speakers, texts, starts = [], [], []
+        for r in records:
+            speakers.append(r.get("speaker") or "")
+            text = r.get("text")
+            texts.append(text if isinstance(text, str) else "")
+            start = r.get("start")
+            starts.append(float(start) if start not in (None, "") else None)
+        return cls.from_texts(speakers, texts, starts)
+
+    @classmethod
+    def read_csv(cls, path: str) -> "Turns":
+        with open(path, newline="", encoding="utf-8") as f:
+            return cls.from_records(csv.DictReader(f))
+
+    # ---------------- ACCESS ----------------
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __iter__(self):
+        return iter(self.to_records())
+
+    def text(self, i: int) -> str:
+        return self.buffer[self.offsets[i]:self.offsets[i + 1] - 1]
+
+    def texts(self) -> list:
+        o, buffer = self.offsets.tolist(), self.buffer
+        return [buffer[a:b - 1] for a, b in zip(o, o[1:])]
+
+    def speakers(self) -> list:
+        labels = self.labels
+        return [labels[c] for c in self.codes.tolist()]
+
+    def pairs(self):
+        """(speaker, text) per turn."""
+        return zip(self.speakers(), self.texts())
+
+    @property
+    def timed(self) -> bool:
+        return bool(len(self)) and not np.isnan(self.starts).all()
+
+    def conversation(self) -> str:
+        """'speaker: text' lines for every non-blank turn (the LLM prompt format)."""
+        return "\n".join(f"{s}: {t}" for s, t in self.pairs() if t.strip())
+
+    def to_records(self) -> list:
+        """List of {"speaker", "text"[, "start"]} dicts, as the UI and job results expect."""
+        if not self.timed:
+            return [{"speaker": s, "text": t} for s, t in self.pairs()]
+        starts = [None if x != x else x for x in self.starts.tolist()]
+        return [{"speaker": s, "text": t, "start": x} for (s, t), x in zip(self.pairs(), starts)]
+
+    # ---------------- UI LABELS ----------------
+
+    def for_ui(self) -> "Turns":
+        """
+        Programmatically identifies roles to save time.
+        UI expects 'Speaker 00' for Agent and 'Speaker 01' for Customer.
+        """
+        if not len(self):
+            return self
+        # The person who starts the call is usually the Agent, unless they
+        # open by asking for help
+        first_msg = self.text(0).lower()
+        agent     = "Speaker 1" if any(word in first_msg for word in CUSTOMER_OPEN) else "Speaker 0"
+        is_agent  = np.array([label == agent for label in self.labels], dtype=bool)
+        codes     = np.where(is_agent[self.codes], 0, 1).astype(np.int16)
+        return Turns(codes, ["Speaker 00", "Speaker 01"], self.starts, self.ends, self.offsets, self.buffer)
+
+    # ---------------- CSV ----------------
+
+    def write_csv(self, f):
+        """speaker,text[,start] rows: the columns the pandas writer used to produce."""
+        timed  = self.timed
+        fields = FIELDS if timed else FIELDS[:2]
+        rows   = zip(self.speakers(), self.texts(), ("" if x != x else x for x in self.starts.tolist())) \
+            if timed else self.pairs()
+        if any(c in self.buffer for c in ',"\r\n') or any(c in label for label in self.labels for c in ',"\r\n'):
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(fields)
+            writer.writerows(rows)
+            return
+        # Nothing needs quoting (Deepgram words carry no punctuation): plain joins
+        f.write(",".join(fields) + "\n")
+        f.write("".join(",".join(map(str, row)) + "\n" for row in rows))